@@ -0,0 +1,39 @@
+# benchmark.py  ── pipeline throughput on synthetic data, recorded per commit
+import argparse
+import pandas as pd
+from src.benchmarks import SIZES, run_benchmarks, load_results, compare_results
+
+DATA_ROOT    = "../data/synthetic"            # generated raw data, reused between runs
+RESULTS_PATH = "../benchmarks/results.jsonl"  # one JSON record per (run, size, benchmark)
+
+COLUMNS = ["size", "benchmark", "rows", "wall_seconds", "cpu_seconds", "rows_per_second", "peak_rss_delta_mb"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated row counts, e.g. 100k,1M,10M")
+    parser.add_argument("--tx-per-user", type=int, default=50)
+    parser.add_argument("--fraud-rate", type=float, default=0.08)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--cprofile-dir", default=None, help="also dump a cProfile file per benchmark")
+    parser.add_argument("--compare", action="store_true", help="only compare recorded runs, run nothing")
+    parser.add_argument("--base", default=None, help="commit (prefix) to compare against; default the previous one")
+    parser.add_argument("--head", default=None, help="commit (prefix) to compare; default the latest run")
+    parser.add_argument("--metric", default="wall_seconds")
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+    if not args.compare:
+        results = run_benchmarks(
+            args.sizes.split(","), data_root=args.data_root, results_path=args.results,
+            tx_per_user=args.tx_per_user, fraud_rate=args.fraud_rate, seed=args.seed,
+            cprofile_dir=args.cprofile_dir,
+        )
+        print(results[COLUMNS].to_string(index=False))
+
+    history = load_results(args.results)
+    if history["commit"].nunique() > 1 or args.base:
+        table = compare_results(history, base=args.base, head=args.head, metric=args.metric)
+        print(f"\n{args.metric}: {table.attrs['base'][:10]} (base) → {table.attrs['head'][:10]} (head)")
+        print(table.to_string())
@@ -0,0 +1,14 @@
+from .synthetic import generate_raw_data, synthetic_dataset
+from .suite import BENCHMARKS, SIZES, run_benchmark, run_benchmarks, append_results, load_results, compare_results
+
+__all__ = [
+    "generate_raw_data",
+    "synthetic_dataset",
+    "BENCHMARKS",
+    "SIZES",
+    "run_benchmark",
+    "run_benchmarks",
+    "append_results",
+    "load_results",
+    "compare_results",
+]
@@ -0,0 +1,263 @@
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from src.ingestion.loader import load_data
+from src.preprocessing.transform import data_transform
+from src.features.prepare import prepare_model_data
+from src.modeling.train import train_model, predict_proba
+from src.profiling import Profiler
+from .synthetic import synthetic_dataset
+
+__all__ = [
+    "BENCHMARKS",
+    "SIZES",
+    "BENCH_PREPARE_KWARGS",
+    "BENCH_XGB_PARAMS",
+    "parse_size",
+    "run_benchmark",
+    "run_benchmarks",
+    "append_results",
+    "load_results",
+    "compare_results",
+]
+
+BENCHMARKS = ("load_data", "data_transform", "prepare_model_data", "train_model", "predict_proba")
+SIZES = {"100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+# the notebook's feature configuration
+BENCH_PREPARE_KWARGS = dict(
+    to_drop=["transaction_id", "user_id", "currency", "location"],
+    to_think_but_drop=["signup_date", "Month_Year_EOM", "Date", "Year", "time_diff", "time_prev",
+                       "latitude", "longitude", "lat_prev", "lon_prev"],
+    to_categorize=["channel", "device", "payment_method", "category", "country_merchant", "sex",
+                   "education", "primary_source_of_income", "country_users", "part_of_day", "transaction_country"],
+    cutoff="2023-07-01",
+    target="is_fraud",
+)
+# fixed, smaller than DEFAULT_XGB_PARAMS so the 10M fit stays in minutes; keep it
+# fixed so that train_model timings compare across commits
+BENCH_XGB_PARAMS = {"n_estimators": 100, "max_depth": 5, "learning_rate": 0.1, "tree_method": "hist"}
+
+
+def parse_size(size: str) -> int:
+    """``"100k"`` / ``"1M"`` / ``"2.5m"`` / ``"5000"`` → number of rows."""
+    text = str(size).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def _git_state(path: str) -> dict:
+    """Commit of the checkout holding *path* and whether tracked files differ from it."""
+    def git(*args):
+        try:
+            run = subprocess.run(["git", *args], cwd=path, capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return run.stdout.strip() if run.returncode == 0 else None
+
+    commit = git("rev-parse", "HEAD")
+    status = git("status", "--porcelain", "--untracked-files=no") if commit else None
+    return {"commit": commit or "unknown", "dirty": bool(status)}
+
+
+def _environment() -> dict:
+    import numpy, sklearn, xgboost
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+
+def run_benchmark(
+    data_dir: str,
+    *,
+    prepare_kwargs: dict = BENCH_PREPARE_KWARGS,
+    xgb_params: dict = BENCH_XGB_PARAMS,
+    oversample_method: str = "rows",
+    cprofile_dir: str | None = None,
+) -> list:
+    """Run the five benchmarks once on the raw data in *data_dir*, each stage feeding the next.
+
+    Every benchmark is a top-level :class:`~src.profiling.Profiler` step, so its record
+    has the wall / CPU seconds and the resident-memory peak above the RSS at its start;
+    the steps the stages profile themselves are left out.
+
+    :return: one dict per benchmark with ``benchmark``, ``rows`` (input rows),
+        ``wall_seconds``, ``cpu_seconds``, ``rows_per_second``, ``rss_start_mb``,
+        ``peak_rss_delta_mb`` and ``rss_delta_mb``; ``predict_proba`` adds the test ``auc``.
+    """
+    extra = {}
+    with Profiler(cprofile_dir=cprofile_dir) as prof:
+        with prof.step("load_data"):
+            raw = load_data(data_dir)
+        with prof.step("data_transform", rows_in=len(raw)):
+            processed = data_transform(raw)
+        del raw
+        with prof.step("prepare_model_data", rows_in=len(processed)):
+            X_train, y_train, X_test, y_test = prepare_model_data(processed, **prepare_kwargs)
+        del processed
+        with prof.step("train_model", rows_in=len(X_train)):
+            model, _, _ = train_model(X_train, y_train, oversample_method=oversample_method, xgb_params=xgb_params)
+        with prof.step("predict_proba", rows_in=len(X_test)):
+            proba = predict_proba(model, X_test)
+        if y_test.nunique() == 2:
+            extra["auc"] = roc_auc_score(y_test, proba)
+
+    records = []
+    for step in prof.records:
+        if step["depth"]:
+            continue
+        wall = step["wall_seconds"]
+        records.append({
+            "benchmark": step["step"],
+            "rows": step["rows_in"],
+            "wall_seconds": wall,
+            "cpu_seconds": step["cpu_seconds"],
+            "rows_per_second": step["rows_in"] / wall if step["rows_in"] and wall else None,
+            "rss_start_mb": step["rss_start_mb"],
+            "peak_rss_delta_mb": step["peak_rss_delta_mb"],
+            "rss_delta_mb": step["rss_delta_mb"],
+            **(extra if step["step"] == "predict_proba" else {}),
+        })
+    # load_data's input rows are the rows it parses
+    records[0]["rows"] = next(s["rows_out"] for s in prof.records if s["name"] == "load_data/load_data")
+    records[0]["rows_per_second"] = records[0]["rows"] / records[0]["wall_seconds"]
+    return records
+
+
+def _run_isolated(kwargs: dict) -> list:
+    return run_benchmark(**kwargs)
+
+
+def run_benchmarks(
+    sizes=("100k", "1M"),
+    *,
+    data_root: str,
+    results_path: str | None = None,
+    tx_per_user: int = 50,
+    fraud_rate: float = 0.08,
+    seed: int = 0,
+    isolate: bool = True,
+    prepare_kwargs: dict = BENCH_PREPARE_KWARGS,
+    xgb_params: dict = BENCH_XGB_PARAMS,
+    oversample_method: str = "rows",
+    cprofile_dir: str | None = None,
+) -> pd.DataFrame:
+    """Benchmark the pipeline stages on synthetic data of each size; offline, no downloads.
+
+    The raw data of a size is generated once under *data_root* (:func:`synthetic_dataset`)
+    and reused by later runs, so only the first run of a size pays for generation. With
+    *isolate* each size runs in a fresh spawned process: memory figures of one size do
+    not include what the previous one left behind.
+
+    Each record carries the run metadata – ``run_id``, ``timestamp``, git ``commit`` and
+    ``dirty`` flag, ``size``, the data parameters and the library versions – and with
+    *results_path* the records are appended to that JSON-lines file, the history that
+    :func:`compare_results` reads.
+
+    :param sizes: row counts or labels such as ``"100k"``, ``"1M"``, ``"10M"``.
+    :return: one row per (size, benchmark).
+    """
+    meta = {
+        "run_id": time.strftime("%Y%m%dT%H%M%S"),
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        **_git_state(str(Path(__file__).resolve().parent)),
+        "tx_per_user": tx_per_user,
+        "fraud_rate": fraud_rate,
+        "seed": seed,
+        "xgb_params": json.dumps(xgb_params, sort_keys=True),
+        "oversample_method": oversample_method,
+        **_environment(),
+    }
+    records = []
+    for size in sizes:
+        rows = parse_size(size)
+        data_dir = synthetic_dataset(data_root, rows, tx_per_user=tx_per_user, fraud_rate=fraud_rate, seed=seed)
+        kwargs = {
+            "data_dir": data_dir,
+            "prepare_kwargs": prepare_kwargs,
+            "xgb_params": xgb_params,
+            "oversample_method": oversample_method,
+            "cprofile_dir": cprofile_dir and str(Path(cprofile_dir) / str(size)),
+        }
+        if isolate:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                size_records = pool.apply(_run_isolated, (kwargs,))
+        else:
+            size_records = run_benchmark(**kwargs)
+        size_records = [{**meta, "size": str(size), "size_rows": rows, **r} for r in size_records]
+        if results_path is not None:
+            append_results(results_path, size_records)
+        records.extend(size_records)
+    return pd.DataFrame(records)
+
+
+# ----- result history -----
+def append_results(path: str, records: list):
+    """Append benchmark records to a JSON-lines file (created with its directory if missing)."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as fh:
+        for record in records:
+            fh.write(json.dumps(record, default=str) + "\n")
+
+
+def load_results(path: str) -> pd.DataFrame:
+    """All recorded benchmark runs of a results file, oldest first."""
+    return pd.read_json(path, lines=True, dtype={"commit": str, "run_id": str, "size": str})
+
+
+def compare_results(
+    results: pd.DataFrame,
+    *,
+    base: str | None = None,
+    head: str | None = None,
+    metric: str = "wall_seconds",
+) -> pd.DataFrame:
+    """Compare one metric of two commits per (size, benchmark).
+
+    Commits may be given by a prefix of their hash. *head* defaults to the commit of the
+    latest run, *base* to the commit run last before it. Repeated runs of a commit
+    are reduced to their minimum, the least noisy estimate of a timing.
+
+    :return: DataFrame indexed by ``size`` and ``benchmark`` with the ``base`` and
+        ``head`` values and ``ratio = head / base`` (below 1 → head is faster / smaller).
+    """
+    # commits in the order of their latest run
+    runs = results.sort_values("run_id", kind="stable")["commit"].tolist()
+    commits = list(dict.fromkeys(reversed(runs)))[::-1]
+
+    def resolve(prefix):
+        matches = [c for c in commits if c.startswith(prefix)]
+        if len(matches) != 1:
+            raise ValueError(f"commit {prefix!r} matches {len(matches)} recorded commits")
+        return matches[0]
+
+    head = resolve(head) if head else commits[-1]
+    if base:
+        base = resolve(base)
+    else:
+        older = commits[:commits.index(head)]
+        if not older:
+            raise ValueError("no earlier commit recorded to compare with")
+        base = older[-1]
+
+    def values(commit):
+        rows = results[results["commit"] == commit]
+        return rows.groupby(["size", "benchmark"], sort=False)[metric].min()
+
+    table = pd.DataFrame({"base": values(base), "head": values(head)})
+    table["ratio"] = table["head"] / table["base"]
+    table.attrs.update(base=base, head=head, metric=metric)
+    return table
@@ -0,0 +1,204 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+__all__ = [
+    "generate_raw_data",
+    "synthetic_dataset",
+]
+
+COUNTRIES = ["Poland", "Germany", "France", "Spain", "Italy"]
+CHANNELS = ["online", "in-store", "mobile"]
+DEVICES = ["Android", "iOS", "Web"]
+PAYMENT_METHODS = ["credit_card", "debit_card", "mobile_payment"]
+CATEGORIES = ["grocery", "travel", "electronics", "clothing", "restaurants"]
+
+START = pd.Timestamp("2022-01-01")
+SPAN_MINUTES = 730 * 24 * 60  # two years: 2022-01-01 … 2023-12-31
+CHUNK_ROWS = 1 << 20  # transaction rows generated and written at a time
+COMPLETE = "_COMPLETE"  # marker written last by synthetic_dataset
+
+TRANSACTION_LINE = (
+    '{{"transaction_id": "TX{:09d}", "timestamp": "{}", "user_id": "U{:07d}", "merchant_id": "M{:06d}", '
+    '"amount": {!r}, "channel": "{}", "currency": "EUR", "device": "{}", '
+    '"location": {{"lat": {:.6f}, "long": {:.6f}}}, "payment_method": "{}", "is_international": {}, '
+    '"session_length_seconds": {}, "is_first_time_merchant": {}, "is_fraud": {}}}\n'
+)
+
+
+def _intercept(score: np.ndarray, rate: float) -> float:
+    """Intercept ``a`` with ``mean(sigmoid(a + score)) == rate`` (bisection)."""
+    lo, hi = -40.0, 40.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if np.mean(1 / (1 + np.exp(-(mid + score)))) < rate:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def _amounts(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Exponential amounts, a fifth of them a repeated 10.0 (exercises the within-% flags)."""
+    amount = rng.exponential(50, size).round(2)
+    amount[rng.random(size) < 0.2] = 10.0
+    return amount
+
+
+def generate_raw_data(
+    out_dir: str,
+    *,
+    n_users: int,
+    tx_per_user: int = 50,
+    fraud_rate: float = 0.08,
+    n_merchants: int | None = None,
+    seed: int = 0,
+) -> int:
+    """Write a synthetic raw data set with the competition schema to *out_dir*.
+
+    Files: ``transactions.json`` (JSON lines, nested ``location``), ``users.csv``,
+    ``merchants.csv`` and ``geo_df.csv`` – the inputs of ``load_data``. Every user has
+    exactly *tx_per_user* transactions at uniform random minutes of 2022–2023, so the
+    default ``cutoff="2023-07-01"`` splits them about 3:1.
+
+    Labels are not pure noise: the fraud log-odds grow with the merchant's alerts and
+    fraud history, the user's risk score and the amount, with the intercept solved so
+    that the expected share of frauds is *fraud_rate*. Transactions are generated and
+    written in blocks of ``CHUNK_ROWS`` rows, so memory stays flat in the row count.
+
+    :param n_merchants: default ``max(10, n_users // 10)``.
+    :return: number of transactions written.
+    """
+    rng = np.random.default_rng(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    n_merchants = n_merchants or max(10, n_users // 10)
+    n = n_users * tx_per_user
+
+    users = pd.DataFrame({
+        "user_id": [f"U{i:07d}" for i in range(n_users)],
+        "age": rng.integers(18, 80, n_users),
+        "sex": rng.choice(["Male", "Female", "Other"], n_users),
+        "education": rng.choice(["High School", "Bachelor", "Master", "PhD"], n_users),
+        "primary_source_of_income": rng.choice(["Employment", "Business", "Pension", "Student Aid"], n_users),
+        "sum_of_monthly_installments": rng.uniform(0, 1000, n_users).round(2),
+        "sum_of_monthly_expenses": rng.uniform(100, 3000, n_users).round(2),
+        "country": rng.choice(COUNTRIES, n_users),
+        "signup_date": (START - pd.to_timedelta(rng.integers(1, 5 * 365, n_users), unit="D")).strftime("%Y-%m-%d"),
+        "risk_score": rng.uniform(0, 1, n_users).round(3),
+    })
+    merchants = pd.DataFrame({
+        "merchant_id": [f"M{i:06d}" for i in range(n_merchants)],
+        "category": rng.choice(CATEGORIES, n_merchants),
+        "country": rng.choice(COUNTRIES, n_merchants),
+        "trust_score": rng.uniform(0, 1, n_merchants).round(3),
+        "number_of_alerts_last_6_months": rng.poisson(1.0, n_merchants),
+        "avg_transaction_amount": rng.uniform(10, 200, n_merchants).round(2),
+        "account_age_months": rng.integers(1, 120, n_merchants),
+        "has_fraud_history": (rng.random(n_merchants) < 0.1).astype(np.int64),
+    })
+    users.to_csv(out / "users.csv", index=False)
+    merchants.to_csv(out / "merchants.csv", index=False)
+
+    # ----- fraud propensity -----
+    merchant_score = (
+        0.4 * merchants["number_of_alerts_last_6_months"].to_numpy()
+        + 1.0 * merchants["has_fraud_history"].to_numpy()
+        - 0.8 * merchants["trust_score"].to_numpy()
+    )
+    user_score = 1.5 * users["risk_score"].to_numpy()
+    # intercept from a sample of the score the transactions will have
+    sample = min(n, 100_000)
+    log_amount = np.log1p(_amounts(rng, sample))
+    intercept = _intercept(
+        merchant_score[rng.integers(0, n_merchants, sample)]
+        + user_score[rng.integers(0, n_users, sample)]
+        + 0.5 * (log_amount - log_amount.mean()),
+        fraud_rate,
+    )
+
+    # ----- transactions + geo, chunk by chunk -----
+    geo_schema = pa.schema([
+        ("transaction_id", pa.string()),
+        ("transaction_country", pa.string()),
+        ("is_country_nan", pa.int64()),
+        ("country_merchant_distance_centroid", pa.float64()),
+        ("country_user_distance_centroid", pa.float64()),
+        ("country_merchant_distance_centroid_w", pa.float64()),
+        ("country_user_distance_centroid_w", pa.float64()),
+    ])
+    countries = np.array(COUNTRIES + [None], dtype=object)
+    channels, devices, methods = (np.array(v, dtype=object) for v in (CHANNELS, DEVICES, PAYMENT_METHODS))
+    options = pa_csv.WriteOptions(quoting_style="needed")
+    with open(out / "transactions.json", "w") as fh, \
+            pa_csv.CSVWriter(str(out / "geo_df.csv"), geo_schema, write_options=options) as geo:
+        for start in range(0, n, CHUNK_ROWS):
+            rows = np.arange(start, min(start + CHUNK_ROWS, n))
+            m = len(rows)
+            user = rows // tx_per_user
+            merchant = rng.integers(0, n_merchants, m)
+            minutes = rng.integers(0, SPAN_MINUTES, m)
+            timestamps = (START + pd.to_timedelta(minutes, unit="min")).strftime("%Y-%m-%dT%H:%M:%S")
+            amount = _amounts(rng, m)
+            logit = intercept + merchant_score[merchant] + user_score[user] + 0.5 * (np.log1p(amount) - log_amount.mean())
+            is_fraud = (rng.random(m) < 1 / (1 + np.exp(-logit))).astype(np.int64)
+            # fraud sits a little further from home
+            distance = rng.gamma(2.0, 300.0, (4, m)) * (1 + 0.5 * is_fraud)
+
+            fh.writelines(map(TRANSACTION_LINE.format, *(column.tolist() for column in (
+                rows,
+                np.asarray(timestamps),
+                user,
+                merchant,
+                amount,
+                channels[rng.integers(0, len(CHANNELS), m)],
+                devices[rng.integers(0, len(DEVICES), m)],
+                rng.uniform(35, 60, m),
+                rng.uniform(-5, 30, m),
+                methods[rng.integers(0, len(PAYMENT_METHODS), m)],
+                rng.integers(0, 2, m),
+                rng.integers(10, 600, m),
+                rng.integers(0, 2, m),
+                is_fraud,
+            ))))
+            country = countries[rng.integers(0, len(countries), m)]
+            geo.write_table(pa.table({
+                "transaction_id": [f"TX{i:09d}" for i in rows.tolist()],
+                "transaction_country": country,
+                "is_country_nan": pd.isna(country).astype(np.int64),
+                "country_merchant_distance_centroid": distance[0],
+                "country_user_distance_centroid": distance[1],
+                "country_merchant_distance_centroid_w": distance[2],
+                "country_user_distance_centroid_w": distance[3],
+            }, schema=geo_schema))
+    return n
+
+
+def synthetic_dataset(
+    root: str,
+    rows: int,
+    *,
+    tx_per_user: int = 50,
+    fraud_rate: float = 0.08,
+    seed: int = 0,
+) -> str:
+    """Directory of a generated data set with about *rows* transactions, generated on first use.
+
+    The data lives in ``root/synthetic-<rows>-<tx_per_user>-<fraud_rate>-<seed>``; a
+    ``_COMPLETE`` marker (holding the generation parameters) is written last, so an
+    interrupted generation is redone rather than reused.
+    """
+    params = {
+        "n_users": max(1, rows // tx_per_user),
+        "tx_per_user": tx_per_user,
+        "fraud_rate": fraud_rate,
+        "seed": seed,
+    }
+    path = Path(root) / f"synthetic-{rows}-{tx_per_user}-{fraud_rate}-{seed}"
+    if not (path / COMPLETE).exists():
+        params["rows"] = generate_raw_data(path, **params)
+        (path / COMPLETE).write_text(json.dumps(params))
+    return str(path)
@@ -1,2 +1,5 @@
 from .prepare import prepare_model_data
-__all__ = ["prepare_model_data"]
\ No newline at end of file
+from .transformer import FeatureTransformer
+from .feature_builders import FeatureBuilder, RateStore, expanding_rate
+from .categories import fit_categories, apply_categories, categories_of, save_categories, load_categories
+__all__ = ["prepare_model_data", "FeatureTransformer", "FeatureBuilder", "RateStore", "expanding_rate", "fit_categories", "apply_categories", "categories_of", "save_categories", "load_categories"]
\ No newline at end of file
@@ -0,0 +1,47 @@
+import json
+import pandas as pd
+
+__all__ = [
+    "fit_categories",
+    "apply_categories",
+    "categories_of",
+    "save_categories",
+    "load_categories",
+]
+
+
+def fit_categories(df: pd.DataFrame, columns: list) -> dict:
+    """Frozen vocabulary ``{column: sorted levels}`` of the values observed in *df*."""
+    return {col: sorted(str(level) for level in pd.unique(df[col].dropna())) for col in columns}
+
+
+def apply_categories(df: pd.DataFrame, categories: dict) -> pd.DataFrame:
+    """Cast the vocabulary columns of *df* to ``category`` with exactly the frozen levels.
+
+    Codes are positions in the vocabulary, so every frame cast with the same vocabulary
+    (train, test, a serving batch) has the same encoding; levels outside the vocabulary
+    become missing. Returns a new frame.
+    """
+    columns = {}
+    for col, levels in categories.items():
+        if col in df:
+            values = df[col].astype(object)
+            values = values.mask(values.notna(), values.astype(str))  # levels are stored as str
+            columns[col] = values.astype(pd.CategoricalDtype(levels))
+    return df.assign(**columns)
+
+
+def categories_of(X: pd.DataFrame) -> dict:
+    """The vocabulary carried by the ``category`` columns of *X* (e.g. a prepared X_train)."""
+    return {col: list(dtype.categories) for col, dtype in X.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+
+
+def save_categories(categories: dict, path: str):
+    """Persist a vocabulary as JSON (kept next to the model it was trained with)."""
+    with open(path, "w") as fh:
+        json.dump(categories, fh, indent=2)
+
+
+def load_categories(path: str) -> dict:
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,394 @@
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "FeatureBuilder",
+    "RateStore",
+    "expanding_rate",
+]
+
+# Decay exponent cap (natural-log units, ~87 half-lives): a longer gap counts as this one.
+# exp(-60) is far below float32 resolution, so newer events are unaffected, while a key that
+# has been idle for a long time keeps its last rate instead of underflowing to 0 / 0.
+_MAX_DECAY = 60.0
+
+
+class _Timeline:
+    """Dense ranks of the timestamps (one global sort), shared by every key and window."""
+
+    def __init__(self, times: np.ndarray):
+        self.order = np.argsort(times, kind="stable")
+        self.sorted = times[self.order]
+        new = np.ones(len(times), dtype=bool)
+        new[1:] = self.sorted[1:] != self.sorted[:-1]
+        self.uniq = self.sorted[new]
+        self.ranks = np.empty(len(times), dtype=np.int64)
+        self.ranks[self.order] = np.cumsum(new) - 1
+
+    def lower_ranks(self, width: int) -> np.ndarray:
+        """Per row, the rank of the first distinct timestamp ``>= time - width``.
+
+        Queried in time order, so the binary searches walk *uniq* monotonically.
+        """
+        lower = np.empty(len(self.sorted), dtype=np.int64)
+        lower[self.order] = np.searchsorted(self.uniq, self.sorted - width, side="left")
+        return lower
+
+
+class _SortedGroups:
+    """Rows ordered by ``(key, time)`` once, with the group bounds every window reuses.
+
+    The key's codes and the timestamp ranks pack into one int64 (``(code + 1) * span +
+    rank``), so the order is a single stable ``argsort`` – ties keep input order – and a
+    time window start is one ``searchsorted`` on that packed key. ``start`` is the sorted
+    position of each row's group start and ``null`` marks rows with a missing key.
+    """
+
+    def __init__(self, keys: pd.Series, timeline: _Timeline):
+        codes, _ = pd.factorize(keys)
+        self.span = len(timeline.uniq) + 1
+        key = (codes.astype(np.int64) + 1) * self.span + timeline.ranks
+        self.order = np.argsort(key, kind="stable")
+        self.key = key[self.order]
+        self.codes = codes[self.order]
+        self.null = self.codes < 0
+        n = len(self.codes)
+        self.pos = np.arange(n)
+        first = np.ones(n, dtype=bool)
+        first[1:] = self.codes[1:] != self.codes[:-1]
+        self.first = first
+        self.starts = np.flatnonzero(first)
+        self.start = np.maximum.accumulate(np.where(first, self.pos, 0))
+        self._rank = None
+
+    def row_window(self, n_rows: int) -> np.ndarray:
+        """First sorted position of the previous *n_rows* rows of the same group."""
+        return np.maximum(self.start, self.pos - n_rows)
+
+    def time_window(self, lower_ranks: np.ndarray) -> np.ndarray:
+        """First sorted position of the same group at or after each row's lower time rank.
+
+        The queries are non-decreasing in sorted order (by group, then time), so this is
+        a single monotone ``searchsorted`` pass.
+        """
+        lower = (self.codes.astype(np.int64) + 1) * self.span + lower_ranks[self.order]
+        return np.searchsorted(self.key, lower, side="left")
+
+    def prefix(self, values: np.ndarray) -> np.ndarray:
+        """Exclusive prefix sums (length n + 1) that restart at every group start.
+
+        Subtracting each group's total on its last row brings the running sum back to ~0
+        before the next group, so it stays at the magnitude of one group and
+        ``prefix[i] - prefix[start]`` is accurate on tens of millions of rows.
+        """
+        values = values.astype(np.float64)
+        reset = values.copy()
+        reset[self.starts[1:] - 1] -= np.add.reduceat(values, self.starts)[:-1]
+        return np.concatenate(([0.0], np.cumsum(reset)))
+
+    def unsort(self, values: np.ndarray, out: np.ndarray):
+        """Write sorted-order *values* into *out* in input row order; missing-key rows get NaN."""
+        if self._rank is None:
+            self._rank = np.empty(len(self.order), dtype=np.int64)
+            self._rank[self.order] = self.pos
+        values[self.null] = np.nan
+        np.take(values, self._rank, out=out)
+
+
+# ----- as-of rates -----
+def _decay_rate(half_life) -> float | None:
+    """Decay constant per nanosecond of a pandas time span (None → no decay)."""
+    return None if half_life is None else np.log(2) / pd.Timedelta(half_life).value
+
+
+def _as_of_counts(label: np.ndarray, times: np.ndarray, first: np.ndarray, decay: float | None):
+    """Weighted fraud and labelled counts of each row's **earlier** rows in its group.
+
+    Rows are sorted by (group, time) and *first* marks the group starts; unlabelled rows
+    (NaN) count for nothing. Without *decay* every earlier row weighs 1 and the counts are
+    shifted prefix sums. With it a row of age ``a`` weighs ``exp(-decay * a)``: the counts
+    are ``logaddexp`` accumulations over a monotone log-time, so no exponential overflows.
+    Each group starts ``_MAX_DECAY`` above the previous one, so the previous groups weigh
+    at most ``exp(-_MAX_DECAY)`` relative to the group's own rows; counts whose exact
+    (undecayed) value is 0 are set to 0, so a group without labelled earlier rows gets
+    nothing from its predecessors.
+    """
+    labelled = ~np.isnan(label)
+    frauds = np.where(labelled, label, 0.0)
+    n = len(label)
+    pos = np.arange(n)
+    start = np.maximum.accumulate(np.where(first, pos, 0))
+    fraud_counts = np.concatenate(([0.0], np.cumsum(frauds)))
+    seen_counts = np.concatenate(([0], np.cumsum(labelled)))
+    fraud_counts = fraud_counts[pos] - fraud_counts[start]
+    seen_counts = (seen_counts[pos] - seen_counts[start]).astype(np.float64)
+    if decay is None:
+        return fraud_counts, seen_counts
+
+    steps = np.minimum(np.diff(times, prepend=times[:1]) * decay, _MAX_DECAY)
+    log_time = np.cumsum(np.where(first, _MAX_DECAY, steps))
+    with np.errstate(divide="ignore"):
+        log_frauds = np.logaddexp.accumulate(log_time + np.log(frauds))
+    log_seen = np.logaddexp.accumulate(np.where(labelled, log_time, -np.inf))
+    fraud_sums = np.exp(np.concatenate(([-np.inf], log_frauds[:-1])) - log_time)
+    seen = np.exp(np.concatenate(([-np.inf], log_seen[:-1])) - log_time)
+    fraud_sums[fraud_counts == 0] = 0.0
+    seen[seen_counts == 0] = 0.0
+    return fraud_sums, seen
+
+
+def _smoothed(frauds: np.ndarray, seen: np.ndarray, prior, smoothing: float) -> np.ndarray:
+    """``(frauds + smoothing * prior) / (seen + smoothing)``; NaN without any weight."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if not smoothing:
+            return frauds / seen
+        return (frauds + smoothing * prior) / (seen + smoothing)
+
+
+def _global_rate(label: np.ndarray, times: np.ndarray, timeline: _Timeline, decay: float | None) -> np.ndarray:
+    """As-of fraud rate of all earlier rows (input order): the default smoothing prior."""
+    first = np.zeros(len(label), dtype=bool)
+    first[:1] = True
+    frauds, seen = _as_of_counts(label[timeline.order], times[timeline.order], first, decay)
+    rate = np.empty(len(label))
+    rate[timeline.order] = _smoothed(frauds, seen, None, 0.0)
+    return rate
+
+
+def _as_of_rate(groups: _SortedGroups, label, times, prior, smoothing: float, decay: float | None) -> np.ndarray:
+    """As-of rate of each row's group, in sorted order (NaN for missing keys is left to the caller)."""
+    frauds, seen = _as_of_counts(label[groups.order], times[groups.order], groups.first, decay)
+    if np.ndim(prior):
+        prior = prior[groups.order]
+    return _smoothed(frauds, seen, prior, smoothing)
+
+
+def expanding_rate(
+    df: pd.DataFrame,
+    key: str,
+    *,
+    target: str = "is_fraud",
+    time_col: str = "timestamp",
+    smoothing: float = 0.0,
+    half_life: str | None = None,
+    prior: float | None = None,
+) -> pd.Series:
+    """Leakage-free fraud rate of each row's *key* (merchant, user, …) as of that row.
+
+    Only the key's **earlier** rows count – earlier timestamp, or the same one earlier in
+    *df* – so no row sees its own label or a later one and the value does not depend on
+    where a train / test cutoff falls: compute it once over the whole history and split
+    afterwards. One sort and shifted cumulative counts, O(n) after the sort.
+
+    Parameters
+    ----------
+    df : frame with *key*, *target* (0/1, NaN = unlabelled) and *time_col*
+    smoothing : weight ``m`` of the prior, ``(frauds + m * prior) / (seen + m)``
+    half_life : pandas time span; an earlier row of age ``a`` weighs ``0.5 ** (a / half_life)``
+    prior : rate smoothed towards; None → the as-of rate over all keys (itself leakage-free)
+
+    Returns
+    -------
+    pd.Series aligned with *df*; NaN where the key is missing or has no (smoothed) history.
+    See :class:`RateStore` for the same rates updated one event at a time.
+    """
+    times = pd.to_datetime(df[time_col]).to_numpy("datetime64[ns]").view(np.int64)
+    label = df[target].to_numpy(dtype=np.float64, na_value=np.nan)
+    timeline = _Timeline(times)
+    decay = _decay_rate(half_life)
+    if prior is None and smoothing:
+        prior = _global_rate(label, times, timeline, decay)
+    groups = _SortedGroups(df[key], timeline)
+    rate = np.empty(len(df))
+    groups.unsort(_as_of_rate(groups, label, times, prior, smoothing, decay), rate)
+    return pd.Series(rate, index=df.index, name=f"{key}_rate")
+
+
+class RateStore:
+    """:func:`expanding_rate` kept up to date one labelled event at a time (serving).
+
+    Per key it holds the (decayed) fraud and labelled counts and the time they refer to;
+    :meth:`rate` decays them to the query time and applies the smoothing, so a query
+    made right before an event's label is added equals the batch value of that row.
+
+    Parameters
+    ----------
+    smoothing, half_life, prior : as in :func:`expanding_rate`
+    """
+
+    def __init__(self, *, smoothing: float = 0.0, half_life: str | None = None, prior: float | None = None):
+        self.smoothing = smoothing
+        self.half_life = half_life
+        self.prior = prior
+        self._decay = _decay_rate(half_life)
+        self._counts = {}  # key -> [time_ns, frauds, seen]
+        self._total = [None, 0.0, 0.0]
+
+    @classmethod
+    def from_history(
+        cls,
+        df: pd.DataFrame,
+        key: str,
+        *,
+        target: str = "is_fraud",
+        time_col: str = "timestamp",
+        **kwargs,
+    ) -> "RateStore":
+        """Store holding every labelled row of *df* (vectorised, same counts as replaying it)."""
+        store = cls(**kwargs)
+        if df.empty:
+            return store
+        times = pd.to_datetime(df[time_col]).to_numpy("datetime64[ns]").view(np.int64)
+        label = df[target].to_numpy(dtype=np.float64, na_value=np.nan)
+        timeline = _Timeline(times)
+        first = np.zeros(len(df), dtype=bool)
+        first[:1] = True
+        store._total = store._last_counts(label[timeline.order], times[timeline.order], first)[0]
+        groups = _SortedGroups(df[key], timeline)
+        counts = store._last_counts(label[groups.order], times[groups.order], groups.first)
+        keys = pd.factorize(df[key])[1]
+        store._counts = {
+            keys[code]: state for code, state in zip(groups.codes[groups.starts], counts) if code >= 0
+        }
+        return store
+
+    def _last_counts(self, label, times, first) -> list:
+        """``[time_ns, frauds, seen]`` of each group after its last row (inclusive)."""
+        frauds, seen = _as_of_counts(label, times, first, self._decay)
+        last = np.append(np.flatnonzero(first)[1:], len(label)) - 1
+        labelled = ~np.isnan(label[last])
+        frauds = frauds[last] + np.where(labelled, label[last], 0.0)
+        seen = seen[last] + labelled
+        return [[int(t), float(f), float(s)] for t, f, s in zip(times[last], frauds, seen)]
+
+    def _decayed(self, counts: list, time_ns: int) -> tuple:
+        """``(frauds, seen)`` of *counts* at *time_ns*."""
+        ref, frauds, seen = counts
+        if self._decay is None or ref is None:
+            return frauds, seen
+        factor = np.exp(-min(max(time_ns - ref, 0) * self._decay, _MAX_DECAY))
+        return frauds * factor, seen * factor
+
+    def _add(self, counts: list, time_ns: int, label: float):
+        if self._decay is not None and counts[0] is not None and time_ns < counts[0]:
+            # late event: weigh it as of the stored time
+            label_weight = np.exp(-min((counts[0] - time_ns) * self._decay, _MAX_DECAY))
+            counts[1] += label * label_weight
+            counts[2] += label_weight
+            return
+        counts[1], counts[2] = self._decayed(counts, time_ns)
+        counts[0] = time_ns
+        counts[1] += label
+        counts[2] += 1.0
+
+    def update(self, key, timestamp, label):
+        """Add one labelled event (unlabelled ones – None / NaN – are ignored)."""
+        label = float(np.nan if label is None else label)
+        if np.isnan(label):
+            return
+        time_ns = pd.Timestamp(timestamp).value
+        self._add(self._total, time_ns, label)
+        if key is not None and not pd.isna(key):
+            self._add(self._counts.setdefault(key, [None, 0.0, 0.0]), time_ns, label)
+
+    def rate(self, key, timestamp) -> float:
+        """As-of rate of *key* at *timestamp* from the events added so far (NaN without history)."""
+        if key is None or pd.isna(key):
+            return np.nan
+        time_ns = pd.Timestamp(timestamp).value
+        prior = self.prior
+        if prior is None and self.smoothing:
+            prior = _smoothed(*map(np.float64, self._decayed(self._total, time_ns)), None, 0.0)
+        frauds, seen = self._decayed(self._counts.get(key, [None, 0.0, 0.0]), time_ns)
+        return float(_smoothed(np.float64(frauds), np.float64(seen), prior, self.smoothing))
+
+
+class FeatureBuilder:
+    """Per-user rolling amount windows and leakage-free fraud rates in one sorted pass per key.
+
+    For every window the user's **previous** transactions (the current one excluded)
+    give ``count_last_{w}`` (non-missing amounts), ``sum_last_{w}`` and ``mean_last_{w}``;
+    all three are missing when the window holds no previous amount. A window
+    is a number of transactions (``5``) or a time span (``"1h"``, ``"24h"``, ``"7d"``:
+    previous transactions with ``timestamp >= t - span``).
+
+    ``merchant_bad_rate`` is the fraud rate of the merchant's previous transactions and
+    ``user_good_rate`` one minus the user's (:func:`expanding_rate`, optionally smoothed
+    and time-decayed), so no row sees its own label or a later one.
+
+    The frame is sorted once by (user, timestamp) and once by (merchant, timestamp); every
+    window is then a start offset per row and a difference of per-group prefix sums, so
+    adding a window costs a few vector operations instead of another ``rolling()`` pass.
+
+    Parameters
+    ----------
+    windows : list of int or str – transaction counts and/or pandas time spans
+    user_col, merchant_col, amount_col, target, time_col : column names
+    smoothing, half_life : of the rates, as in :func:`expanding_rate`
+    """
+
+    def __init__(
+        self,
+        windows: list = (5, 10),
+        *,
+        user_col: str = "user_id",
+        merchant_col: str = "merchant_id",
+        amount_col: str = "amount",
+        target: str = "is_fraud",
+        time_col: str = "timestamp",
+        smoothing: float = 0.0,
+        half_life: str | None = None,
+    ):
+        self.windows = list(windows)
+        self.user_col = user_col
+        self.merchant_col = merchant_col
+        self.amount_col = amount_col
+        self.target = target
+        self.time_col = time_col
+        self.smoothing = smoothing
+        self.half_life = half_life
+
+    def fit(self, df: pd.DataFrame) -> "FeatureBuilder":
+        """Nothing to learn: every feature only looks at earlier rows of *df*."""
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """*df* with the window and rate columns added (same rows, same order)."""
+        times = pd.to_datetime(df[self.time_col]).to_numpy("datetime64[ns]").view(np.int64)
+        timeline = _Timeline(times)
+        names = [f"{stat}_last_{window}" for window in self.windows for stat in ("count", "sum", "mean")]
+        names += ["merchant_bad_rate", "user_good_rate"]
+        # one row per feature: each becomes a column of the result without another copy
+        out = np.empty((len(names), len(df)), dtype=np.float64)
+
+        # ----- user windows -----
+        users = _SortedGroups(df[self.user_col], timeline)
+        amount = df[self.amount_col].to_numpy(dtype=np.float64, na_value=np.nan)[users.order]
+        valid = ~np.isnan(amount)
+        sums = users.prefix(np.where(valid, amount, 0.0))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        for j, window in enumerate(self.windows):
+            if isinstance(window, (int, np.integer)):
+                start = users.row_window(int(window))
+            else:
+                start = users.time_window(timeline.lower_ranks(pd.Timedelta(window).value))
+            count = (counts[users.pos] - counts[start]).astype(np.float64)
+            count[count == 0] = np.nan
+            total = sums[users.pos] - sums[start]
+            users.unsort(count, out[3 * j])
+            users.unsort(np.where(np.isnan(count), np.nan, total), out[3 * j + 1])
+            users.unsort(total / count, out[3 * j + 2])
+
+        # ----- leakage-free rates -----
+        label = df[self.target].to_numpy(dtype=np.float64, na_value=np.nan)
+        decay = _decay_rate(self.half_life)
+        prior = _global_rate(label, times, timeline, decay) if self.smoothing else None
+        merchants = _SortedGroups(df[self.merchant_col], timeline)
+        merchants.unsort(_as_of_rate(merchants, label, times, prior, self.smoothing, decay), out[-2])
+        users.unsort(1.0 - _as_of_rate(users, label, times, prior, self.smoothing, decay), out[-1])
+        columns = {col: df[col] for col in df.columns}
+        columns.update(zip(names, out))
+        return pd.DataFrame(columns, index=df.index, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
@@ -1,7 +1,20 @@
 import pandas as pd
-from datetime import datetime
+from src.features.transformer import FeatureTransformer
+from src.profiling import profile_step, profiled
 
 
+def drop_first_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove the earliest transaction of each user."""
+    first_idx = (
+        df.sort_values(["user_id", "timestamp"])  # sort chronologically per user
+        .groupby("user_id", observed=True)
+        .head(1)
+        .index
+    )
+    return df.drop(index=first_idx)
+
+
+@profiled
 def prepare_model_data(
     df: pd.DataFrame,
     *,
@@ -10,64 +23,79 @@ def prepare_model_data(
     to_categorize: list,
     cutoff: str = "2023-07-01",
     target: str = "is_fraud",
+    encoding: str = "onehot",
+    categories: dict | None = None,
+    bad_rate: str = "train",
+    smoothing: float = 0.0,
+    half_life: str | None = None,
+    return_transformer: bool = False,
 ):
     """
 
     Steps:
     1. Remove the first transaction of each user.
-    2. Drop columns listed in *to_drop* and *to_think_but_drop*.
-    3. One‑hot encode columns listed in *to_categorize* (no drop_first).
-    4. Cast boolean columns to int.
-    5. Split the data by *cutoff* timestamp (< for train, >= for test).
-    6. Compute per‑merchant fraud rate (bad_rate) and merge into X.
-    7. Drop helper columns (merchant_id, total_transactions, num_frauds, timestamp).
+    2. Split the data by *cutoff* timestamp (< for train, >= for test).
+    3. Fit a :class:`~src.features.transformer.FeatureTransformer` on the training window:
+       per‑merchant fraud rate (bad_rate), category vocabularies and column order.
+    4. Transform both windows: drop *to_drop* / *to_think_but_drop*, encode *to_categorize*
+       one-hot (no drop_first; ``encoding="onehot"``) or as ``category`` columns
+       (``encoding="native"``; train with ``enable_categorical`` – ``train_model`` sets it),
+       cast booleans to int8, merge bad_rate and drop merchant_id / timestamp / target.
+    5. Compact the matrices (:func:`~src.ingestion.schema.compact_features`) with the
+       dtypes fixed at fit: dummies and flags uint8, everything else float32 – the same
+       in both windows, and the values XGBoost sees are unchanged.
+
+    Nothing is learned from the test window: merchants first seen after *cutoff* have a
+    missing bad_rate and unseen levels no dummy. *categories* freezes the vocabulary.
+
+    ``bad_rate="asof"`` replaces the training-window table by each row's leakage-free
+    expanding merchant rate (optionally *smoothing* towards the global rate and decayed
+    with *half_life*). It is computed over all of *df* before step 1 and does not depend
+    on *cutoff*, so a *df* that already has the column (``transformer.add_bad_rate(df)``)
+    is reused as is – one computation for any number of cutoffs.
 
     Returns
     -------
     X_train, y_train, X_test, y_test : tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]
+        followed by the fitted transformer when *return_transformer* is set (persist it
+        next to the model with ``transformer.save(path)``).
     """
-    df = df.copy()
-
-    # Step 1: remove the earliest transaction per user
-    first_idx = (
-        df.sort_values(["user_id", "timestamp"])  # sort chronologically per user
-        .groupby("user_id")
-        .head(1)
-        .index
+    transformer = FeatureTransformer(
+        to_drop=to_drop,
+        to_think_but_drop=to_think_but_drop,
+        to_categorize=to_categorize,
+        target=target,
+        encoding=encoding,
+        categories=categories,
+        bad_rate=bad_rate,
+        smoothing=smoothing,
+        half_life=half_life,
     )
-    df = df.drop(index=first_idx)
-
-    # Step 2: drop columns
-    df = df.drop(columns=to_drop, errors="ignore")
-    df = df.drop(columns=to_think_but_drop, errors="ignore")
-
-    # Step 3: one-hot encode categoricals
-    df = pd.get_dummies(df, columns=to_categorize, drop_first=False)
+    if bad_rate == "asof" and "bad_rate" not in df:
+        with profile_step("asof_bad_rate", rows_in=len(df)):
+            df = transformer.add_bad_rate(df)
 
-    # Step 4: boolean → int
-    for col in df.select_dtypes(include="bool").columns:
-        df[col] = df[col].astype(int)
-
-    # Step 5: split by timestamp
-    cutoff_ts = pd.to_datetime(cutoff)
-    df_train = df[df["timestamp"] < cutoff_ts]
-    df_test = df[df["timestamp"] >= cutoff_ts]
-
-    # Step 6: per‑merchant bad rate
-    bad = (
-        df.groupby("merchant_id")[target]
-        .agg(total_transactions="count", num_frauds="sum")
-    )
-    bad["bad_rate"] = bad["num_frauds"] / bad["total_transactions"]
-
-    def _add_bad_rate(X: pd.DataFrame) -> pd.DataFrame:
-        X = X.merge(bad, on="merchant_id", how="left")
-        return X.drop(["merchant_id", "total_transactions", "num_frauds"], axis=1)
+    # Step 1: remove the earliest transaction per user
+    with profile_step("drop_first", rows_in=len(df)) as step:
+        df = drop_first_transactions(df)
+        step["rows_out"] = len(df)
 
-    X_train = _add_bad_rate(df_train).drop(columns=[target, "timestamp"])
-    X_test = _add_bad_rate(df_test).drop(columns=[target, "timestamp"])
+    # Step 2: split by timestamp
+    with profile_step("split", rows_in=len(df)):
+        cutoff_ts = pd.to_datetime(cutoff)
+        df_train = df[df["timestamp"] < cutoff_ts]
+        df_test = df[df["timestamp"] >= cutoff_ts]
 
+    # Steps 3-5: fit on the training window, transform both
+    with profile_step("fit", rows_in=len(df_train)):
+        transformer.fit(df_train)
+    with profile_step("transform_train", rows_in=len(df_train)):
+        X_train = transformer.transform(df_train)
+    with profile_step("transform_test", rows_in=len(df_test)):
+        X_test = transformer.transform(df_test)
     y_train = df_train[target]
     y_test = df_test[target]
 
+    if return_transformer:
+        return X_train, y_train, X_test, y_test, transformer
     return X_train, y_train, X_test, y_test
@@ -0,0 +1,197 @@
+import joblib
+import numpy as np
+import pandas as pd
+from src.ingestion.schema import compact_dtypes, compact_features
+from src.preprocessing.helpers import to_float
+from src.features.categories import fit_categories, apply_categories
+from src.features.feature_builders import expanding_rate, RateStore
+
+__all__ = [
+    "ENCODINGS",
+    "BAD_RATES",
+    "FeatureTransformer",
+    "merchant_bad_rate",
+]
+
+ENCODINGS = ("onehot", "native")
+BAD_RATES = ("train", "asof")
+
+
+def merchant_bad_rate(df: pd.DataFrame, target: str = "is_fraud") -> pd.DataFrame:
+    """Per-merchant fraud rate: ``total_transactions``, ``num_frauds`` and ``bad_rate``."""
+    bad = (
+        df.groupby("merchant_id", observed=True)[target]
+        .agg(total_transactions="count", num_frauds="sum")
+    )
+    bad["bad_rate"] = bad["num_frauds"] / bad["total_transactions"]
+    return bad
+
+
+class FeatureTransformer:
+    """Processed transactions → model matrix, with every statistic learned by :meth:`fit`.
+
+    ``fit`` sees the training window only and learns the merchant ``bad_rate`` table, the
+    category vocabularies of *to_categorize*, the output column order and dtypes. ``transform``
+    then applies them to any frame (test window, a scoring batch) and ``transform_row``
+    to one row dict, so nothing is recomputed from history at inference time and the
+    columns always line up with the training matrix. Merchants unseen in training get a
+    missing ``bad_rate``; levels outside the vocabulary get no dummy (native: missing).
+
+    With ``bad_rate="asof"`` no table is learned: ``bad_rate`` is the merchant's
+    leakage-free expanding rate (:func:`~src.features.feature_builders.expanding_rate`),
+    computed once over the whole history by :meth:`add_bad_rate` and passed through.
+
+    Parameters
+    ----------
+    to_drop, to_think_but_drop : columns removed before encoding
+    to_categorize : columns one-hot (``encoding="onehot"``) or natively (``"native"``) encoded
+    target : label column, excluded from the matrix
+    encoding : {"onehot", "native"}, default "onehot"
+    categories : frozen vocabulary to use instead of the levels seen by ``fit``
+    bad_rate : {"train", "asof"}, default "train"
+    smoothing, half_life : of the ``"asof"`` rate, as in ``expanding_rate``
+    """
+
+    def __init__(
+        self,
+        *,
+        to_drop: list = (),
+        to_think_but_drop: list = (),
+        to_categorize: list = (),
+        target: str = "is_fraud",
+        encoding: str = "onehot",
+        categories: dict | None = None,
+        bad_rate: str = "train",
+        smoothing: float = 0.0,
+        half_life: str | None = None,
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"unknown encoding {encoding!r}, expected one of {ENCODINGS}")
+        if bad_rate not in BAD_RATES:
+            raise ValueError(f"unknown bad_rate {bad_rate!r}, expected one of {BAD_RATES}")
+        self.to_drop = list(to_drop)
+        self.to_think_but_drop = list(to_think_but_drop)
+        self.to_categorize = list(to_categorize)
+        self.target = target
+        self.encoding = encoding
+        self.categories = categories
+        self.bad_rate = bad_rate
+        self.smoothing = smoothing
+        self.half_life = half_life
+
+    def fit(self, df: pd.DataFrame) -> "FeatureTransformer":
+        """Learn vocabularies, ``bad_rate`` and column order from the training window *df*."""
+        self.categories_ = self.categories or fit_categories(df, self.to_categorize)
+        if self.bad_rate == "asof":
+            self.bad_rate_ = pd.Series(dtype=np.float64, index=pd.Index([], dtype=object))
+        else:
+            bad = merchant_bad_rate(df, self.target)["bad_rate"]
+            self.bad_rate_ = bad.set_axis(bad.index.astype(object))
+        # the fixed vocabulary decides the columns, so an empty frame is enough
+        empty = self._frame(df.iloc[:0])
+        self.columns_ = list(empty.columns)
+        self.feature_names_ = [col for col, dtype in empty.dtypes.items() if _is_feature(dtype)]
+        # decided once, from the dtypes: train and test matrices get the same ones
+        self.dtypes_ = compact_dtypes(empty)
+        self._layout()
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Model matrix of *df* (compact dtypes, :attr:`columns_` order, index of *df*)."""
+        return compact_features(self._frame(df), self.dtypes_).reindex(columns=self.columns_)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def add_bad_rate(self, history: pd.DataFrame) -> pd.DataFrame:
+        """*history* with the ``"asof"`` ``bad_rate`` column, computed over all of it at once.
+
+        The rate only looks at earlier rows, so it is the same whatever the cutoff: add it
+        before splitting and reuse the frame for every split of a backtest.
+        """
+        rate = expanding_rate(
+            history, "merchant_id", target=self.target, smoothing=self.smoothing, half_life=self.half_life
+        )
+        return history.assign(bad_rate=rate.to_numpy())
+
+    def rate_store(self, history: pd.DataFrame) -> RateStore:
+        """Incremental store of the ``"asof"`` rate seeded with *history* (serving)."""
+        return RateStore.from_history(
+            history, "merchant_id", target=self.target, smoothing=self.smoothing, half_life=self.half_life
+        )
+
+    def _frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        X = df.drop(columns=self.to_drop + self.to_think_but_drop, errors="ignore")
+        X = apply_categories(X, {col: self.categories_[col] for col in self.to_categorize})
+        if self.encoding == "onehot":
+            # every vocabulary level gets a column, observed or not
+            X = pd.get_dummies(X, columns=self.to_categorize, drop_first=False, dtype=np.uint8)
+        flags = X.select_dtypes(include="bool").columns
+        X[flags] = X[flags].astype(np.int8)
+        if self.bad_rate == "asof":
+            if "bad_rate" not in X:
+                raise ValueError('bad_rate="asof" needs the bad_rate column, see FeatureTransformer.add_bad_rate')
+            bad_rate = X.pop("bad_rate").to_numpy()
+        else:
+            bad_rate = self.bad_rate_.reindex(X["merchant_id"].astype(object)).to_numpy()
+        X = X.drop(columns=["merchant_id", self.target, "timestamp"], errors="ignore")
+        X["bad_rate"] = bad_rate
+        return X
+
+    # ----- single row -----
+    def _layout(self):
+        """Positions in :attr:`feature_names_` for the vectorised single-row path."""
+        position = {name: i for i, name in enumerate(self.feature_names_)}
+        # one-hot: (column, level) -> position; native: column -> (position, {level: code});
+        # every other column is numeric
+        self._dummies = {}
+        self._codes = {}
+        for col, levels in self.categories_.items():
+            if col in position:
+                self._codes[col] = (position.pop(col), {str(level): code for code, level in enumerate(levels)})
+                continue
+            for level in levels:
+                name = f"{col}_{level}"
+                if name in position:
+                    self._dummies[(col, str(level))] = position.pop(name)
+        # "asof": bad_rate comes with the row, like any numeric column
+        self._bad_rate_pos = position.pop("bad_rate", None) if self.bad_rate == "train" else None
+        self._numeric = list(position.items())
+        self._onehot = [col for col in self.categories_ if col not in self._codes]
+        self._bad_rate = self.bad_rate_.to_dict()
+        self._template = np.full(len(self.feature_names_), np.nan)
+        self._template[list(self._dummies.values())] = 0.0
+
+    def transform_row(self, row: dict) -> np.ndarray:
+        """float32 feature vector (:attr:`feature_names_` order) of one processed row dict.
+
+        Gives the same values as the matching row of :meth:`transform` without building
+        a DataFrame – a dict lookup per column.
+        """
+        vec = self._template.copy()
+        for name, pos in self._numeric:
+            vec[pos] = to_float(row.get(name))
+        for col in self._onehot:
+            pos = self._dummies.get((col, str(row.get(col))))
+            if pos is not None:
+                vec[pos] = 1.0
+        for col, (pos, codes) in self._codes.items():
+            vec[pos] = codes.get(str(row.get(col)), np.nan)
+        if self._bad_rate_pos is not None:
+            vec[self._bad_rate_pos] = to_float(self._bad_rate.get(row.get("merchant_id")))
+        # float32, like the training matrix and what the booster reads
+        return vec.astype(np.float32)
+
+    # ----- persistence -----
+    def save(self, path: str):
+        """Pickle the fitted transformer (kept next to the model it was trained with)."""
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str) -> "FeatureTransformer":
+        return joblib.load(path)
+
+
+def _is_feature(dtype) -> bool:
+    """Numeric and category columns are model inputs; keys such as ``transaction_id`` are not."""
+    return isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(dtype)
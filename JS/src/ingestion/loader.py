@@ -1,25 +1,235 @@
+import io
+import json
+from typing import Iterator
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
+import pyarrow as pa
+import pyarrow.json as pa_json
+from src.profiling import profiled
+from .schema import compact_frame
 
+# Arrow → pandas dtypes, same as read_json(..., dtype_backend="numpy_nullable")
+NULLABLE_DTYPES = {
+    pa.int64(): pd.Int64Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype(),
+}
 
-def load_data(data_dir: str) -> pd.DataFrame:
+# Nested fields pinned while parsing; everything else is inferred
+TRANSACTION_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ns")),
+    ("location", pa.struct([("lat", pa.float64()), ("long", pa.float64())])),
+])
+LOCATION_COLUMNS = ["location_lat", "location_long"]
+
+
+DEFAULT_BLOCK_SIZE = 64 << 20  # bytes of JSON per streamed chunk
+
+
+def _parse_options() -> pa_json.ParseOptions:
+    return pa_json.ParseOptions(explicit_schema=TRANSACTION_SCHEMA, unexpected_field_behavior="infer")
+
+
+def _file_columns(path: str) -> list:
+    """Keys of the file's first record, in the order written."""
+    with open(path) as fh:
+        return list(json.loads(fh.readline()))
+
+
+def _column_order(table: pa.Table, first: list) -> list:
+    """Every column of *table*: the keys of the first record in file order, then the rest.
+
+    The Arrow reader puts the explicit schema fields first; the first record only
+    restores the file's order, so keys it lacks (or writes as omitted nulls) are kept.
     """
-    Load and merge merchants, users, transactions, and geo data into a single DataFrame.
+    names = table.column_names
+    return [name for name in first if name in names] + [name for name in names if name not in first]
+
+
+def _to_frame(table: pa.Table, first: list) -> pd.DataFrame:
+    """Arrow transactions → pandas, with ``location`` replaced by its flat float64 fields."""
+    columns = _column_order(table, first)
+    df = table.drop_columns(["location"]).to_pandas(types_mapper=NULLABLE_DTYPES.get)
+    position = columns.index("location")
+    df = df[columns[:position] + columns[position + 1:]]
+
+    location = table.column("location").combine_chunks()
+    for offset, (flat, values) in enumerate(zip(LOCATION_COLUMNS, location.flatten())):
+        df.insert(position + offset, flat, values.to_numpy(zero_copy_only=False))
+    return df
+
+
+def read_transactions(path: str) -> pd.DataFrame:
+    """
+    Read transactions JSON-lines with the Arrow reader, flattening ``location`` while parsing.
+
+    ``location.lat`` / ``location.long`` become float64 columns ``location_lat`` /
+    ``location_long`` in place of the nested dict column, so no per-row Python objects
+    are created.
+
+    :param path: Path to ``transactions.json``.
+    :return: Transactions DataFrame with nullable dtypes; columns in the order of the
+        first record, then keys that only later records have.
+    """
+    table = pa_json.read_json(path, parse_options=_parse_options())
+    return _to_frame(table, _file_columns(path))
+
+
+def _read_json_blocks(path: str, block_size: int) -> Iterator[pa.Table]:
+    """``open_json`` for pyarrow < 20: blocks of whole lines, parsed with the first block's schema."""
+    parse_options = _parse_options()
+    with open(path, "rb") as fh:
+        while block := fh.read(block_size):
+            block += fh.readline()
+            if not block.strip():
+                continue
+            table = pa_json.read_json(io.BytesIO(block), parse_options=parse_options)
+            if parse_options.unexpected_field_behavior == "infer":
+                parse_options = pa_json.ParseOptions(explicit_schema=table.schema, unexpected_field_behavior="error")
+            yield table
+
+
+def iter_transactions(path: str, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream transactions in bounded chunks (same columns and dtypes as :func:`read_transactions`).
+
+    The Arrow reader fixes the columns on the first chunk: a key that first appears in a
+    later chunk is a parse error, not a silently dropped column.
+
+    :param path: Path to ``transactions.json``.
+    :param block_size: Approximate number of JSON bytes parsed per chunk.
+    :return: Iterator of transaction DataFrames.
+    """
+    first = _file_columns(path)
+    if hasattr(pa_json, "open_json"):
+        reader = pa_json.open_json(
+            path,
+            read_options=pa_json.ReadOptions(block_size=block_size),
+            parse_options=_parse_options(),
+        )
+        tables = (pa.Table.from_batches([batch]) for batch in reader)
+    else:
+        tables = _read_json_blocks(path, block_size)
+    offset = 0
+    for table in tables:
+        chunk = _to_frame(table, first)
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def load_dimensions(data_dir: str) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Load the lookup tables joined onto transactions: merchants, users and geo data.
 
     :param data_dir: Path to the directory containing data files.
-    :return: Merged DataFrame with all relevant fields.
+    :return: ``(merchants, users, geo_df)`` with country columns renamed.
     """
-    # Load datasets
     merchants = pd.read_csv(f"{data_dir}/merchants.csv")
     users = pd.read_csv(f"{data_dir}/users.csv").rename(columns={"country": "country_users"})
     merchants = merchants.rename(columns={"country": "country_merchant"})
-    transactions = pd.read_json(
-        f"{data_dir}/transactions.json", lines=True, dtype_backend="numpy_nullable"
-    )
     geo_df = pd.read_csv(f"{data_dir}/geo_df.csv")
+    return merchants, users, geo_df
 
-    # Merge datasets step by step
-    df = transactions.merge(merchants, on="merchant_id", how="left")
-    df = df.merge(users, on="user_id", how="left")
-    df = df.merge(geo_df, on="transaction_id", how="left")
 
-    return df
+def index_dimensions(merchants: pd.DataFrame, users: pd.DataFrame, geo_df: pd.DataFrame) -> dict:
+    """
+    Index each lookup table by its join key (the hash index is built once and reused per join).
+
+    :return: ``{name: (key, table indexed by key)}`` in join order.
+    """
+    dimensions = {}
+    for name, key, table in (
+        ("merchants", "merchant_id", merchants),
+        ("users", "user_id", users),
+        ("geo", "transaction_id", geo_df),
+    ):
+        indexed = table.set_index(key)
+        if not indexed.index.is_unique:
+            raise ValueError(f"{name}: duplicate values in join key '{key}'")
+        dimensions[name] = (key, indexed)
+    return dimensions
+
+
+def join_dimensions(transactions: pd.DataFrame, dimensions: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Left-join every lookup table onto *transactions* via precomputed key indexers.
+
+    Each dimension column is gathered once (``take`` on the indexer) and the output frame
+    is assembled in a single step, instead of copying the growing wide frame per merge.
+    Result matches the chained ``merge(..., how="left")`` of :func:`load_data`.
+
+    :param transactions: Transactions DataFrame.
+    :param dimensions: Output of :func:`index_dimensions`.
+    :return: ``(df, stats)`` – merged frame and per-table join cardinality statistics.
+    """
+    columns = {col: transactions[col].array for col in transactions.columns}
+    stats = {}
+    for name, (key, table) in dimensions.items():
+        indexer = table.index.get_indexer(transactions[key])
+        matched = indexer >= 0
+        used = np.bincount(indexer[matched], minlength=len(table)) > 0
+        stats[name] = {
+            "rows": len(indexer),
+            "matched_rows": int(matched.sum()),
+            "unmatched_rows": int((~matched).sum()),
+            "unmatched_keys": transactions[key][~matched].nunique(),
+            "dimension_rows": len(table),
+            "unused_dimension_keys": int((~used).sum()),
+        }
+
+        # merge semantics: the key takes the lookup table's dtype, missing rows become NaN
+        columns[key] = transactions[key].astype(table.index.dtype).array
+        for col in table.columns:
+            if col in columns:
+                raise ValueError(f"{name}: column '{col}' already present in the joined frame")
+            columns[col] = take(table[col].values, indexer, allow_fill=True)
+
+    df = pd.DataFrame(columns, index=transactions.index, copy=False)
+    return df, pd.DataFrame.from_dict(stats, orient="index")
+
+
+@profiled
+def load_data(data_dir: str, *, return_stats: bool = False, compact: bool = True):
+    """
+    Load and merge merchants, users, transactions, and geo data into a single DataFrame.
+
+    :param data_dir: Path to the directory containing data files.
+    :param return_stats: Also return join cardinality statistics (unmatched keys per table).
+    :param compact: Cast to the declared compact dtypes (:func:`compact_frame`: categoricals,
+        int8 flags, datetime dates); False keeps the parsed string / int64 columns.
+    :return: Merged DataFrame with all relevant fields, or ``(df, stats)``.
+    """
+    # Load datasets
+    dimensions = index_dimensions(*load_dimensions(data_dir))
+    transactions = read_transactions(f"{data_dir}/transactions.json")
+
+    # Join all lookup tables in one pass
+    df, stats = join_dimensions(transactions, dimensions)
+    del transactions
+    if compact:
+        df = compact_frame(df)
+
+    return (df, stats) if return_stats else df
+
+
+def load_data_chunks(data_dir: str, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Streaming variant of :func:`load_data`: yield merged chunks of bounded size.
+
+    The lookup tables are loaded and indexed once and stay resident, so each chunk is
+    joined in time proportional to its own size. Concatenating the chunks gives the same
+    rows and columns as ``load_data(compact=False)``; chunks are not compacted because
+    their category vocabularies would differ from chunk to chunk.
+
+    :param data_dir: Path to the directory containing data files.
+    :param block_size: Approximate number of JSON bytes parsed per chunk.
+    :return: Iterator of merged DataFrames.
+    """
+    dimensions = index_dimensions(*load_dimensions(data_dir))
+
+    for transactions in iter_transactions(f"{data_dir}/transactions.json", block_size):
+        df, _ = join_dimensions(transactions, dimensions)
+        yield df
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Declared dtypes of the pipeline frames, from ingestion to the model matrix.
+# Columns that are absent from a frame are skipped, so one schema serves every stage.
+
+# Low-cardinality labels → category (codes + one vocabulary instead of one str per row)
+CATEGORY_COLUMNS = [
+    "user_id", "merchant_id", "channel", "currency", "device", "payment_method", "category",
+    "sex", "education", "primary_source_of_income", "part_of_day",
+]
+# Compared with each other (country flags), so they share one vocabulary
+COUNTRY_COLUMNS = ["country_merchant", "country_users", "transaction_country"]
+# Unique per row → Arrow-backed strings
+STRING_COLUMNS = ["transaction_id"]
+# 0/1 flags → int8 (nullable Int8 where the source can be missing)
+FLAG_COLUMNS = [
+    "is_international", "is_first_time_merchant", "is_fraud", "has_fraud_history", "is_country_nan",
+    "country_u=t", "country_m=t", "countries_same",
+]
+DATE_COLUMNS = ["signup_date"]
+# Integer counts of the raw data (nullable once a lookup misses); other numbers are float64
+INT_COLUMNS = ["session_length_seconds", "number_of_alerts_last_6_months", "account_age_months", "age"]
+
+__all__ = [
+    "CATEGORY_COLUMNS",
+    "COUNTRY_COLUMNS",
+    "STRING_COLUMNS",
+    "FLAG_COLUMNS",
+    "DATE_COLUMNS",
+    "INT_COLUMNS",
+    "raw_arrow_schema",
+    "compact_frame",
+    "compact_dtypes",
+    "compact_features",
+]
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the declared columns of a raw / processed frame to their compact dtypes (in place).
+
+    Continuous columns keep float64 here because ``data_transform`` still computes on
+    them; they become float32 in :func:`compact_features`. Category vocabularies are the
+    sorted observed values, so sorting and ``get_dummies`` order match the string columns.
+
+    :param df: Frame with any subset of the declared columns.
+    :return: The same frame.
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object).astype("category")
+
+    countries = [col for col in COUNTRY_COLUMNS if col in df]
+    if countries:
+        vocabulary = pd.unique(pd.concat([df[col].astype(object) for col in countries]).dropna())
+        dtype = pd.CategoricalDtype(sorted(vocabulary))
+        for col in countries:
+            df[col] = df[col].astype(object).astype(dtype)
+
+    for col in STRING_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("string[pyarrow]")
+    for col in FLAG_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("Int8" if df[col].hasnans else np.int8)
+    for col in DATE_COLUMNS:
+        if col in df:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def raw_arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    """Arrow schema of a merged raw frame from the declared column types, not from its values.
+
+    Labels and keys are strings, flags int8, dates and ``timestamp`` timestamps,
+    :data:`INT_COLUMNS` int64 and other numeric (or all-missing) columns float64; only an
+    undeclared non-numeric column is typed from *df* (as a string). Every chunk of a
+    stream gets the same schema, whichever values – or missing values – it happens to hold.
+    """
+    labels = set(CATEGORY_COLUMNS + COUNTRY_COLUMNS + STRING_COLUMNS)
+    fields = []
+    for col in df.columns:
+        if col in labels:
+            dtype = pa.string()
+        elif col in FLAG_COLUMNS:
+            dtype = pa.int8()
+        elif col in DATE_COLUMNS or col == "timestamp":
+            dtype = pa.timestamp("ns")
+        elif col in INT_COLUMNS:
+            dtype = pa.int64()
+        elif pd.api.types.is_numeric_dtype(df[col].dtype) or df[col].isna().all():
+            dtype = pa.float64()
+        else:
+            dtype = pa.string()
+        fields.append((col, dtype))
+    return pa.schema(fields)
+
+
+def compact_dtypes(X: pd.DataFrame) -> dict:
+    """Model-matrix dtype of each numeric column, decided from the column dtypes alone.
+
+    Flag dtypes (``bool``, ``int8`` / ``uint8`` – dummies and :data:`FLAG_COLUMNS`) are
+    0/1 by construction → uint8; every other numeric column → float32, whatever values
+    one particular frame holds, so a fitted transformer gives every split the same dtypes.
+    """
+    flags = (np.dtype(bool), np.dtype(np.int8), np.dtype(np.uint8))
+    return {
+        col: np.uint8 if dtype in flags else np.float32
+        for col, dtype in X.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype)
+    }
+
+
+def compact_features(X: pd.DataFrame, dtypes: dict | None = None) -> pd.DataFrame:
+    """Model-matrix dtypes: 0/1 columns (dummies, flags) → uint8, other numeric columns → float32.
+
+    XGBoost reads features as float32, so the model sees exactly the same values as
+    from the wide float64 / int64 matrix; missing values become NaN. Non-numeric columns
+    (e.g. ``transaction_id`` kept as a key) are passed through unchanged.
+
+    :param dtypes: ``{column: np.uint8 | np.float32}`` fixed at fit time; default
+        :func:`compact_dtypes` of *X*. A uint8 column holding anything but 0/1 is an error.
+    """
+    dtypes = compact_dtypes(X) if dtypes is None else dtypes
+    columns = {}
+    for col in X.columns:
+        values = X[col]
+        dtype = dtypes.get(col)
+        if dtype is None:
+            columns[col] = values
+            continue
+        array = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        if dtype == np.uint8:
+            if not np.isin(array, (0, 1)).all():
+                raise ValueError(f"column {col!r} has uint8 (0/1) dtype but holds other or missing values")
+            array = array.astype(np.uint8)
+        columns[col] = array
+    return pd.DataFrame(columns, index=X.index)
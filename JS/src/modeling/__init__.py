@@ -1,14 +1,26 @@
 from .build import build_model
 from .oversample import oversample
-from .train import train_model, save_model, load_model, predict_proba, auc_score, accuracy_cls
+from .train import train_model, train_from_matrix, save_model, load_model, predict_proba, auc_score, accuracy_cls
+from .compiled import CompiledForest, benchmark_inference
+from .tuning import TuningData
+from .persistence import ModelWriter
+from .backtest import BacktestData, run_backtest, summarize_backtest
 
 __all__ = [
     "build_model",
     "oversample",
     "train_model",
+    "train_from_matrix",
     "save_model",
     "load_model",
     "predict_proba",
     "auc_score",
-    "accuracy_cls"
+    "accuracy_cls",
+    "CompiledForest",
+    "benchmark_inference",
+    "TuningData",
+    "ModelWriter",
+    "BacktestData",
+    "run_backtest",
+    "summarize_backtest",
 ]
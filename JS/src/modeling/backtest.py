@@ -0,0 +1,205 @@
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, accuracy_score
+from src.features.prepare import drop_first_transactions
+from src.features.transformer import FeatureTransformer
+from .tuning import TuningData
+
+__all__ = [
+    "SCHEMES",
+    "BacktestData",
+    "run_backtest",
+    "summarize_backtest",
+]
+
+SCHEMES = ("expanding", "sliding")
+
+
+class BacktestData:
+    """Model matrix of the whole history, encoded once and sorted by time.
+
+    ``prepare_model_data`` refits the encoding and the merchant ``bad_rate`` table for
+    every cutoff. Here the transformer uses the leakage-free as-of ``bad_rate``, which
+    does not depend on the cutoff, so the matrix is built once and every train / test
+    window of a rolling-origin backtest is a contiguous row range of it: the folds are
+    ``iloc`` slices (views, no copy) and a k-fold backtest costs k model fits.
+
+    Parameters
+    ----------
+    X, y : features and labels, rows in time order
+    times : timestamps of the rows (datetime64, non-decreasing)
+    transformer : the fitted FeatureTransformer that built *X* (optional)
+    """
+
+    def __init__(self, X: pd.DataFrame, y: pd.Series, times: np.ndarray, *, transformer: FeatureTransformer | None = None):
+        self.X = X
+        self.y = y
+        self.times = np.asarray(times, dtype="datetime64[ns]")
+        self.transformer = transformer
+
+    @classmethod
+    def from_processed(
+        cls,
+        df: pd.DataFrame,
+        *,
+        to_drop: list,
+        to_think_but_drop: list,
+        to_categorize: list,
+        target: str = "is_fraud",
+        encoding: str = "onehot",
+        categories: dict | None = None,
+        smoothing: float = 0.0,
+        half_life: str | None = None,
+    ) -> "BacktestData":
+        """Encode processed data once, as ``prepare_model_data(..., bad_rate="asof")`` would.
+
+        The category vocabulary is fitted on the whole history (levels only, no labels)
+        unless *categories* freezes it; ``bad_rate`` only looks at earlier rows.
+        """
+        transformer = FeatureTransformer(
+            to_drop=to_drop,
+            to_think_but_drop=to_think_but_drop,
+            to_categorize=to_categorize,
+            target=target,
+            encoding=encoding,
+            categories=categories,
+            bad_rate="asof",
+            smoothing=smoothing,
+            half_life=half_life,
+        )
+        if "bad_rate" not in df:
+            df = transformer.add_bad_rate(df)
+        history = drop_first_transactions(df).sort_values("timestamp", kind="stable")
+        X = transformer.fit_transform(history)
+        return cls(X, history[target], history["timestamp"].to_numpy(), transformer=transformer)
+
+    def folds(
+        self,
+        *,
+        start: str,
+        n_folds: int,
+        freq: str = "MS",
+        scheme: str = "expanding",
+        train_window: str | None = None,
+    ) -> list:
+        """Rolling-origin folds: test window ``k`` is ``[cutoff_k, cutoff_k+1)``.
+
+        The cutoffs are ``pd.date_range(start, periods=n_folds + 1, freq=freq)`` (monthly
+        by default). ``"expanding"`` trains on everything before the cutoff, ``"sliding"``
+        on the *train_window* (pandas time span) before it.
+
+        :return: one dict per fold with ``fold``, ``cutoff`` and the positional row ranges
+            ``train`` / ``test`` as ``(start, stop)``.
+        """
+        if scheme not in SCHEMES:
+            raise ValueError(f"unknown scheme {scheme!r}, expected one of {SCHEMES}")
+        if scheme == "sliding" and train_window is None:
+            raise ValueError('scheme="sliding" needs a train_window')
+        cutoffs = pd.date_range(start, periods=n_folds + 1, freq=freq)
+        bounds = np.searchsorted(self.times, cutoffs.to_numpy(), side="left")
+        folds = []
+        for k in range(n_folds):
+            first = 0
+            if scheme == "sliding":
+                lower = (cutoffs[k] - pd.Timedelta(train_window)).to_datetime64()
+                first = int(np.searchsorted(self.times, lower, side="left"))
+            folds.append({
+                "fold": k,
+                "cutoff": cutoffs[k],
+                "train": (first, int(bounds[k])),
+                "test": (int(bounds[k]), int(bounds[k + 1])),
+            })
+        return folds
+
+    def split(self, fold: dict) -> tuple:
+        """``X_train, y_train, X_test, y_test`` of *fold* as row slices of the shared matrix."""
+        (a, b), (c, d) = fold["train"], fold["test"]
+        return self.X.iloc[a:b], self.y.iloc[a:b], self.X.iloc[c:d], self.y.iloc[c:d]
+
+
+def _evaluate_fold(X: pd.DataFrame, y: pd.Series, fold: dict, params: dict | None, options: dict) -> dict:
+    """Train on the fold's training rows and score its test rows."""
+    (a, b), (c, d) = fold["train"], fold["test"]
+    seed = options.pop("seed", 42)
+    data = TuningData(X.iloc[a:b], y.iloc[a:b], X.iloc[c:d], y.iloc[c:d], **options)
+    start = time.perf_counter()
+    model = data.fit(params, seed=seed)
+    fit_seconds = time.perf_counter() - start
+    y_test = np.asarray(data.y_test)
+    proba = model.get_booster().predict(data.test_matrix()) if len(y_test) else np.empty(0)
+    # a window without both classes has no AUC
+    auc = roc_auc_score(y_test, proba) if len(np.unique(y_test)) == 2 else np.nan
+    return {
+        "fold": fold["fold"],
+        "cutoff": fold["cutoff"],
+        "train_rows": b - a,
+        "test_rows": d - c,
+        "test_frauds": int(y_test.sum()),
+        "auc": auc,
+        "accuracy": accuracy_score(y_test, (proba > 0.5).astype(np.int64)) if len(y_test) else np.nan,
+        "fit_seconds": fit_seconds,
+    }
+
+
+# ----- worker processes -----
+_WORKER_DATA = None
+
+
+def _open_worker(shared_dir: str):
+    global _WORKER_DATA
+    _WORKER_DATA = TuningData.open_shared(shared_dir)
+
+
+def _fold_task(task: tuple) -> dict:
+    fold, params, options = task
+    return _evaluate_fold(_WORKER_DATA.X_train, _WORKER_DATA.y_train, fold, params, dict(options))
+
+
+def run_backtest(
+    data: BacktestData,
+    folds: list,
+    *,
+    xgb_params: dict | None = None,
+    oversample_enabled: bool = True,
+    oversample_method: str = "rows",
+    seed: int = 42,
+    n_workers: int = 1,
+    n_jobs: int | None = None,
+    shared_dir: str | None = None,
+) -> pd.DataFrame:
+    """Fit and score one model per fold; one report row per fold.
+
+    With *n_workers* > 1 the matrix is written once as memory-mapped float32 ``.npy``
+    files (``TuningData.save_shared``; to *shared_dir*, default a temporary directory)
+    and the folds are trained in that many spawned processes, each slicing its rows
+    out of the same mapped pages. *n_jobs* is the XGBoost thread count per fit.
+
+    :return: DataFrame with ``fold``, ``cutoff``, ``train_rows``, ``test_rows``,
+        ``test_frauds``, ``auc`` (NaN for a one-class test window), ``accuracy`` and
+        ``fit_seconds``; see :func:`summarize_backtest`.
+    """
+    options = {
+        "oversample_enabled": oversample_enabled,
+        "oversample_method": oversample_method,
+        "n_jobs": n_jobs,
+        "seed": seed,
+    }
+    if n_workers <= 1:
+        rows = [_evaluate_fold(data.X, data.y, fold, xgb_params, dict(options)) for fold in folds]
+        return pd.DataFrame(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_dir = shared_dir or tmp
+        TuningData(data.X, data.y, data.X.iloc[:0], data.y.iloc[:0]).save_shared(shared_dir)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(min(n_workers, len(folds)), initializer=_open_worker, initargs=(shared_dir,)) as pool:
+            rows = pool.map(_fold_task, [(fold, xgb_params, options) for fold in folds], chunksize=1)
+    return pd.DataFrame(rows)
+
+
+def summarize_backtest(report: pd.DataFrame) -> pd.DataFrame:
+    """Mean, std, min and max of the fold AUC / accuracy (NaN AUCs are skipped)."""
+    return report[["auc", "accuracy"]].agg(["mean", "std", "min", "max"])
@@ -0,0 +1,183 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "CompiledForest",
+    "benchmark_inference",
+]
+
+
+class CompiledForest:
+    """Flat-array export of a binary:logistic XGBoost booster for batch inference.
+
+    All trees are exported once into global NumPy node arrays (split column, float32
+    threshold, left child, leaf value). A batch is evaluated by advancing every
+    (row, tree) pair one level per step with ``np.take`` – depth steps in total – instead
+    of building a DMatrix on every call. XGBoost allocates the two children of a node
+    next to each other, so the next node is ``left + (x >= threshold)``; leaves point to
+    themselves with a NaN threshold and simply stay put.
+
+    Missing values follow ``default_left`` without a per-node branch: the feature matrix
+    is widened to ``[X with NaN→-inf | X with NaN→+inf]`` and a split reads from the first
+    half if its default direction is left, from the second half otherwise. Features are
+    compared as float32, like XGBoost. Exposes ``predict_proba`` / ``predict`` like
+    XGBClassifier, so ``src.modeling.train`` helpers accept it in place of the model.
+    """
+
+    def __init__(self, *, column, threshold, left, value, roots, depth, base_margin, feature_names):
+        self.column = column
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_booster(cls, booster, *, iteration_range: tuple | None = None) -> "CompiledForest":
+        """Export a fitted XGBClassifier (or its Booster).
+
+        :param iteration_range: boosting rounds to use; defaults to the model's
+            ``best_iteration`` (as ``predict_proba`` does) or all rounds.
+        """
+        if hasattr(booster, "get_booster"):
+            booster = booster.get_booster()
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"only binary:logistic models are supported, got {objective}")
+        model = learner["gradient_booster"]["model"]
+        trees = model["trees"]
+        if any(tree.get("categories_nodes") for tree in trees):
+            raise ValueError("categorical splits are not supported by CompiledForest")
+
+        # rounds → trees (a round holds num_parallel_tree trees)
+        indptr = model.get("iteration_indptr")
+        if indptr is None:
+            per_round = int(model["gbtree_model_param"]["num_parallel_tree"])
+            indptr = list(range(0, len(trees) + 1, per_round))
+        if iteration_range is None and booster.attr("best_iteration") is not None:
+            iteration_range = (0, int(booster.attr("best_iteration")) + 1)
+        if iteration_range is not None:
+            trees = trees[indptr[iteration_range[0]]:indptr[iteration_range[1]]]
+
+        n_features = int(learner["learner_model_param"]["num_feature"])
+        column, threshold, left, value, roots = [], [], [], [], []
+        offset, depth = 0, 0
+        for tree in trees:
+            lc = np.asarray(tree["left_children"], dtype=np.int64)
+            rc = np.asarray(tree["right_children"], dtype=np.int64)
+            leaf = lc == -1
+            if np.any(rc[~leaf] != lc[~leaf] + 1):
+                raise ValueError("expected the right child to follow the left child")
+            split = np.asarray(tree["split_conditions"], dtype=np.float64)
+            default_left = np.asarray(tree["default_left"], dtype=bool)
+            column.append(np.where(leaf, 0, np.asarray(tree["split_indices"]) + np.where(default_left, 0, n_features)))
+            threshold.append(np.where(leaf, np.nan, split))
+            left.append(np.where(leaf, np.arange(len(lc)), lc) + offset)
+            value.append(np.where(leaf, split, 0.0))
+            roots.append(offset)
+            depth = max(depth, _tree_depth(lc, rc))
+            offset += len(lc)
+
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        return cls(
+            column=np.concatenate(column).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            value=np.concatenate(value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+            base_margin=np.log(base_score / (1 - base_score)),
+            feature_names=booster.feature_names,
+        )
+
+    # ------------------------------------------------------------------
+    def _matrix(self, X) -> np.ndarray:
+        """float32 ``[X with NaN→-inf | X with NaN→+inf]`` in booster feature order."""
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32, na_value=np.nan)
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        missing = np.isnan(X)
+        return np.hstack([np.where(missing, -np.inf, X), np.where(missing, np.inf, X)])
+
+    def predict_margin(self, X, *, block_cells: int = 1 << 16) -> np.ndarray:
+        """Raw margin (sum of leaf values + base margin) per row.
+
+        Rows are processed in blocks of about *block_cells* (row, tree) pairs so the
+        working arrays stay cache-sized.
+        """
+        X = self._matrix(X)
+        n_rows, width = X.shape
+        n_trees = len(self.roots)
+        margin = np.empty(n_rows, dtype=np.float64)
+        step = max(1, block_cells // max(n_trees, 1))
+        for start in range(0, n_rows, step):
+            block = X[start:start + step]
+            row_offset = (np.arange(len(block), dtype=np.int32) * width)[:, None]
+            node = np.broadcast_to(self.roots, (len(block), n_trees))
+            flat = block.ravel()
+            for _ in range(self.depth):
+                x = flat.take(row_offset + self.column.take(node))
+                node = self.left.take(node) + (x >= self.threshold.take(node))
+            margin[start:start + step] = self.value.take(node).sum(axis=1, dtype=np.float64)
+        return margin + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        """``(n, 2)`` class probabilities, same layout as ``XGBClassifier.predict_proba``."""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def verify(self, model, X, *, atol: float = 1e-5) -> float:
+        """Max absolute probability difference against the native booster; raises above *atol*."""
+        diff = float(np.max(np.abs(self.predict_proba(X)[:, 1] - model.predict_proba(X)[:, 1]), initial=0.0))
+        if diff > atol:
+            raise AssertionError(f"compiled forest deviates from the native booster by {diff:.3g} > {atol:g}")
+        return diff
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Number of edges on the longest root-to-leaf path."""
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):  # children always have larger ids than their parent
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def benchmark_inference(model, X: pd.DataFrame, batch_sizes=(1, 100, 100_000), *, repeat: int = 5) -> pd.DataFrame:
+    """Time native ``predict_proba`` against :class:`CompiledForest` per batch size.
+
+    Rows of *X* are tiled up to the largest batch size. Returns best-of-*repeat*
+    seconds per call for both backends, the speedup and the max probability difference.
+    """
+    compiled = CompiledForest.from_booster(model)
+    reps = -(-max(batch_sizes) // len(X))
+    X_all = pd.concat([X] * reps, ignore_index=True) if reps > 1 else X
+
+    rows = []
+    for size in batch_sizes:
+        batch = X_all.iloc[:size]
+        timings = {}
+        for name, fn in (("native_s", model.predict_proba), ("compiled_s", compiled.predict_proba)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn(batch)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        rows.append({
+            "batch_size": size,
+            **timings,
+            "speedup": timings["native_s"] / timings["compiled_s"],
+            "max_abs_diff": compiled.verify(model, batch, atol=np.inf),
+        })
+    return pd.DataFrame(rows)
@@ -1,6 +1,39 @@
 from imblearn.over_sampling import RandomOverSampler
+import numpy as np
 import pandas as pd
 
+OVERSAMPLE_METHODS = ("rows", "weights", "scale_pos_weight")
+
+
 def oversample(X: pd.DataFrame, y: pd.Series, *, random_state: int = 42):
     ros = RandomOverSampler(random_state=random_state)
     return ros.fit_resample(X, y)
+
+
+def oversample_indices(y: pd.Series, *, random_state: int = 42) -> np.ndarray:
+    """Row positions ``oversample`` would emit for *y* (originals, then the drawn duplicates).
+
+    ``X.iloc[oversample_indices(y)]`` equals ``oversample(X, y)[0]``; the sampler only
+    looks at *y*, so it is run on a one-column placeholder instead of X.
+    """
+    ros = RandomOverSampler(random_state=random_state)
+    ros.fit_resample(np.zeros((len(y), 1), dtype=np.int8), y)
+    return ros.sample_indices_
+
+
+def oversample_weights(y: pd.Series, *, random_state: int = 42) -> np.ndarray:
+    """Per-row copy counts of ``oversample`` as float32 sample weights (no row is copied)."""
+    return np.bincount(oversample_indices(y, random_state=random_state), minlength=len(y)).astype(np.float32)
+
+
+def class_ratio(y: pd.Series) -> float:
+    """negatives / positives – the ``scale_pos_weight`` that balances a binary target.
+
+    1.0 (no reweighting) when *y* lacks one of the classes, e.g. a small backtest fold
+    or streamed window without frauds: there is nothing to balance.
+    """
+    positives = int(np.asarray(y).sum())
+    negatives = len(y) - positives
+    if not positives or not negatives:
+        return 1.0
+    return negatives / positives
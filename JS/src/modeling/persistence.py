@@ -0,0 +1,141 @@
+import atexit
+import json
+import math
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: no inter-process lock, one writing process per directory
+    fcntl = None
+
+__all__ = [
+    "ModelWriter",
+]
+
+POLICIES = ("top_k", "best", "none")
+MANIFEST = "kept.json"  # [[score, file name], ...] of the kept models, best first
+
+
+class ModelWriter:
+    """Persist tuning-trial models according to a policy, on a background thread.
+
+    ``submit`` only decides and enqueues; a daemon thread writes the model in
+    XGBoost's native UBJSON format (``xgb_trial_{number}_{score}.ubj``, written to a
+    temporary name and renamed) and then deletes the files that fell out of the
+    policy, so training never waits on disk.
+
+    The kept set is recorded with exact scores in ``kept.json`` in *directory* and
+    updated under a file lock, which makes the policy hold across several worker
+    processes writing to the same directory; file names are never parsed back. NaN
+    scores never qualify. The object
+    is picklable; each process starts its own thread on first ``submit`` and flushes
+    it at exit (or on ``close``).
+
+    Parameters
+    ----------
+    directory : str – target directory
+    policy : {"top_k", "best", "none"}, default "top_k" – keep the *k* best models,
+        only the best so far, or nothing
+    k : int, default 5
+    direction : {"maximize", "minimize"}, default "maximize" – meaning of the score
+    """
+
+    def __init__(self, directory: str, *, policy: str = "top_k", k: int = 5, direction: str = "maximize"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.directory = Path(directory)
+        self.policy = policy
+        self.k = 1 if policy == "best" else k
+        self.maximize = direction == "maximize"
+        self._queue = None
+        self._thread = None
+        self._error = None
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, "_queue": None, "_thread": None, "_error": None}
+
+    # ----- kept set -----
+    def kept(self) -> list:
+        """``(score, path)`` of the kept models, best first."""
+        return [(score, self.directory / name) for score, name in self._read_manifest()]
+
+    def _read_manifest(self) -> list:
+        try:
+            return json.loads((self.directory / MANIFEST).read_text())
+        except FileNotFoundError:
+            return []
+
+    def _write_manifest(self, entries: list):
+        tmp = self.directory / f".{MANIFEST}.tmp"
+        tmp.write_text(json.dumps(entries))
+        os.replace(tmp, self.directory / MANIFEST)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock of the manifest across processes (POSIX ``flock``)."""
+        with open(self.directory / f".{MANIFEST}.lock", "w") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            yield
+
+    def _qualifies(self, score: float) -> bool:
+        if math.isnan(score):
+            return False
+        kept = self.kept()
+        if len(kept) < self.k:
+            return True
+        worst = kept[self.k - 1][0]
+        return score > worst if self.maximize else score < worst
+
+    # ----- writing -----
+    def submit(self, number: int, score: float, model) -> bool:
+        """Queue *model* of trial *number* if its *score* makes the kept set; returns whether it was queued."""
+        if self._error is not None:
+            raise self._error
+        if self.policy == "none" or not self._qualifies(score):
+            return False
+        if self._thread is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="model-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        self._queue.put((number, score, model))
+        return True
+
+    def close(self):
+        """Wait until every queued model is written; re-raise a failed write."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "ModelWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while (item := self._queue.get()) is not None:
+            number, score, model = item
+            try:
+                path = self.directory / f"xgb_trial_{number}_{score:.6g}.ubj"
+                tmp = path.with_name(f".{path.stem}.tmp.ubj")
+                model.save_model(tmp)
+                os.replace(tmp, path)
+                with self._locked():
+                    entries = [e for e in self._read_manifest() if e[1] != path.name] + [[score, path.name]]
+                    entries.sort(key=lambda entry: entry[0], reverse=self.maximize)
+                    self._write_manifest(entries[:self.k])
+                    for _, name in entries[self.k:]:
+                        (self.directory / name).unlink(missing_ok=True)
+            except Exception as exc:  # surfaced on the next submit/close
+                self._error = exc
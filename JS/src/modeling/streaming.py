@@ -0,0 +1,174 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score, accuracy_score
+from src.features.categories import apply_categories
+from src.profiling import peak_rss_mb, reset_peak_rss
+from .oversample import oversample_weights, class_ratio
+from .train import train_from_matrix
+
+__all__ = [
+    "ParquetBatchIter",
+    "train_model_streaming",
+    "predict_proba_streaming",
+    "evaluate_streaming",
+]
+
+DEFAULT_BATCH_ROWS = 1 << 18
+
+
+class ParquetBatchIter(xgb.DataIter):
+    """Feed a Parquet file or partitioned directory to XGBoost one record batch at a time.
+
+    Only one batch of X is materialised in pandas at a time (plus the matrix XGBoost is
+    building); labels and weights are full 1-D arrays sliced per batch. Used with
+    ``QuantileDMatrix`` (quantised in memory, ~1 byte per value) or
+    ``ExtMemQuantileDMatrix`` (pages cached on disk under *cache_prefix*).
+
+    :param X_path: Parquet file or directory of Parquet parts with the feature columns.
+    :param label: Optional labels aligned with the rows of *X_path*.
+    :param weight: Optional per-row sample weights aligned with the rows of *X_path*.
+    :param batch_rows: Maximum rows per batch (row groups larger than this are sliced).
+    :param cache_prefix: External-memory cache location; None keeps everything in memory.
+    :param categories: Frozen vocabulary of the ``category`` columns. Parquet only keeps
+        the levels present in each row group, so every batch is re-cast to it.
+    """
+
+    def __init__(self, X_path: str, *, label: np.ndarray | None = None, weight: np.ndarray | None = None,
+                 batch_rows: int = DEFAULT_BATCH_ROWS, cache_prefix: str | None = None, categories: dict | None = None):
+        self.dataset = ds.dataset(X_path, format="parquet")
+        self.label = label
+        self.weight = weight
+        self.categories = categories
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self.batches = 0
+        self._batches = None
+        self._offset = 0
+        # external-memory pages go to files under cache_prefix, not to host memory
+        super().__init__(cache_prefix=cache_prefix, on_host=False)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data) -> bool:
+        if self._batches is None:
+            self._batches = iter(_scan(self.dataset, self.batch_rows))
+            self._offset = 0
+            self.rows = self.batches = 0
+        try:
+            batch = next(self._batches)
+        except StopIteration:
+            return False
+        rows = slice(self._offset, self._offset + batch.num_rows)
+        kwargs = {}
+        if self.label is not None:
+            kwargs["label"] = self.label[rows]
+        if self.weight is not None:
+            kwargs["weight"] = self.weight[rows]
+        input_data(data=_frame(batch, self.categories), **kwargs)
+        self._offset += batch.num_rows
+        self.rows += batch.num_rows
+        self.batches += 1
+        return True
+
+
+def _scan(dataset: ds.Dataset, batch_rows: int):
+    """Record batches in file order, reading one row group at a time (no scanner readahead)."""
+    for path in dataset.files:
+        yield from pq.ParquetFile(path, filesystem=dataset.filesystem).iter_batches(batch_size=batch_rows, use_threads=False)
+
+
+def _frame(batch, categories: dict | None):
+    df = batch.to_pandas()
+    return apply_categories(df, categories) if categories else df
+
+
+def _read_labels(path: str, column: str) -> np.ndarray:
+    return ds.dataset(path, format="parquet").to_table(columns=[column]).column(column).to_numpy()
+
+
+def train_model_streaming(
+    X_train_path: str,
+    y_train_path: str,
+    *,
+    target: str = "y",
+    oversample_enabled: bool = True,
+    oversample_method: str = "weights",
+    xgb_params: dict | None = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    external_memory: bool = False,
+    cache_dir: str | None = None,
+    categories: dict | None = None,
+):
+    """Train without loading X into pandas: Parquet batches → ``DataIter`` → quantised DMatrix.
+
+    Oversampling can only be expressed without copying rows, so *oversample_method* is
+    ``"weights"`` (same draws as RandomOverSampler, as sample weights) or
+    ``"scale_pos_weight"``. With *external_memory* the quantised pages are cached under
+    *cache_dir* (a temporary directory by default) and streamed during training.
+    *categories* is the frozen vocabulary of natively encoded ``category`` columns.
+
+    Returns
+    -------
+    model : fitted XGBClassifier
+    stats : dict – ``rows``, ``batches``, ``build_seconds``, ``train_seconds``,
+        ``rows_per_second`` (build + train) and ``peak_rss_mb`` of this run
+    """
+    if oversample_enabled and oversample_method not in ("weights", "scale_pos_weight"):
+        raise ValueError(f"streaming training supports 'weights' or 'scale_pos_weight' oversampling, got {oversample_method!r}")
+    reset_peak_rss()
+    y = _read_labels(y_train_path, target)
+    weight = None
+    if oversample_enabled and oversample_method == "weights":
+        weight = oversample_weights(y)
+    elif oversample_enabled:
+        xgb_params = {**(xgb_params or {}), "scale_pos_weight": class_ratio(y)}
+
+    matrix_kwargs = {"max_bin": (xgb_params or {}).get("max_bin"), "enable_categorical": bool(categories)}
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        start = time.perf_counter()
+        if external_memory:
+            it = ParquetBatchIter(X_train_path, label=y, weight=weight, batch_rows=batch_rows,
+                                  cache_prefix=os.path.join(tmp, "cache"), categories=categories)
+            dtrain = xgb.ExtMemQuantileDMatrix(it, **matrix_kwargs)
+        else:
+            it = ParquetBatchIter(X_train_path, label=y, weight=weight, batch_rows=batch_rows, categories=categories)
+            dtrain = xgb.QuantileDMatrix(it, **matrix_kwargs)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = train_from_matrix(dtrain, xgb_params)
+        train_seconds = time.perf_counter() - start
+        del dtrain
+
+    return model, {
+        "rows": it.rows,
+        "batches": it.batches,
+        "build_seconds": build_seconds,
+        "train_seconds": train_seconds,
+        "rows_per_second": it.rows / (build_seconds + train_seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def predict_proba_streaming(model, X_path: str, *, batch_rows: int = DEFAULT_BATCH_ROWS, categories: dict | None = None) -> np.ndarray:
+    """Positive-class probabilities for a Parquet file/directory, one batch in memory at a time."""
+    batches = _scan(ds.dataset(X_path, format="parquet"), batch_rows)
+    parts = [model.predict_proba(_frame(batch, categories))[:, 1] for batch in batches]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+
+
+def evaluate_streaming(model, X_test_path: str, y_test_path: str, *, target: str = "y", batch_rows: int = DEFAULT_BATCH_ROWS,
+                       categories: dict | None = None) -> dict:
+    """``auc_test`` / ``accuracy_test`` computed batch-wise from Parquet."""
+    y = _read_labels(y_test_path, target)
+    proba = predict_proba_streaming(model, X_test_path, batch_rows=batch_rows, categories=categories)
+    return {
+        "auc_test": roc_auc_score(y, proba),
+        "accuracy_test": accuracy_score(y, (proba > 0.5).astype(np.int64)),
+    }
@@ -1,11 +1,15 @@
 import joblib
 import pandas as pd
+import xgboost as xgb
+from xgboost import XGBClassifier
 from sklearn.metrics import roc_auc_score, accuracy_score
 from .build import build_model
-from .oversample import oversample
+from .oversample import oversample, oversample_weights, class_ratio
 
 __all__ = [
     "train_model",
+    "train_from_matrix",
+    "has_categorical",
     "save_model",
     "load_model",
     "predict_proba",
@@ -19,24 +23,73 @@ def train_model(
     y_train: pd.Series,
     *,
     oversample_enabled: bool = True,
+    oversample_method: str = "rows",
     xgb_params: dict | None = None,
 ):
-    """Train an XGBoost model; optional RandomOverSampler."""
+    """Train an XGBoost model; optional RandomOverSampler.
+
+    *oversample_method* – ``"rows"`` copies minority rows (RandomOverSampler);
+    ``"weights"`` fits on X as is with the sampler's per-row copy counts as
+    ``sample_weight``; ``"scale_pos_weight"`` sets it to the negative/positive ratio.
+    The last two never copy X and return the inputs as ``X_res`` / ``y_res``.
+    ``category`` columns are passed to XGBoost natively (``enable_categorical``).
+    """
+    if has_categorical(X_train):
+        xgb_params = {"enable_categorical": True, **(xgb_params or {})}
+    X_res, y_res = X_train, y_train
+    fit_kwargs = {}
     if oversample_enabled:
-        X_res, y_res = oversample(X_train, y_train)
-    else:
-        X_res, y_res = X_train, y_train
+        if oversample_method == "rows":
+            X_res, y_res = oversample(X_train, y_train)
+        elif oversample_method == "weights":
+            fit_kwargs["sample_weight"] = oversample_weights(y_train)
+        elif oversample_method == "scale_pos_weight":
+            xgb_params = {**(xgb_params or {}), "scale_pos_weight": class_ratio(y_train)}
+        else:
+            raise ValueError(f"unknown oversample_method {oversample_method!r}")
 
     model = build_model(xgb_params)
-    model.fit(X_res, y_res)
+    model.fit(X_res, y_res, **fit_kwargs)
     return model, X_res, y_res
 
 
+def has_categorical(X: pd.DataFrame) -> bool:
+    """True if *X* has ``category`` columns (native categorical encoding)."""
+    return any(isinstance(dtype, pd.CategoricalDtype) for dtype in X.dtypes)
+
+
+def train_from_matrix(dtrain: xgb.DMatrix, xgb_params: dict | None = None, **train_kwargs) -> XGBClassifier:
+    """Train ``build_model(xgb_params)`` on a prebuilt (Quantile/external-memory) DMatrix.
+
+    Uses the parameters ``XGBClassifier.fit`` would pass to ``xgb.train``, so the booster
+    is the same as fitting on the frame; returned as a regular XGBClassifier.
+    *train_kwargs* go to ``xgb.train`` (``evals``, ``callbacks``, …).
+    """
+    if "c" in (dtrain.feature_types or ()):
+        xgb_params = {"enable_categorical": True, **(xgb_params or {})}
+    model = build_model(xgb_params)
+    params = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+    booster = xgb.train(params, dtrain, num_boost_round=model.n_estimators, verbose_eval=False, **train_kwargs)
+    model.load_model(bytearray(booster.save_raw("ubj")))
+    return model
+
+
+NATIVE_SUFFIXES = (".ubj", ".json")
+
+
 def save_model(model, path: str):
-    joblib.dump(model, path)
+    """joblib pickle, or XGBoost's native format for ``.ubj`` / ``.json`` paths."""
+    if str(path).endswith(NATIVE_SUFFIXES):
+        model.save_model(path)
+    else:
+        joblib.dump(model, path)
 
 
 def load_model(path: str):
+    if str(path).endswith(NATIVE_SUFFIXES):
+        model = XGBClassifier()
+        model.load_model(path)
+        return model
     return joblib.load(path)
 
 
@@ -0,0 +1,386 @@
+import json
+import multiprocessing
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable
+import numpy as np
+import optuna
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score, accuracy_score
+from sklearn.model_selection import train_test_split
+from src.features.categories import categories_of
+from .build import build_model
+from .train import train_from_matrix
+from .oversample import oversample, oversample_weights, class_ratio
+
+__all__ = [
+    "TuningData",
+    "make_pruner",
+    "run_parallel_study",
+    "study_throughput",
+]
+
+
+class TuningData:
+    """Train/test data loaded once and shared by every tuning trial.
+
+    ``run_model_pipeline`` re-reads the Parquet files and reruns the oversampler on
+    every call. Here the frames are read once, the oversampled training set is built
+    once per oversampling seed and turned straight into an XGBoost ``QuantileDMatrix``
+    (kept per ``(seed, max_bin)``), and the test set is wrapped in a ``DMatrix`` once.
+    A trial then only pays for ``xgb.train`` and one prediction pass.
+
+    ``fit`` trains through the native API with the same parameters ``build_model``
+    would pass, so the booster is identical to ``XGBClassifier.fit`` on the
+    oversampled frame; it is returned as a regular ``XGBClassifier``.
+
+    Parameters
+    ----------
+    X_train, y_train : training split before oversampling
+    X_test, y_test : held-out split used for the trial metrics
+    oversample_enabled : bool, default True – RandomOverSampler before training
+    oversample_method : {"rows", "weights", "scale_pos_weight"}, default "rows" – see
+        ``train_model``; the last two build the matrix from X without copying rows
+    n_jobs : int, optional – XGBoost threads for training and matrix construction
+    valid_size : float, optional – stratified share of the training split held out
+        (before oversampling) as the early-stopping / pruning evaluation set
+    """
+
+    def __init__(self, X_train: pd.DataFrame, y_train: pd.Series, X_test: pd.DataFrame, y_test: pd.Series, *, oversample_enabled: bool = True, oversample_method: str = "rows", n_jobs: int | None = None, valid_size: float | None = None):
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.y_test = y_test
+        self.oversample_enabled = oversample_enabled
+        self.oversample_method = oversample_method
+        self.n_jobs = n_jobs
+        self.valid_size = valid_size
+        self._train = {}
+        self._test = None
+        self._valid = None
+        self._split = None
+
+    @classmethod
+    def from_parquet(cls, data_dir: str, **kwargs) -> "TuningData":
+        """Read ``X_train/y_train/X_test/y_test.parquet`` (target column ``y``) from *data_dir*."""
+        data_dir = Path(data_dir)
+        return cls(
+            pd.read_parquet(data_dir / "X_train.parquet"),
+            pd.read_parquet(data_dir / "y_train.parquet")["y"],
+            pd.read_parquet(data_dir / "X_test.parquet"),
+            pd.read_parquet(data_dir / "y_test.parquet")["y"],
+            **kwargs,
+        )
+
+    # ----- shared memory-mapped copy -----
+    def save_shared(self, directory: str):
+        """Write the splits as float32 ``.npy`` files for :meth:`open_shared`.
+
+        XGBoost stores features as float32 (missing → NaN) anyway, so the matrices
+        built from the shared copy are the same as from the original frames.
+        ``category`` columns are stored as their codes plus the vocabulary.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        categories = categories_of(self.X_train)
+        for name, X in (("X_train", self.X_train), ("X_test", self.X_test)):
+            codes = {col: X[col].cat.codes.where(X[col].notna()) for col in categories}
+            np.save(directory / f"{name}.npy", X.assign(**codes).to_numpy(dtype=np.float32, na_value=np.nan))
+        for name, y in (("y_train", self.y_train), ("y_test", self.y_test)):
+            np.save(directory / f"{name}.npy", y.to_numpy())
+        with open(directory / "columns.json", "w") as fh:
+            json.dump({"columns": list(self.X_train.columns), "target": self.y_train.name, "categories": categories}, fh)
+
+    @classmethod
+    def open_shared(cls, directory: str, **kwargs) -> "TuningData":
+        """Open a :meth:`save_shared` copy read-only via ``np.memmap``.
+
+        Every process that opens the same directory maps the same pages, so N tuning
+        workers share one physical copy of the feature data.
+        """
+        directory = Path(directory)
+        with open(directory / "columns.json") as fh:
+            meta = json.load(fh)
+        frames = {}
+        for name in ("X_train", "X_test"):
+            X = pd.DataFrame(np.load(directory / f"{name}.npy", mmap_mode="r"), columns=meta["columns"], copy=False)
+            # category columns are rebuilt from their codes in place; the other columns stay mapped
+            for col, levels in meta.get("categories", {}).items():
+                X[col] = pd.Categorical.from_codes(X[col].fillna(-1).to_numpy(dtype=np.int32), levels)
+            frames[name] = X
+        for name in ("y_train", "y_test"):
+            frames[name] = pd.Series(np.load(directory / f"{name}.npy", mmap_mode="r"), name=meta["target"], copy=False)
+        return cls(frames["X_train"], frames["y_train"], frames["X_test"], frames["y_test"], **kwargs)
+
+    # ----- cached matrices -----
+    def _rows(self) -> tuple:
+        """Positional (fit, valid) rows of the training split; valid is None without *valid_size*."""
+        if self._split is None:
+            rows = np.arange(len(self.X_train))
+            if self.valid_size is None:
+                self._split = (rows, None)
+            else:
+                self._split = tuple(train_test_split(rows, test_size=self.valid_size, stratify=self.y_train, random_state=42))
+        return self._split
+
+    def train_matrix(self, *, seed: int = 42, max_bin: int | None = None) -> xgb.QuantileDMatrix:
+        """Oversampled training ``QuantileDMatrix``, built on first use for *seed* / *max_bin*."""
+        key = (seed, max_bin)
+        if key not in self._train:
+            fit_rows, valid_rows = self._rows()
+            X, y = self.X_train, self.y_train
+            if valid_rows is not None:
+                X, y = X.iloc[fit_rows], y.iloc[fit_rows]
+            kwargs = {} if max_bin is None else {"max_bin": max_bin}
+            if self.oversample_enabled and self.oversample_method == "rows":
+                X, y = oversample(X, y, random_state=seed)
+            elif self.oversample_enabled and self.oversample_method == "weights":
+                kwargs["weight"] = oversample_weights(y, random_state=seed)
+            self._train[key] = xgb.QuantileDMatrix(X, y, nthread=self.n_jobs, enable_categorical=True, **kwargs)
+        return self._train[key]
+
+    def test_matrix(self) -> xgb.DMatrix:
+        if self._test is None:
+            self._test = xgb.DMatrix(self.X_test, nthread=self.n_jobs, enable_categorical=True)
+        return self._test
+
+    def valid_matrix(self) -> xgb.DMatrix:
+        """Held-out part of the training split (not oversampled)."""
+        _, valid_rows = self._rows()
+        if valid_rows is None:
+            raise ValueError("early stopping and pruning need TuningData(valid_size=...)")
+        if self._valid is None:
+            self._valid = xgb.DMatrix(
+                self.X_train.iloc[valid_rows], self.y_train.iloc[valid_rows], nthread=self.n_jobs, enable_categorical=True
+            )
+        return self._valid
+
+    # ----- trials -----
+    def fit(
+        self,
+        params: dict | None = None,
+        *,
+        seed: int = 42,
+        early_stopping_rounds: int | None = None,
+        trial: optuna.Trial | None = None,
+        report_every: int = 10,
+    ) -> xgb.XGBClassifier:
+        """Train ``build_model(params)`` on the cached matrix for oversampling *seed*.
+
+        With *early_stopping_rounds* and/or *trial* the validation split is evaluated
+        every round on the ``eval_metric`` of *params* (the last one of a list; AUC when
+        none is given): training stops after *early_stopping_rounds* rounds without
+        improvement (the model keeps ``best_iteration``, which ``predict_proba`` uses),
+        and every *report_every* rounds the metric is reported to *trial* so the study's
+        pruner can stop it (``optuna.TrialPruned``). A metric that improves downwards
+        (``logloss`` …) is reported negated to a maximizing study, and the other way round.
+        """
+        xgb_params = dict(params or {})
+        if self.n_jobs is not None:
+            xgb_params["n_jobs"] = self.n_jobs
+        if self.oversample_enabled and self.oversample_method == "scale_pos_weight":
+            xgb_params["scale_pos_weight"] = class_ratio(self.y_train.iloc[self._rows()[0]])
+        dtrain = self.train_matrix(seed=seed, max_bin=build_model(xgb_params).max_bin)
+
+        evals, callbacks = [], []
+        if early_stopping_rounds is not None or trial is not None:
+            metric = xgb_params.setdefault("eval_metric", "auc")
+            # XGBoost stops on the last metric of a list
+            metric = metric[-1] if isinstance(metric, (list, tuple)) else metric
+            maximize = _maximized(metric)
+            evals = [(self.valid_matrix(), "valid")]
+        if early_stopping_rounds is not None:
+            callbacks.append(xgb.callback.EarlyStopping(
+                rounds=early_stopping_rounds, metric_name=metric, data_name="valid", maximize=maximize
+            ))
+        if trial is not None:
+            sign = 1 if maximize == (trial.study.direction == optuna.study.StudyDirection.MAXIMIZE) else -1
+            callbacks.append(_PruningCallback(trial, every=report_every, metric=metric, sign=sign))
+        return train_from_matrix(dtrain, xgb_params, evals=evals, callbacks=callbacks)
+
+    def evaluate(self, params: dict | None = None, *, seed: int = 42, trial: optuna.Trial | None = None, **fit_kwargs) -> dict:
+        """Fit one configuration and score it on the test split (``auc_test``, ``accuracy_test``).
+
+        Extra keyword arguments go to :meth:`fit`. ``best_iteration`` is the early-stopping
+        round (None without it) and is stored as a user attribute of *trial*.
+        """
+        start = time.perf_counter()
+        model = self.fit(params, seed=seed, trial=trial, **fit_kwargs)
+        fit_seconds = time.perf_counter() - start
+        booster = model.get_booster()
+        best_iteration = int(booster.attr("best_iteration")) if booster.attr("best_iteration") is not None else None
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        proba = booster.predict(self.test_matrix(), iteration_range=iteration_range)
+        if trial is not None and best_iteration is not None:
+            trial.set_user_attr("best_iteration", best_iteration)
+        return {
+            "model": model,
+            "fit_seconds": fit_seconds,
+            "best_iteration": best_iteration,
+            "auc_test": roc_auc_score(self.y_test, proba),
+            "accuracy_test": accuracy_score(self.y_test, (proba > 0.5).astype(np.int64)),
+        }
+
+
+def _maximized(metric: str) -> bool:
+    """Whether a larger *metric* is better, by XGBoost's own rule for early stopping."""
+    return metric != "mape" and metric.startswith(("auc", "aucpr", "pre", "map", "ndcg"))
+
+
+class _PruningCallback(xgb.callback.TrainingCallback):
+    """Report a validation metric (times *sign*) to an Optuna trial every *every* rounds; raise TrialPruned on request."""
+
+    def __init__(self, trial: optuna.Trial, *, every: int = 10, data_name: str = "valid", metric: str = "auc", sign: int = 1):
+        self.trial = trial
+        self.every = every
+        self.data_name = data_name
+        self.metric = metric
+        self.sign = sign
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        if (epoch + 1) % self.every == 0:
+            self.trial.report(self.sign * evals_log[self.data_name][self.metric][-1], step=epoch + 1)
+            if self.trial.should_prune():
+                raise optuna.TrialPruned(f"pruned after {epoch + 1} rounds")
+        return False
+
+
+def make_pruner(name: str, *, warmup_rounds: int = 50, max_rounds: int | str = "auto") -> optuna.pruners.BasePruner:
+    """``median`` / ``hyperband`` / ``none`` pruner over boosting rounds (the reported steps)."""
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=warmup_rounds)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=warmup_rounds, max_resource=max_rounds)
+    if name == "none":
+        return optuna.pruners.NopPruner()
+    raise ValueError(f"unknown pruner {name!r}")
+
+
+# ----- parallel studies -----
+FINISHED_STATES = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+
+
+def _storage(storage: str):
+    """``sqlite:///…`` (or any RDB URL) as is; a plain path becomes an Optuna journal file."""
+    if "://" in storage:
+        return storage
+    return optuna.storages.journal.JournalStorage(optuna.storages.journal.JournalFileBackend(storage))
+
+
+def _default_shared_dir(storage: str) -> str:
+    """``<storage file without extension>_data`` for a journal file or SQLite database.
+
+    Server-backed storages (PostgreSQL, MySQL …) have no local file to sit next to, so
+    they need an explicit *shared_dir*.
+    """
+    if "://" not in storage:
+        return f"{os.path.splitext(storage)[0]}_data"
+    from sqlalchemy.engine import make_url
+
+    url = make_url(storage)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError(f"pass shared_dir for storage {url.render_as_string(hide_password=True)!r}: it has no local database file")
+    return f"{os.path.splitext(url.database)[0]}_data"
+
+
+def _timed_objective(trial: optuna.Trial, *, objective, data: TuningData, worker: int) -> float:
+    start = time.perf_counter()
+    try:
+        return objective(trial, data)
+    finally:
+        trial.set_user_attr("worker", worker)
+        trial.set_user_attr("seconds", time.perf_counter() - start)
+
+
+def _study_worker(objective, study_name: str, storage: str, shared_dir: str, n_trials: int, n_jobs: int | None, worker: int, pruner, valid_size):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    data = TuningData.open_shared(shared_dir, n_jobs=n_jobs, valid_size=valid_size)
+    study = optuna.load_study(study_name=study_name, storage=_storage(storage), pruner=pruner)
+    if len(study.get_trials(deepcopy=False, states=FINISHED_STATES)) >= n_trials:
+        return
+    study.optimize(
+        partial(_timed_objective, objective=objective, data=data, worker=worker),
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=FINISHED_STATES)],
+    )
+
+
+def run_parallel_study(
+    objective: Callable[[optuna.Trial, TuningData], float],
+    data: TuningData | str,
+    *,
+    study_name: str,
+    storage: str,
+    n_trials: int,
+    n_workers: int = os.cpu_count() or 1,
+    n_jobs: int | None = 1,
+    direction: str = "maximize",
+    shared_dir: str | None = None,
+    pruner: optuna.pruners.BasePruner | None = None,
+    valid_size: float | None = None,
+) -> optuna.Study:
+    """Run one Optuna study with *n_workers* processes sharing a local storage.
+
+    *storage* is an RDB URL (``sqlite:///tuning.db``) or a path to an Optuna journal
+    file (recommended for many local workers: no database locking). The study is
+    created with ``load_if_exists=True``, so calling this again after a crash resumes
+    it: trials still marked RUNNING from the dead run are failed and re-enqueued with
+    their parameters, and workers stop once *n_trials* trials are complete or pruned.
+
+    The training/test data is written once to *shared_dir* (default: next to the
+    journal file or SQLite database; required for server storages) as float32 ``.npy`` files and memory-mapped by every worker; pass the
+    directory path instead of a :class:`TuningData` to reuse an existing copy.
+    ``objective(trial, data)`` must be importable (module level) for the spawned
+    workers. Each trial records ``worker`` and ``seconds`` user attributes; see
+    :func:`study_throughput`.
+
+    Parameters
+    ----------
+    n_workers : int – worker processes
+    n_jobs : int or None, default 1 – XGBoost threads per worker (None = all cores)
+    pruner : optuna pruner used by every worker (Optuna does not persist it)
+    valid_size : float, optional – ``TuningData.valid_size`` of the workers' data
+    """
+    if isinstance(data, TuningData):
+        shared_dir = shared_dir or _default_shared_dir(storage)
+        data.save_shared(shared_dir)
+    else:
+        shared_dir = data
+
+    study = optuna.create_study(study_name=study_name, storage=_storage(storage), direction=direction, pruner=pruner, load_if_exists=True)
+    for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.RUNNING,)):
+        study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+        # no skip_if_exists: the trial just failed has these parameters itself
+        study.enqueue_trial(trial.params)
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_study_worker, args=(objective, study_name, storage, shared_dir, n_trials, n_jobs, i, pruner, valid_size))
+        for i in range(n_workers)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    failed = [p.exitcode for p in workers if p.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"{len(failed)} tuning worker(s) exited with codes {failed}")
+    return optuna.load_study(study_name=study_name, storage=_storage(storage))
+
+
+def study_throughput(study: optuna.Study) -> dict:
+    """Wall-clock throughput of the finished trials of *study*."""
+    trials = [t for t in study.get_trials(deepcopy=False) if t.datetime_complete is not None and t.state.is_finished()]
+    if not trials:
+        return {"trials": 0}
+    wall = (max(t.datetime_complete for t in trials) - min(t.datetime_start for t in trials)).total_seconds()
+    seconds = [t.user_attrs["seconds"] for t in trials if "seconds" in t.user_attrs]
+    return {
+        "trials": len(trials),
+        "wall_seconds": wall,
+        "trials_per_hour": len(trials) / wall * 3600 if wall > 0 else float("nan"),
+        "mean_trial_seconds": float(np.mean(seconds)) if seconds else float("nan"),
+        "workers": len({t.user_attrs.get("worker") for t in trials}),
+    }
@@ -0,0 +1,264 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable
+import joblib
+import pandas as pd
+from src.modeling import load_model
+from src.pipelines.ingestion_pipeline import run_ingestion
+from src.pipelines.preprocessing_pipeline import run_preprocessing
+from src.pipelines.feature_pipeline import run_feature_engineering
+from src.pipelines.model_pipeline import METRICS, run_model_pipeline
+
+__all__ = [
+    "StageCache",
+    "run_cached_pipeline",
+]
+
+CHUNK_BYTES = 1 << 20
+
+
+def _source_modules(func: Callable) -> list:
+    """Modules of *func*'s package that it can reach through module globals (itself included).
+
+    ``run_preprocessing`` is a thin wrapper around ``data_transform``; following the
+    imported names makes an edit of the transform (or a helper it imports) invalidate
+    the stage, not only an edit of the wrapper.
+    """
+    root = func.__module__.split(".")[0]
+    seen, todo = set(), [func.__module__]
+    while todo:
+        name = todo.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+        for value in vars(sys.modules[name]).values():
+            module = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(module, str) and module.split(".")[0] == root:
+                todo.append(module)
+    return sorted(seen)
+
+
+class StageCache:
+    """Content-addressed cache of pipeline stage outputs.
+
+    A stage's fingerprint hashes its input files (content, or size + mtime with
+    ``hash_inputs="mtime"``), the source of the modules of its package that it reaches,
+    and its parameters. When a run with the same fingerprint is recorded, the stage is
+    skipped: output files that are missing or changed are restored from the object store
+    and the recorded result is returned. Otherwise the stage runs, its output files and
+    result are stored by content hash and the run is recorded.
+
+    Layout under *cache_dir*: ``objects/<sha256>`` (file contents and pickled results),
+    ``stages/<stage>-<fingerprint>.json`` (run manifests) and ``files.json`` (content
+    hashes memoised by path, size and mtime, so unchanged inputs are not re-read).
+
+    Parameters
+    ----------
+    cache_dir : directory of the cache (created on first use)
+    hash_inputs : {"content", "mtime"}, default "content"
+    """
+
+    def __init__(self, cache_dir: str, *, hash_inputs: str = "content"):
+        if hash_inputs not in ("content", "mtime"):
+            raise ValueError(f"unknown hash_inputs {hash_inputs!r}, expected 'content' or 'mtime'")
+        self.cache_dir = Path(cache_dir)
+        self.hash_inputs = hash_inputs
+        self.history = []  # (stage, fingerprint, "hit" | "run") per call
+        self._files_path = self.cache_dir / "files.json"
+        self._files = json.loads(self._files_path.read_text()) if self._files_path.exists() else {}
+
+    # ----- hashing -----
+    def file_digest(self, path: str) -> str:
+        """sha256 of a file's content, memoised by (path, size, mtime)."""
+        stat = os.stat(path)
+        key = str(Path(path).resolve())
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        known = self._files.get(key)
+        if known is not None and known[0] == stamp:
+            return known[1]
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(CHUNK_BYTES), b""):
+                digest.update(block)
+        self._files[key] = [stamp, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def _input_digest(self, path: str) -> list:
+        """Digest of an input file, or of every file of an input directory."""
+        path = Path(path)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        if self.hash_inputs == "mtime":
+            return [[str(p.relative_to(path) if path.is_dir() else p.name), p.stat().st_size, p.stat().st_mtime_ns] for p in files]
+        return [[str(p.relative_to(path) if path.is_dir() else p.name), self.file_digest(p)] for p in files]
+
+    def fingerprint(self, func: Callable, inputs: dict, params: dict) -> str:
+        """Hash of *func*'s source closure, the *inputs* files and the *params*."""
+        digest = hashlib.sha256(f"{func.__module__}.{func.__qualname__}".encode())
+        for name in _source_modules(func):
+            digest.update(name.encode())
+            source = getattr(sys.modules[name], "__file__", None)
+            if source:
+                digest.update(Path(source).read_bytes())
+        description = {name: self._input_digest(path) for name, path in inputs.items()}
+        description["params"] = params
+        digest.update(json.dumps(description, sort_keys=True, default=repr).encode())
+        return digest.hexdigest()
+
+    # ----- object store -----
+    def _store_file(self, path: str) -> str:
+        digest = self.file_digest(path)
+        target = self.cache_dir / "objects" / digest
+        if not target.exists():
+            tmp = target.with_suffix(".tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        return digest
+
+    def _restore_file(self, digest: str, path: str):
+        """Copy an object back to *path* unless the file there already has that content."""
+        if os.path.exists(path) and self.file_digest(path) == digest:
+            return
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # a copy, not a link: the next run of the stage overwrites *path* in place
+        shutil.copyfile(self.cache_dir / "objects" / digest, path)
+
+    # ----- stages -----
+    def run(
+        self,
+        func: Callable,
+        *,
+        inputs: dict,
+        outputs: dict | None = None,
+        params: dict | None = None,
+        load: Callable | None = None,
+        force: bool = False,
+    ):
+        """Call ``func(**inputs, **outputs, **params)`` unless an identical run is recorded.
+
+        :param inputs: ``{argument: path}`` of the files / directories the stage reads.
+        :param outputs: ``{argument: path}`` of the files the stage writes.
+        :param params: remaining keyword arguments; part of the fingerprint.
+        :param load: ``load(outputs) -> result`` rebuilding the result from the output
+            files on a hit; without it the result is pickled into the cache.
+        :param force: run (and re-record) even on a hit.
+        :return: the stage's result.
+        """
+        outputs = outputs or {}
+        params = params or {}
+        fingerprint = self.fingerprint(func, inputs, params)
+        stage = func.__name__
+        manifest_path = self.cache_dir / "stages" / f"{stage}-{fingerprint}.json"
+
+        if manifest_path.exists() and not force:
+            manifest = json.loads(manifest_path.read_text())
+            objects = [*manifest["outputs"].values(), *([manifest["result"]] if manifest["result"] else [])]
+            if all((self.cache_dir / "objects" / digest).exists() for digest in objects):
+                for name, digest in manifest["outputs"].items():
+                    self._restore_file(digest, outputs.get(name, manifest["paths"][name]))
+                self._save_files()
+                self.history.append((stage, fingerprint, "hit"))
+                if manifest["result"] is None:
+                    return load(outputs) if load is not None else None
+                return joblib.load(self.cache_dir / "objects" / manifest["result"])
+
+        result = func(**inputs, **outputs, **params)
+        (self.cache_dir / "objects").mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "stage": stage,
+            "outputs": {name: self._store_file(path) for name, path in outputs.items()},
+            "paths": {name: str(path) for name, path in outputs.items()},
+            "result": None,
+        }
+        if load is None and result is not None:
+            tmp = self.cache_dir / "objects" / f"{fingerprint}.result.tmp"
+            joblib.dump(result, tmp)
+            manifest["result"] = self._store_file(tmp)
+            os.remove(tmp)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+        self._save_files()
+        self.history.append((stage, fingerprint, "run"))
+        return result
+
+    def _save_files(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._files_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._files))
+        os.replace(tmp, self._files_path)
+
+
+def _model_results(outputs: dict, paths: dict) -> dict:
+    """The cached pipeline's result, rebuilt from the model stage's files."""
+    results = json.loads(Path(outputs["metrics_output_path"]).read_text())
+    results["model"] = load_model(outputs["model_output_path"])
+    results["model_output_path"] = outputs["model_output_path"]
+    for name, path in paths.items():
+        frame = pd.read_parquet(path)
+        results[name] = frame["y"] if name.startswith("y_") else frame
+    return results
+
+
+def run_cached_pipeline(
+    data_dir: str,
+    work_dir: str,
+    *,
+    cache_dir: str | None = None,
+    prepare_kwargs: dict,
+    model_kwargs: dict | None = None,
+    hash_inputs: str = "content",
+):
+    """Ingestion → preprocessing → features → model, each stage skipped while unchanged.
+
+    Intermediate files go to *work_dir* (``raw_data.parquet``, ``processed_data.parquet``,
+    ``X_train.parquet`` …, ``model.joblib``); *cache_dir* defaults to ``work_dir/.cache``.
+    Changing only *model_kwargs* (``xgb_params``, ``oversample`` …) reruns the model stage
+    alone; changing *prepare_kwargs* (``to_drop``, ``cutoff`` …) reruns features and model.
+
+    The model stage stores only its files (model and metrics JSON), not its result:
+    the frames are already cached as the feature stage's Parquet outputs.
+
+    :return: ``(results, cache)`` – the metrics, ``model``, ``model_output_path`` and the
+        ``X_train`` / ``y_train`` / ``X_test`` / ``y_test`` read back from Parquet, and the
+        :class:`StageCache`, whose ``history`` records which stages ran.
+    """
+    work = Path(work_dir)
+    work.mkdir(parents=True, exist_ok=True)
+    cache = StageCache(cache_dir or work / ".cache", hash_inputs=hash_inputs)
+    paths = {name: str(work / f"{name}.parquet") for name in ("X_train", "y_train", "X_test", "y_test")}
+
+    cache.run(
+        run_ingestion,
+        inputs={"data_dir": data_dir},
+        outputs={"output_path": str(work / "raw_data.parquet")},
+        load=lambda out: None,
+    )
+    cache.run(
+        run_preprocessing,
+        inputs={"raw_data_path": str(work / "raw_data.parquet")},
+        outputs={"output_path": str(work / "processed_data.parquet")},
+        load=lambda out: None,
+    )
+    cache.run(
+        run_feature_engineering,
+        inputs={"processed_data_path": str(work / "processed_data.parquet")},
+        outputs={f"{name}_path": path for name, path in paths.items()},
+        params=prepare_kwargs,
+        load=lambda out: None,
+    )
+    outputs = {"model_output_path": str(work / "model.joblib"), "metrics_output_path": str(work / "metrics.json")}
+    results = cache.run(
+        run_model_pipeline,
+        inputs={f"{name}_path": path for name, path in paths.items()},
+        outputs=outputs,
+        params=model_kwargs or {},
+        load=lambda out: _model_results(out, paths),
+    )
+    # a run returns every artefact of run_model_pipeline: keep those a hit rebuilds
+    results = {name: results[name] for name in (*METRICS, "model", *paths)}
+    results["model_output_path"] = outputs["model_output_path"]
+    return results, cache
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.ingestion.loader import load_data
+from src.preprocessing.transform import data_transform
+from src.features.prepare import prepare_model_data
+from src.modeling import save_model
+from src.pipelines.model_pipeline import train_and_evaluate
+from src.profiling import profile_step, profiled
+
+__all__ = [
+    "STAGES",
+    "run_end_to_end",
+]
+
+# Checkpointable stages and the files they write (names as used by run_cached_pipeline)
+STAGES = {
+    "ingestion": ("raw_data.parquet",),
+    "preprocessing": ("processed_data.parquet",),
+    "features": ("X_train.parquet", "y_train.parquet", "X_test.parquet", "y_test.parquet", "transformer.joblib"),
+    "model": ("model.joblib",),
+}
+
+
+@profiled
+def run_end_to_end(
+    data_dir: str,
+    *,
+    prepare_kwargs: dict,
+    model_kwargs: dict | None = None,
+    checkpoint_dir: str | None = None,
+    checkpoint_stages: tuple = tuple(STAGES),
+):
+    """Raw data → trained model in one process, handing DataFrames from stage to stage.
+
+    The chained ``run_*`` pipelines pass everything through Parquet: the raw frame, the
+    processed frame and the four feature files are each written and read back. Here
+    the stages (``load_data`` → ``data_transform`` → ``prepare_model_data`` →
+    ``train_and_evaluate``) take the previous stage's frame as is, so nothing is
+    serialised on the way and the results equal those of the chained pipelines.
+
+    With *checkpoint_dir* the outputs of *checkpoint_stages* are also written there
+    (file names in :data:`STAGES`, readable by the ``run_*`` pipelines) by a
+    background thread while the next stage computes; no stage modifies its input, so
+    the frames can be written concurrently. All writes are finished (and their errors
+    raised) before returning.
+
+    :param prepare_kwargs: keyword arguments of ``prepare_model_data``.
+    :param model_kwargs: keyword arguments of ``train_and_evaluate`` (``xgb_params`` …).
+    :return: the ``run_model_pipeline`` dict plus the fitted ``transformer``.
+    """
+    unknown = set(checkpoint_stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"unknown checkpoint stages {sorted(unknown)}, expected some of {list(STAGES)}")
+    out = None
+    if checkpoint_dir is not None:
+        out = Path(checkpoint_dir)
+        out.mkdir(parents=True, exist_ok=True)
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        def checkpoint(stage: str, *objects):
+            if out is None or stage not in checkpoint_stages:
+                return
+            for name, obj in zip(STAGES[stage], objects):
+                pending.append(writer.submit(_write, obj, out / name))
+
+        with profile_step("ingestion") as step:
+            raw = load_data(data_dir)
+            step["rows_out"] = len(raw)
+        checkpoint("ingestion", raw)
+
+        with profile_step("preprocessing", rows_in=len(raw)) as step:
+            processed = data_transform(raw)
+            step["rows_out"] = len(processed)
+        checkpoint("preprocessing", processed)
+        del raw
+
+        with profile_step("features", rows_in=len(processed)) as step:
+            X_train, y_train, X_test, y_test, transformer = prepare_model_data(
+                processed, **prepare_kwargs, return_transformer=True
+            )
+            step["rows_out"] = len(X_train) + len(X_test)
+        checkpoint("features", X_train, y_train.to_frame("y"), X_test, y_test.to_frame("y"), transformer)
+        del processed
+
+        with profile_step("model", rows_in=len(X_train)):
+            results = train_and_evaluate(X_train, y_train, X_test, y_test, **(model_kwargs or {}))
+        checkpoint("model", results["model"])
+
+        with profile_step("checkpoint_wait"):
+            for future in pending:
+                future.result()
+    results["transformer"] = transformer
+    return results
+
+
+def _write(obj, path: Path):
+    """Checkpoint one stage output: frames as Parquet, models / transformers with their own ``save``."""
+    if path.suffix == ".parquet":
+        obj.to_parquet(path, index=False)
+    elif hasattr(obj, "save"):
+        obj.save(path)
+    else:
+        save_model(obj, path)
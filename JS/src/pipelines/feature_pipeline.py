@@ -1,23 +1,44 @@
 import pandas as pd
 from src.features.prepare import prepare_model_data
+from src.features.categories import categories_of, save_categories
+from src.profiling import profile_step, profiled
 
 
+@profiled
 def run_feature_engineering(
     processed_data_path: str,
     X_train_path: str,
     X_test_path: str,
     y_train_path: str,
     y_test_path: str,
+    *,
+    row_group_size: int | None = None,
+    categories_path: str | None = None,
+    transformer_path: str | None = None,
     **prepare_kwargs,
 ):
-    """Load processed data, generate feature matrices, and save them to Parquet files."""
-    df = pd.read_parquet(processed_data_path)
+    """Load processed data, generate feature matrices, and save them to Parquet files.
 
-    X_train, y_train, X_test, y_test = prepare_model_data(df, **prepare_kwargs)
+    *row_group_size* bounds the rows per Parquet row group, i.e. the unit that
+    streaming training (``train_model_streaming``) reads at a time. With
+    ``encoding="native"`` the frozen category vocabulary is written as JSON to
+    *categories_path*; pass it on to the model pipeline and the scorer. The fitted
+    ``FeatureTransformer`` (training-window statistics) is pickled to *transformer_path*.
+    """
+    with profile_step("read_parquet") as step:
+        df = pd.read_parquet(processed_data_path)
+        step["rows_out"] = len(df)
 
-    X_train.to_parquet(X_train_path, index=False)
-    X_test.to_parquet(X_test_path, index=False)
-    y_train.to_frame("y").to_parquet(y_train_path, index=False)
-    y_test.to_frame("y").to_parquet(y_test_path, index=False)
+    X_train, y_train, X_test, y_test, transformer = prepare_model_data(df, **prepare_kwargs, return_transformer=True)
+
+    with profile_step("write_parquet", rows_in=len(X_train) + len(X_test)):
+        X_train.to_parquet(X_train_path, index=False, row_group_size=row_group_size)
+        X_test.to_parquet(X_test_path, index=False, row_group_size=row_group_size)
+        y_train.to_frame("y").to_parquet(y_train_path, index=False)
+        y_test.to_frame("y").to_parquet(y_test_path, index=False)
+    if transformer_path is not None:
+        transformer.save(transformer_path)
+    if categories_path is not None:
+        save_categories(categories_of(X_train), categories_path)
 
     return X_train, y_train, X_test, y_test
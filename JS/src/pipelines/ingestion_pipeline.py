@@ -1,7 +1,12 @@
 import pandas as pd
-from src.ingestion.loader import load_data
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.ingestion.loader import load_data, load_data_chunks, DEFAULT_BLOCK_SIZE
+from src.ingestion.schema import raw_arrow_schema
+from src.profiling import profile_step, profiled
 
 
+@profiled
 def run_ingestion(data_dir: str, output_path: str) -> pd.DataFrame:
     """
     Pipeline step: load raw data and save as Parquet for downstream processing.
@@ -11,5 +16,46 @@ def run_ingestion(data_dir: str, output_path: str) -> pd.DataFrame:
     :return: Loaded DataFrame.
     """
     df = load_data(data_dir)
-    df.to_parquet(output_path, index=False)
+    with profile_step("write_parquet", rows_in=len(df)):
+        df.to_parquet(output_path, index=False)
     return df
+
+
+@profiled
+def run_streaming_ingestion(data_dir: str, output_path: str, *, block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """
+    Pipeline step, bounded-memory variant: merge transactions chunk by chunk and append
+    each chunk to the Parquet file as its own row group.
+
+    Peak memory depends on *block_size* (plus the resident lookup tables), not on the
+    number of transactions. The file schema comes from the declared column types
+    (:func:`raw_arrow_schema`), so a column that is all missing in the first chunk or
+    parsed differently in a later one does not break the write. Label columns are stored
+    as strings: ``compact_frame(pd.read_parquet(output_path))`` has the values of
+    ``load_data(data_dir)``.
+
+    :param data_dir: Path to raw data directory containing CSV/JSON files.
+    :param output_path: Path where the merged raw data will be saved (Parquet format).
+    :param block_size: Approximate number of JSON bytes parsed per chunk.
+    :return: Number of rows written.
+    """
+    writer = None
+    rows = 0
+    try:
+        for chunk in load_data_chunks(data_dir, block_size):
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, raw_arrow_schema(chunk))
+            writer.write_table(_to_table(chunk, writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _to_table(chunk: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """Cast each column of *chunk* to its field of *schema* (strings → timestamps, NaN → null …)."""
+    return pa.Table.from_arrays(
+        [pa.array(chunk[field.name], from_pandas=True).cast(field.type) for field in schema],
+        schema=schema,
+    )
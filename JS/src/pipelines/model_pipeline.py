@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 import pandas as pd
 from src.modeling import (
@@ -6,8 +7,15 @@ from src.modeling import (
     auc_score,
     accuracy_cls,
 )
+from src.modeling.streaming import train_model_streaming, evaluate_streaming, DEFAULT_BATCH_ROWS
+from src.modeling.backtest import BacktestData, run_backtest, summarize_backtest
+from src.features.categories import apply_categories, load_categories
+from src.profiling import profile_step, profiled
 
+METRICS = ("auc_train", "auc_test", "accuracy_train", "accuracy_test")
 
+
+@profiled
 def run_model_pipeline(
     X_train_path: str,
     y_train_path: str,
@@ -16,33 +24,78 @@ def run_model_pipeline(
     model_output_path: str,
     *,
     oversample: bool = True,
+    oversample_method: str = "rows",
     xgb_params: dict | None = None,
+    categories_path: str | None = None,
+    metrics_output_path: str | None = None,
 ):
-    """Train model, compute AUC + accuracy, return all artefacts."""
+    """Train model, compute AUC + accuracy, return all artefacts.
+
+    *categories_path* – vocabulary written by ``run_feature_engineering`` for
+    natively encoded columns; both splits are re-cast to it after reading (Parquet only
+    keeps the levels present in each file).
+    *metrics_output_path* – optional JSON file of the four metrics, written next to the model.
+    """
 
     # load data
-    X_train = pd.read_parquet(X_train_path)
-    y_train = pd.read_parquet(y_train_path)["y"]
-    X_test  = pd.read_parquet(X_test_path)
-    y_test  = pd.read_parquet(y_test_path)["y"]
+    with profile_step("read_parquet") as step:
+        X_train = pd.read_parquet(X_train_path)
+        y_train = pd.read_parquet(y_train_path)["y"]
+        X_test  = pd.read_parquet(X_test_path)
+        y_test  = pd.read_parquet(y_test_path)["y"]
+        step["rows_out"] = len(X_train) + len(X_test)
+    if categories_path is not None:
+        categories = load_categories(categories_path)
+        X_train, X_test = apply_categories(X_train, categories), apply_categories(X_test, categories)
 
-    # train
-    model, X_res, y_res = train_model(
+    results = train_and_evaluate(
         X_train,
         y_train,
-        oversample_enabled=oversample,
+        X_test,
+        y_test,
+        oversample=oversample,
+        oversample_method=oversample_method,
         xgb_params=xgb_params,
     )
 
-    # metrics
-    auc_train = auc_score(model, X_res, y_res)
-    auc_test  = auc_score(model, X_test, y_test)
-    acc_train = accuracy_cls(model, X_res, y_res)
-    acc_test  = accuracy_cls(model, X_test, y_test)
-
     # save
     Path(model_output_path).parent.mkdir(parents=True, exist_ok=True)
-    save_model(model, model_output_path)
+    save_model(results["model"], model_output_path)
+    if metrics_output_path is not None:
+        Path(metrics_output_path).write_text(json.dumps({name: float(results[name]) for name in METRICS}))
+    return results
+
+
+@profiled
+def train_and_evaluate(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_test: pd.DataFrame,
+    y_test: pd.Series,
+    *,
+    oversample: bool = True,
+    oversample_method: str = "rows",
+    xgb_params: dict | None = None,
+):
+    """In-memory body of :func:`run_model_pipeline`: train, compute AUC + accuracy, return all artefacts."""
+
+    # train
+    with profile_step("train", rows_in=len(X_train)) as step:
+        model, X_res, y_res = train_model(
+            X_train,
+            y_train,
+            oversample_enabled=oversample,
+            oversample_method=oversample_method,
+            xgb_params=xgb_params,
+        )
+        step["rows_out"] = len(X_res)
+
+    # metrics
+    with profile_step("metrics", rows_in=len(X_res) + len(X_test)):
+        auc_train = auc_score(model, X_res, y_res)
+        auc_test  = auc_score(model, X_test, y_test)
+        acc_train = accuracy_cls(model, X_res, y_res)
+        acc_test  = accuracy_cls(model, X_test, y_test)
 
     return {
         "model": model,
@@ -57,3 +110,87 @@ def run_model_pipeline(
         "X_test": X_test,
         "y_test": y_test,
     }
+
+
+@profiled
+def run_streaming_model_pipeline(
+    X_train_path: str,
+    y_train_path: str,
+    X_test_path: str,
+    y_test_path: str,
+    model_output_path: str,
+    *,
+    oversample: bool = True,
+    oversample_method: str = "weights",
+    xgb_params: dict | None = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    external_memory: bool = False,
+    categories_path: str | None = None,
+):
+    """Out-of-core variant: stream Parquet batches into XGBoost, score the test split batch-wise.
+
+    X is never loaded into pandas as a whole, so the training set is bounded by the
+    quantised matrix (or disk, with *external_memory*) instead of RAM for two pandas
+    copies. Paths may be Parquet files or directories of parts. Returns the model,
+    test metrics and the run's ``stats`` (rows, seconds, rows_per_second, peak_rss_mb).
+    *categories_path* is the vocabulary of natively encoded columns, as in ``run_model_pipeline``.
+    """
+    categories = None if categories_path is None else load_categories(categories_path)
+    model, stats = train_model_streaming(
+        X_train_path,
+        y_train_path,
+        oversample_enabled=oversample,
+        oversample_method=oversample_method,
+        xgb_params=xgb_params,
+        batch_rows=batch_rows,
+        external_memory=external_memory,
+        categories=categories,
+    )
+    metrics = evaluate_streaming(model, X_test_path, y_test_path, batch_rows=batch_rows, categories=categories)
+
+    Path(model_output_path).parent.mkdir(parents=True, exist_ok=True)
+    save_model(model, model_output_path)
+
+    return {"model": model, **metrics, "stats": stats}
+
+
+@profiled
+def run_backtest_pipeline(
+    processed_data_path: str,
+    report_path: str | None = None,
+    *,
+    start: str,
+    n_folds: int,
+    freq: str = "MS",
+    scheme: str = "expanding",
+    train_window: str | None = None,
+    oversample: bool = True,
+    oversample_method: str = "rows",
+    xgb_params: dict | None = None,
+    n_workers: int = 1,
+    n_jobs: int | None = None,
+    **encode_kwargs,
+):
+    """Rolling-origin backtest of the processed data: encode once, one model fit per fold.
+
+    *encode_kwargs* go to ``BacktestData.from_processed`` (``to_drop``, ``to_categorize``,
+    ``encoding``, ``smoothing``, …); the folds are ``BacktestData.folds(start=...,
+    n_folds=..., freq=..., scheme=..., train_window=...)``. The per-fold report is
+    written as CSV to *report_path* if given.
+    """
+    df = pd.read_parquet(processed_data_path)
+    data = BacktestData.from_processed(df, **encode_kwargs)
+    folds = data.folds(start=start, n_folds=n_folds, freq=freq, scheme=scheme, train_window=train_window)
+    report = run_backtest(
+        data,
+        folds,
+        xgb_params=xgb_params,
+        oversample_enabled=oversample,
+        oversample_method=oversample_method,
+        n_workers=n_workers,
+        n_jobs=n_jobs,
+    )
+    if report_path is not None:
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        report.to_csv(report_path, index=False)
+    return {"report": report, "summary": summarize_backtest(report), "data": data}
@@ -1,8 +1,14 @@
+import os
+from pathlib import Path
 import pandas as pd
-from src.preprocessing.transform import data_transform
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.preprocessing.transform import data_transform, data_transform_incremental
+from src.profiling import profile_step, profiled
 
 
-def run_preprocessing(raw_data_path: str, output_path: str) -> pd.DataFrame:
+@profiled
+def run_preprocessing(raw_data_path: str, output_path: str, *, state_path: str | None = None) -> pd.DataFrame:
     """
     1. Load merged raw data (Parquet) produced by ingestion.
     2. Apply `data_transform` (identical to notebook logic).
@@ -10,9 +16,89 @@ def run_preprocessing(raw_data_path: str, output_path: str) -> pd.DataFrame:
 
     :param raw_data_path: Path to Parquet file with merged raw data.
     :param output_path: Path where the processed data will be saved.
+    :param state_path: Optional path to also save the per-user state that seeds
+        :func:`run_incremental_preprocessing`. The processed rows still go to
+        *output_path*; write them as ``<output_dir>/part-00000.parquet`` to make them
+        the first part of that function's dataset.
     :return: Processed DataFrame.
     """
+    with profile_step("read_parquet") as step:
+        df = pd.read_parquet(raw_data_path)
+        step["rows_out"] = len(df)
+    if state_path is None:
+        processed_df = data_transform(df)
+    else:
+        processed_df, state = data_transform_incremental(df)
+        _save_state(state, state_path)
+    with profile_step("write_parquet", rows_in=len(processed_df)):
+        processed_df.to_parquet(output_path, index=False)
+    return processed_df
+
+
+@profiled
+def run_incremental_preprocessing(raw_data_path: str, output_dir: str, state_path: str) -> pd.DataFrame:
+    """
+    Nightly step: preprocess only the new transactions and append them to the processed dataset.
+
+    1. Load the new merged raw rows (Parquet) and the per-user state, if one exists.
+    2. Apply `data_transform_incremental` – lag features come from the state, not the history.
+    3. Append the result to *output_dir* as a new Parquet part and save the updated state.
+
+    The state file is the commit point: the part is written under a temporary name, the
+    state (recording the part's number) replaces the old one, and only then is the part
+    renamed. A run that dies before the state is saved leaves the dataset and the state
+    as they were, so rerunning it does not append the rows twice; a run that dies after
+    it has its part renamed by the next run. New parts are numbered after the highest
+    one recorded or present, so deleting a part never causes a collision.
+
+    To seed the state from the full history, run :func:`run_preprocessing` with
+    ``state_path`` and ``output_path=<output_dir>/part-00000.parquet``, so the history
+    and the nightly parts form one dataset.
+
+    :param raw_data_path: Path to Parquet file with the new merged raw rows.
+    :param output_dir: Directory of the processed Parquet dataset (``pd.read_parquet(output_dir)``).
+    :param state_path: Path of the per-user state Parquet file (created on the first run).
+    :return: Processed DataFrame of the new rows.
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    state, last_part = None, -1
+    if os.path.exists(state_path):
+        state, last_part = pd.read_parquet(state_path), _committed_part(state_path)
+        # finish a run that died between saving its state and renaming its part
+        pending = out / f".part-{last_part:05d}.parquet.tmp"
+        if last_part >= 0 and pending.exists():
+            os.replace(pending, out / f"part-{last_part:05d}.parquet")
+
     df = pd.read_parquet(raw_data_path)
-    processed_df = data_transform(df)
-    processed_df.to_parquet(output_path, index=False)
-    return processed_df
\ No newline at end of file
+    processed_df, state = data_transform_incremental(df, state)
+
+    existing = [int(p.name[5:10]) for p in out.glob("part-[0-9][0-9][0-9][0-9][0-9].parquet")]
+    part = max([last_part, *existing]) + 1
+    tmp_path = out / f".part-{part:05d}.parquet.tmp"  # hidden: not read as part of the dataset
+    processed_df.to_parquet(tmp_path, index=False)
+    _save_state(state, state_path, part=part)
+    os.replace(tmp_path, out / f"part-{part:05d}.parquet")
+    return processed_df
+
+
+_PART_KEY = b"processed_part"  # Parquet metadata of the state: last committed part
+
+
+def _committed_part(state_path: str) -> int:
+    """Number of the last part committed with the state at *state_path* (-1 for none)."""
+    metadata = pq.read_schema(state_path).metadata or {}
+    return int(metadata.get(_PART_KEY, -1))
+
+
+def _save_state(state: pd.DataFrame, state_path: str, *, part: int | None = None):
+    """Write the state atomically so a failed run never leaves a half-written store.
+
+    *part* is recorded in the file's metadata as the processed part committed with it.
+    """
+    table = pa.Table.from_pandas(state)
+    if part is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _PART_KEY: str(part).encode()})
+    tmp_path = f"{state_path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, state_path)
@@ -1,9 +1,11 @@
-from .helpers import get_part_of_day, haversine, flag_within_percent
-from .transform import data_transform
+from .helpers import get_part_of_day, haversine, flag_within_percent, flag_within_percents
+from .transform import data_transform, data_transform_incremental
 
 __all__ = [
     "get_part_of_day",
     "haversine",
     "flag_within_percent",
+    "flag_within_percents",
     "data_transform",
+    "data_transform_incremental",
 ]
\ No newline at end of file
@@ -31,22 +31,135 @@ def haversine(lat1, lon1, lat2, lon2):
     return R * c
 
 # -------------------------------
-# 3. Flag within ±X % of previous amount
+# 3. Row-level feature formulas
 # -------------------------------
+# Used on pandas columns by data_transform and on 1-element arrays by the online
+# scorer, so batch and serving features share one definition.
 
-def flag_within_percent(df: pd.DataFrame, amount_col: str = "amount", user_col: str = "user_id", tolerance_pct: int = 10) -> pd.DataFrame:
-    """Replicates the exact function from the notebook."""
-    df = df.copy()
-    flag_col = f"within_{tolerance_pct}pct"
-
-    def _per_user(group: pd.DataFrame):
-        previous = group[amount_col].shift(1)
-        lower = previous * (1 - tolerance_pct / 100)
-        upper = previous * (1 + tolerance_pct / 100)
-        flag = ((group[amount_col] >= lower) & (group[amount_col] <= upper)).astype(float)
-        flag.iloc[0] = np.nan  # first tx per user has no previous reference
-        return flag
+PART_OF_DAY = np.array([get_part_of_day(hour) for hour in range(24)], dtype=object)
+
+AMOUNT_RATIOS = {
+    "amount/avg_amount": "avg_transaction_amount",
+    "amount/sum_monthly_installments": "sum_of_monthly_installments",
+    "amount/sum_monthly_expenses": "sum_of_monthly_expenses",
+}
+
+# flag column -> (left column, right column, output type)
+COUNTRY_FLAGS = {
+    "country_u=t": ("country_users", "transaction_country", bool),
+    "country_m=t": ("country_merchant", "transaction_country", bool),
+    "countries_same": ("country_merchant", "country_users", int),
+}
+
+WITHIN_TOLERANCES = (10, 5)
+
+
+def round_coordinate(degrees):
+    return np.round(degrees, 2)
+
+
+def hours_from_seconds(seconds):
+    return np.round(seconds / 3600, 2)
+
+
+def speed_kmph(distance_km, hours):
+    return np.minimum(distance_km / hours, 2000)
+
+
+def same_value(left, right):
+    """Equality where a missing value on either side is never equal."""
+    dtypes = getattr(left, "dtype", None), getattr(right, "dtype", None)
+    if dtypes[0] != dtypes[1] and any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        # categoricals only compare against the same vocabulary
+        left, right = left.astype(object), right.astype(object)
+    return (left == right) & pd.notna(left) & pd.notna(right)
+
+
+def to_float(value) -> np.float64:
+    """Scalar → float64 with NaN for missing (None / pd.NA / NaN)."""
+    if value is None or value is pd.NA:
+        return np.float64(np.nan)
+    return np.float64(value)
+
+
+def within_percent(amount, previous, tolerance_pct: int):
+    """1.0 when *amount* is within ±tolerance_pct % of *previous*, else 0.0."""
+    lower = previous * (1 - tolerance_pct / 100)
+    upper = previous * (1 + tolerance_pct / 100)
+    return ((amount >= lower) & (amount <= upper)).astype(float)
+
+# -------------------------------
+# 4. Group boundaries in a sorted frame
+# -------------------------------
+
+class GroupIndex:
+    """User boundaries of a frame already sorted by *keys* (computed once, reused for every lag).
+
+    ``first`` marks the first row of each group, ``reset`` additionally marks rows with a
+    missing key (``groupby`` drops those), so ``shift``/``diff`` reproduce
+    ``df.groupby(keys).shift()/.diff()`` with plain positional offsets.
+    """
+
+    def __init__(self, keys: pd.Series):
+        codes, _ = pd.factorize(keys)
+        self.null = codes < 0
+        self.first = np.ones(len(codes), dtype=bool)
+        self.first[1:] = codes[1:] != codes[:-1]
+        self.first &= ~self.null
+        self.reset = self.first | self.null
+        self.starts = np.flatnonzero(self.first)
 
+    def __len__(self) -> int:
+        return len(self.first)
+
+    def shift(self, values: pd.Series) -> pd.Series:
+        """Previous value within the group; missing on each group's first row."""
+        return values.shift(1).mask(self.reset)
+
+    def diff(self, values: pd.Series) -> pd.Series:
+        """Difference to the previous value within the group."""
+        return values - self.shift(values)
+
+# -------------------------------
+# 5. Flag within ±X % of previous amount
+# -------------------------------
+
+def flag_within_percents(
+    df: pd.DataFrame,
+    amount_col: str = "amount",
+    user_col: str = "user_id",
+    tolerances: tuple = WITHIN_TOLERANCES,
+    *,
+    presorted: bool = False,
+    groups: GroupIndex | None = None,
+) -> pd.DataFrame:
+    """Vectorised ±X % flags for several tolerance bands in one pass.
+
+    The previous amount per user is computed once (one positional shift over the
+    sorted frame) and every band is derived from it with column arithmetic. Output matches
+    :func:`flag_within_percent` exactly: float 0/1, NaN on each user's first
+    transaction. Columns ``within_{pct}pct`` are returned aligned to ``df.index``.
+
+    :param presorted: skip the sort when *df* is already ordered by user and timestamp.
+    :param groups: precomputed :class:`GroupIndex` of the sorted frame (implies *presorted*).
+    """
+    ordered = df if presorted or groups is not None else df.sort_values([user_col, "timestamp"])
+    if groups is None:
+        groups = GroupIndex(ordered[user_col])
+    amount = ordered[amount_col]
+    previous = groups.shift(amount)
+
+    flags = {}
+    for tolerance_pct in tolerances:
+        flag = within_percent(amount, previous, tolerance_pct)
+        flag[groups.reset] = np.nan  # first tx per user has no previous reference
+        flags[f"within_{tolerance_pct}pct"] = flag
+    return pd.DataFrame(flags, index=ordered.index)
+
+
+def flag_within_percent(df: pd.DataFrame, amount_col: str = "amount", user_col: str = "user_id", tolerance_pct: int = 10) -> pd.DataFrame:
+    """Replicates the exact function from the notebook (sorted copy with one flag column)."""
     df = df.sort_values([user_col, "timestamp"])
-    df[flag_col] = df.groupby(user_col, group_keys=False).apply(_per_user)
+    flags = flag_within_percents(df, amount_col, user_col, (tolerance_pct,), presorted=True)
+    df[f"within_{tolerance_pct}pct"] = flags.iloc[:, 0]
     return df
@@ -1,56 +1,178 @@
+import numpy as np
 import pandas as pd
-from src.preprocessing.helpers import get_part_of_day, haversine, flag_within_percent
+from src.ingestion.schema import compact_frame
+from src.profiling import profile_step, profiled
+from src.preprocessing.helpers import (
+    PART_OF_DAY,
+    AMOUNT_RATIOS,
+    COUNTRY_FLAGS,
+    WITHIN_TOLERANCES,
+    GroupIndex,
+    haversine,
+    round_coordinate,
+    hours_from_seconds,
+    speed_kmph,
+    same_value,
+    flag_within_percents,
+)
+
+
+def _calendar_columns(timestamp: pd.Series) -> dict:
+    """Month_Year_EOM / Date (datetime64 days) and Year (int16), computed once per distinct day.
+
+    A missing timestamp gives NaT dates and a missing Year (nullable ``Int16``).
+    """
+    codes, days = pd.factorize(timestamp.dt.normalize(), use_na_sentinel=False)
+    days = pd.Series(days)
+    year = days.dt.year.to_numpy()[codes]
+    return {
+        "Month_Year_EOM": (days + pd.offsets.MonthEnd(0)).to_numpy()[codes],
+        "Date": days.to_numpy()[codes],
+        "Year": pd.array(year, dtype="Int16") if np.isnan(year).any() else year.astype(np.int16),
+    }
+
+
+def _part_of_day(hour: pd.Series) -> np.ndarray:
+    """:data:`PART_OF_DAY` of each hour; None where the hour (timestamp) is missing."""
+    hour = hour.to_numpy(dtype=np.float64)
+    known = ~np.isnan(hour)
+    return np.where(known, PART_OF_DAY[np.where(known, hour, 0).astype(np.intp)], None)
+
+
+def _coordinates(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """Raw lat / lon: flat columns from ingestion, or the nested ``location`` dicts of older frames."""
+    if "location_lat" in df:
+        return df["location_lat"], df["location_long"]
+    return df["location"].apply(lambda x: x.get("lat")), df["location"].apply(lambda x: x.get("long"))
+
+
+# Per-user state carried between incremental runs: the user's last transaction
+STATE_COLUMNS = {
+    "timestamp": "last_timestamp",
+    "latitude": "last_latitude",
+    "longitude": "last_longitude",
+    "amount": "last_amount",
+}
 
 
 def data_transform(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply notebook preprocessing steps to a DataFrame (mutates a copy)."""
-    df = df.copy()
-
-    # ----- Timestamp‑derived columns -----
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["Month_Year_EOM"] = (df["timestamp"] + pd.offsets.MonthEnd(0)).dt.date
-    df["Date"] = df["timestamp"].dt.strftime("%d-%m-%Y")
-    df["Year"] = df["timestamp"].dt.strftime("%Y")
-    df["hour"] = df["timestamp"].dt.hour
-    df["part_of_day"] = df["hour"].apply(get_part_of_day)
-
-    # Ensure user‑ordered history
-    df = df.sort_values(["user_id", "timestamp"])
-
-    # ----- Time‑difference features -----
-    df["time_diff"] = df.groupby("user_id")["timestamp"].diff()
-    df["time_diff_hours"] = (df["time_diff"].dt.total_seconds() / 3600).round(2)
-
-    # ----- Lat / Lon extraction from nested dict -----
-    df["latitude"] = df["location"].apply(lambda x: x.get("lat")).round(2)
-    df["longitude"] = df["location"].apply(lambda x: x.get("long")).round(2)
-
-    # Shift lat / lon / timestamp per user to get previous point
-    df["lat_prev"] = df.groupby("user_id")["latitude"].shift()
-    df["lon_prev"] = df.groupby("user_id")["longitude"].shift()
-    df["time_prev"] = df.groupby("user_id")["timestamp"].shift()
-
-    # Distance and speed
-    df["distance_km"] = haversine(df["lat_prev"], df["lon_prev"], df["latitude"], df["longitude"])
-    df["speed_kmph"] = df["distance_km"] / df["time_diff_hours"]
-    df["speed_kmph"] = df["speed_kmph"].clip(upper=2000)
-
-    # Amount ratios
-    df["amount/avg_amount"] = df["amount"] / df["avg_transaction_amount"]
-    df["amount/sum_monthly_installments"] = df["amount"] / df["sum_of_monthly_installments"]
-    df["amount/sum_monthly_expenses"] = df["amount"] / df["sum_of_monthly_expenses"]
-
-    # Country comparison flags
-    df["country_u=t"] = (df["country_users"] == df["transaction_country"]).astype(bool)
-    df["country_m=t"] = (df["country_merchant"] == df["transaction_country"]).astype(bool)
-    df["countries_same"] = (df["country_merchant"] == df["country_users"]).astype(int)
-
-    # ±10 % and ±5 % amount consistency flags
-    df = flag_within_percent(df, amount_col="amount", user_col="user_id", tolerance_pct=10)
-    df = flag_within_percent(df, amount_col="amount", user_col="user_id", tolerance_pct=5)
-
-    # Remove the very first row per user (as w notebook – no previous history)
-    first_idx = df.sort_values(["user_id", "timestamp"]).groupby("user_id").head(1).index
-    df = df.drop(index=first_idx)
-
-    return df
+    """Apply notebook preprocessing steps to a DataFrame (input is left untouched).
+
+    The frame is sorted by ``["user_id", "timestamp"]`` once and the user boundaries are
+    computed once (:class:`GroupIndex`). Lag/diff features are built on the few columns
+    that need history, and the wide frame is copied a single time, already without each
+    user's first transaction.
+    """
+    processed, _ = data_transform_incremental(df)
+    return processed
+
+
+@profiled
+def data_transform_incremental(df: pd.DataFrame, state: pd.DataFrame | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Preprocess new transactions given the per-user state of everything seen before.
+
+    *state* (indexed by ``user_id``, columns :data:`STATE_COLUMNS`) holds each known user's
+    last transaction; it seeds ``time_diff_hours``, ``distance_km``, ``speed_kmph`` and the
+    ``within_*pct`` flags of that user's first new row. A user absent from the state is seen
+    for the first time, so their first row is dropped exactly as in :func:`data_transform`.
+    Cost scales with ``len(df)``, not with the full history.
+
+    :param df: New (merged raw) transactions, not older than the state per user.
+    :param state: State returned by the previous run, or None for a full run.
+    :return: ``(processed, state)`` – processed rows and the updated state.
+    """
+    timestamp = pd.to_datetime(df["timestamp"])
+    lat_raw, lon_raw = _coordinates(df)
+    hist = pd.DataFrame({
+        "user_id": df["user_id"].array,
+        "timestamp": timestamp.array,
+        "amount": df["amount"].array,
+        "latitude": lat_raw.array,
+        "longitude": lon_raw.array,
+    })
+
+    with profile_step("sort"):
+        # ----- Prepend each known user's last transaction -----
+        n_prior = 0
+        if state is not None:
+            prior = state[state.index.isin(hist["user_id"])]
+            prior = prior.rename(columns={v: k for k, v in STATE_COLUMNS.items()}).rename_axis("user_id")
+            prior = prior.reset_index()[list(hist.columns)]
+            last_seen = hist["user_id"].map(prior.set_index("user_id")["timestamp"])
+            if (hist["timestamp"] < last_seen).any():
+                raise ValueError("transactions older than the user's last processed transaction")
+            n_prior = len(prior)
+            hist = pd.concat([prior, hist], ignore_index=True)
+
+        # ----- Single sort + user boundaries -----
+        order = hist[["user_id", "timestamp"]].sort_values(["user_id", "timestamp"]).index.to_numpy()
+        hist = hist.take(order).reset_index(drop=True)
+        groups = GroupIndex(hist["user_id"])
+        # the very first row per user has no previous history; prior rows are context only
+        keep = ~groups.first & (order >= n_prior)
+        rows = order[keep] - n_prior
+
+    with profile_step("lags"):
+        # ----- Lag features over the sorted history -----
+        time_diff = groups.diff(hist["timestamp"])
+        latitude = round_coordinate(hist["latitude"])
+        longitude = round_coordinate(hist["longitude"])
+        lat_prev = groups.shift(latitude)
+        lon_prev = groups.shift(longitude)
+        time_prev = groups.shift(hist["timestamp"])
+
+    with profile_step("within_pct_flags"):
+        flags = flag_within_percents(hist, amount_col="amount", user_col="user_id", tolerances=WITHIN_TOLERANCES, groups=groups)
+
+    with profile_step("columns"):
+        # ----- One copy of the wide frame -----
+        df = df.take(rows)
+        for col in ("location_lat", "location_long"):
+            if col in df:
+                del df[col]  # replaced by the rounded latitude / longitude below
+        df["timestamp"] = hist["timestamp"].array[keep]
+
+        # ----- Timestamp‑derived columns -----
+        for col, values in _calendar_columns(df["timestamp"]).items():
+            df[col] = values
+        df["hour"] = df["timestamp"].dt.hour
+        df["part_of_day"] = _part_of_day(df["hour"])
+
+        # ----- Time‑difference features -----
+        df["time_diff"] = time_diff.array[keep]
+        df["time_diff_hours"] = hours_from_seconds(df["time_diff"].dt.total_seconds())
+
+        # ----- Lat / Lon and previous point per user -----
+        df["latitude"] = latitude.array[keep]
+        df["longitude"] = longitude.array[keep]
+        df["lat_prev"] = lat_prev.array[keep]
+        df["lon_prev"] = lon_prev.array[keep]
+        df["time_prev"] = time_prev.array[keep]
+
+        # Distance and speed
+        df["distance_km"] = haversine(df["lat_prev"], df["lon_prev"], df["latitude"], df["longitude"])
+        df["speed_kmph"] = speed_kmph(df["distance_km"], df["time_diff_hours"])
+
+        # Amount ratios
+        for col, denominator in AMOUNT_RATIOS.items():
+            df[col] = df["amount"] / df[denominator]
+
+        # Country comparison flags
+        for col, (left, right, kind) in COUNTRY_FLAGS.items():
+            df[col] = same_value(df[left], df[right]).astype(kind)
+
+        # ±10 % and ±5 % amount consistency flags
+        for col in flags.columns:
+            df[col] = flags[col].array[keep]
+
+    with profile_step("compact"):
+        compact_frame(df)
+
+    with profile_step("state"):
+        # ----- Updated state: last row per user -----
+        last = np.append(groups.reset[1:], True) & ~groups.null
+        new_state = hist[last].set_index("user_id").rename(columns=STATE_COLUMNS)
+        if state is not None:
+            new_state = pd.concat([state[~state.index.isin(new_state.index)], new_state]).sort_index()
+
+    return df, new_state
@@ -0,0 +1,199 @@
+import contextvars
+import cProfile
+import functools
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+
+__all__ = [
+    "Profiler",
+    "profile_step",
+    "profiled",
+    "current_rss_mb",
+    "peak_rss_mb",
+    "reset_peak_rss",
+]
+
+
+# ----- memory accounting -----
+def _status_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux; the peak elsewhere)."""
+    rss = _status_mb("VmRSS:")
+    return rss if rss is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of the resident set size since start or :func:`reset_peak_rss`."""
+    peak = _status_mb("VmHWM:")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss():
+    """Reset the kernel's high-water mark (Linux ``clear_refs``); silently a no-op elsewhere."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _count_rows(obj) -> int | None:
+    """Rows of a frame / series, of the first item of a tuple, or an int row count."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, int) and not isinstance(obj, bool):
+        return obj
+    return None
+
+
+# ----- profiler -----
+_ACTIVE = contextvars.ContextVar("profiler", default=None)
+
+
+class Profiler:
+    """Per-step wall time, CPU time, memory and row counts of an instrumented run.
+
+    While active (``with Profiler() as prof:``) every :func:`profile_step` block and
+    :func:`profiled` function appends one record; steps nest, and a record's ``name``
+    is the path of the enclosing steps (``run_preprocessing/data_transform/lags``).
+    Without an active profiler the instrumentation does nothing.
+
+    ``peak_rss_delta_mb`` is the step's resident-memory high-water mark above the RSS at
+    its start (Linux resets the kernel's mark at every step boundary and carries it to
+    the enclosing steps); ``rss_delta_mb`` is what the step left allocated.
+
+    Parameters
+    ----------
+    cprofile_dir : directory for one cProfile dump (``pstats`` format, e.g. for
+        ``snakeviz`` / ``gprof2dot``) per top-level step; None → no cProfile
+    """
+
+    def __init__(self, *, cprofile_dir: str | None = None):
+        self.cprofile_dir = None if cprofile_dir is None else Path(cprofile_dir)
+        self.records = []
+        self._open = []  # records of the steps entered and not yet left
+        self._start = None
+        self._token = None
+
+    def __enter__(self) -> "Profiler":
+        self._start = time.perf_counter()
+        self._token = _ACTIVE.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _ACTIVE.reset(self._token)
+        return False
+
+    def _carry_peak(self):
+        """Fold the kernel's high-water mark into every open step, then reset it."""
+        peak = peak_rss_mb()
+        for record in self._open:
+            record["_peak"] = max(record["_peak"], peak)
+        reset_peak_rss()
+
+    @contextmanager
+    def step(self, name: str, *, rows_in: int | None = None):
+        """Time the enclosed block; set ``rows_out`` on the yielded record to report it."""
+        self._carry_peak()
+        rss = current_rss_mb()
+        record = {
+            "name": "/".join([r["step"] for r in self._open] + [name]),
+            "step": name,
+            "depth": len(self._open),
+            "start_seconds": time.perf_counter() - self._start,
+            "wall_seconds": None,
+            "cpu_seconds": None,
+            "rss_start_mb": rss,
+            "peak_rss_delta_mb": None,
+            "rss_delta_mb": None,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "_peak": rss,
+        }
+        self.records.append(record)
+        self._open.append(record)
+        profile = None
+        if self.cprofile_dir is not None and record["depth"] == 0:
+            profile = cProfile.Profile()
+            profile.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall
+            record["cpu_seconds"] = time.process_time() - cpu
+            if profile is not None:
+                profile.disable()
+                self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(self.cprofile_dir / f"{len(self.records) - 1:03d}-{name}.prof")
+            self._carry_peak()
+            self._open.pop()
+            record["peak_rss_delta_mb"] = record.pop("_peak") - rss
+            record["rss_delta_mb"] = current_rss_mb() - rss
+
+    def report(self) -> pd.DataFrame:
+        """One row per step, in the order the steps started."""
+        columns = [key for key in self.records[0] if key != "_peak"] if self.records else []
+        return pd.DataFrame([{key: r.get(key) for key in columns} for r in self.records], columns=columns)
+
+    def save(self, path: str):
+        """Write the run report: CSV for ``.csv`` paths, JSON (``{"steps": [...]}``) otherwise."""
+        report = self.report()
+        if str(path).endswith(".csv"):
+            report.to_csv(path, index=False)
+            return
+        with open(path, "w") as fh:
+            json.dump({"steps": json.loads(report.to_json(orient="records"))}, fh, indent=2)
+
+
+@contextmanager
+def profile_step(name: str, *, rows_in: int | None = None):
+    """:meth:`Profiler.step` of the active profiler; a no-op (yielding a scratch dict) without one."""
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        yield {}
+        return
+    with profiler.step(name, rows_in=rows_in) as record:
+        yield record
+
+
+def profiled(func=None, *, name: str | None = None):
+    """Decorator: run the function as a :func:`profile_step` named after it.
+
+    ``rows_in`` / ``rows_out`` are the rows of the first DataFrame argument and of the
+    result (a frame, the first frame of a tuple, or a returned row count).
+    """
+    if func is None:
+        return functools.partial(profiled, name=name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _ACTIVE.get() is None:
+            return func(*args, **kwargs)
+        rows_in = next((_count_rows(a) for a in args if isinstance(a, pd.DataFrame)), None)
+        with profile_step(name or func.__name__, rows_in=rows_in) as record:
+            result = func(*args, **kwargs)
+            record["rows_out"] = _count_rows(result)
+        return result
+
+    return wrapper
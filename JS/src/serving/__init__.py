@@ -0,0 +1,13 @@
+from .scorer import OnlineScorer
+from .server import make_server, serve
+from .batching import Histogram, MicroBatcher, AsyncScorer, serve_async
+
+__all__ = [
+    "OnlineScorer",
+    "make_server",
+    "serve",
+    "Histogram",
+    "MicroBatcher",
+    "AsyncScorer",
+    "serve_async",
+]
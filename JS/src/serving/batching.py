@@ -0,0 +1,212 @@
+import asyncio
+import bisect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+import numpy as np
+from .scorer import OnlineScorer, iteration_range
+
+__all__ = [
+    "Histogram",
+    "MicroBatcher",
+    "AsyncScorer",
+    "serve_async",
+]
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` counts values ``<= bounds[i]`` (last bucket is +inf)."""
+
+    def __init__(self, bounds: list):
+        self.bounds = list(bounds) + [float("inf")]
+        self.counts = [0] * len(self.bounds)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": {str(b): c for b, c in zip(self.bounds, self.counts)},
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else float("nan"),
+        }
+
+
+class MicroBatcher:
+    """Gather concurrent single-row requests into micro-batches for one vectorised predict.
+
+    A batch is flushed when it reaches *max_batch_size* rows or when its oldest request has
+    waited *max_wait_ms*, whichever comes first. *predict* receives a 2-D float array and
+    runs on a dedicated worker thread (XGBoost releases the GIL), so the event loop keeps
+    queueing requests while a batch is being scored.
+
+    Parameters
+    ----------
+    predict : callable, 2-D array → 1-D array of probabilities
+    max_batch_size : int, default 256
+    max_wait_ms : float, default 2.0
+    """
+
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], *, max_batch_size: int = 256, max_wait_ms: float = 2.0):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram([2 ** i for i in range(max_batch_size.bit_length() + 1)])
+        self.queue_wait_ms = Histogram([0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100])
+        self._queue = None
+        self._worker = None
+        self._executor = None
+        self._batch = []  # requests taken off the queue and not yet answered
+
+    @classmethod
+    def from_model(cls, model, **kwargs) -> "MicroBatcher":
+        """Batcher around the fitted XGBClassifier's booster (``inplace_predict`` = predict_proba[:, 1]).
+
+        An early-stopped model is scored up to its ``best_iteration``, as ``predict_proba`` does.
+        """
+        booster = model.get_booster()
+        return cls(partial(booster.inplace_predict, iteration_range=iteration_range(booster)), **kwargs)
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batch")
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; requests still queued or in the unfinished batch are cancelled."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        pending = self._batch
+        self._batch = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, _, future in pending:
+            future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self) -> "MicroBatcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def submit(self, row: np.ndarray) -> float:
+        """Queue one feature vector and wait for its probability."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, time.perf_counter(), future))
+        return await future
+
+    def stats(self) -> dict:
+        return {"batch_size": self.batch_sizes.snapshot(), "queue_wait_ms": self.queue_wait_ms.snapshot()}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = batch[0][1] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # drain whatever else is already queued without waiting
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            started = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, queued_at, _ in batch:
+                self.queue_wait_ms.observe((started - queued_at) * 1000)
+
+            try:
+                X = np.vstack([row for row, _, _ in batch])
+                proba = await loop.run_in_executor(self._executor, self.predict, X)
+            except Exception as exc:
+                # a malformed row or a failing predict fails this batch only
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                self._batch = []
+                continue
+            for (_, _, future), p in zip(batch, proba):
+                if not future.done():
+                    future.set_result(float(p))
+            self._batch = []
+
+
+class AsyncScorer:
+    """Async front end: ``OnlineScorer`` features per request + ``MicroBatcher`` inference."""
+
+    def __init__(self, scorer: OnlineScorer, batcher: MicroBatcher):
+        self.scorer = scorer
+        self.batcher = batcher
+
+    async def score(self, tx: dict) -> float:
+        return await self.batcher.submit(self.scorer.features(tx, update_state=True))
+
+
+async def serve_async(scorer: AsyncScorer, host: str = "127.0.0.1", port: int = 8081) -> asyncio.AbstractServer:
+    """Minimal HTTP/1.1 asyncio server: ``POST /score`` (one transaction), ``GET /stats``.
+
+    Every open connection is its own coroutine, so concurrent requests reach the
+    batcher together. Returns the started server (``async with`` / ``serve_forever``).
+    """
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method == "POST" and path == "/score":
+                    try:
+                        tx = json.loads(body)
+                        status, payload = 200, {
+                            "transaction_id": tx.get("transaction_id"),
+                            "fraud_probability": await scorer.score(tx),
+                        }
+                    except (ValueError, KeyError, TypeError) as exc:
+                        status, payload = 400, {"error": str(exc)}
+                elif method == "GET" and path == "/stats":
+                    status, payload = 200, scorer.batcher.stats()
+                else:
+                    status, payload = 404, {"error": "not found"}
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(_handle, host, port)
@@ -0,0 +1,193 @@
+import threading
+import numpy as np
+import pandas as pd
+from src.ingestion.loader import load_dimensions
+from src.preprocessing.helpers import (
+    PART_OF_DAY,
+    AMOUNT_RATIOS,
+    COUNTRY_FLAGS,
+    WITHIN_TOLERANCES,
+    haversine,
+    round_coordinate,
+    hours_from_seconds,
+    speed_kmph,
+    same_value,
+    within_percent,
+    to_float,
+)
+from src.preprocessing.transform import data_transform_incremental, STATE_COLUMNS
+from src.features.prepare import drop_first_transactions
+from src.features.transformer import FeatureTransformer
+from src.features.feature_builders import RateStore
+
+__all__ = [
+    "OnlineScorer",
+]
+
+
+def iteration_range(booster) -> tuple:
+    """Rounds ``predict_proba`` scores with: up to ``best_iteration`` if early-stopped, else all."""
+    best = booster.attr("best_iteration")
+    return (0, int(best) + 1) if best is not None else (0, 0)
+
+
+class OnlineScorer:
+    """Score one raw transaction at a time from in-memory lookup and state stores.
+
+    The processed row is built with the same row-level formulas as ``data_transform``
+    (``src.preprocessing.helpers``) and turned into the model's feature vector by the
+    fitted :class:`~src.features.transformer.FeatureTransformer` of ``prepare_model_data``
+    (vocabularies, merchant ``bad_rate`` and column order from the training window).
+    After scoring, the user's last-event state is advanced to the scored transaction.
+    With a ``bad_rate="asof"`` transformer the merchant rate comes from a
+    :class:`~src.features.feature_builders.RateStore`, fed by :meth:`record_label`.
+
+    Parameters
+    ----------
+    model : fitted XGBClassifier
+    transformer : fitted FeatureTransformer whose features include the model's columns
+    merchants, users, geo_df : lookup tables as returned by ``load_dimensions``
+    state : per-user state from ``data_transform_incremental`` (None → no history)
+    rates : merchant rate store of a ``bad_rate="asof"`` transformer (None → empty store)
+    """
+
+    def __init__(
+        self,
+        model,
+        *,
+        transformer: FeatureTransformer,
+        merchants: pd.DataFrame,
+        users: pd.DataFrame,
+        geo_df: pd.DataFrame | None = None,
+        state: pd.DataFrame | None = None,
+        rates: RateStore | None = None,
+    ):
+        # private single-threaded copy: one-row predictions lose more to OpenMP start-up than they gain
+        self.booster = model.get_booster().copy()
+        self.booster.set_param({"nthread": 1})
+        self._iteration_range = iteration_range(self.booster)
+        self.feature_names = list(self.booster.feature_names)
+        self.transformer = transformer
+        missing = set(self.feature_names) - set(transformer.feature_names_)
+        if missing:
+            raise ValueError(f"the transformer does not produce the model features {sorted(missing)}")
+        # transformer order -> model order (None when they already match)
+        self._take = None
+        if self.feature_names != transformer.feature_names_:
+            position = {name: i for i, name in enumerate(transformer.feature_names_)}
+            self._take = np.array([position[name] for name in self.feature_names])
+
+        self._merchants = merchants.set_index("merchant_id").to_dict("index")
+        self._users = users.set_index("user_id").to_dict("index")
+        self._geo = {} if geo_df is None else geo_df.set_index("transaction_id").to_dict("index")
+        self._state = {}
+        if state is not None:
+            last = state[list(STATE_COLUMNS.values())]
+            for user_id, ts, lat, lon, amount in last.itertuples():
+                self._state[user_id] = (pd.Timestamp(ts).value, lat, lon, to_float(amount))
+        self._rates = None
+        if transformer.bad_rate == "asof":
+            self._rates = rates or RateStore(smoothing=transformer.smoothing, half_life=transformer.half_life)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_training(
+        cls,
+        model,
+        raw_df: pd.DataFrame,
+        data_dir: str,
+        *,
+        transformer: FeatureTransformer | None = None,
+        to_categorize: list = (),
+        target: str = "is_fraud",
+        categories: dict | None = None,
+    ) -> "OnlineScorer":
+        """Build the stores from the merged raw training history (``load_data`` output).
+
+        :param model: fitted XGBClassifier trained on ``prepare_model_data`` output.
+        :param raw_df: merged raw history; seeds the per-user state.
+        :param data_dir: raw data directory with merchants / users / geo_df files.
+        :param transformer: the fitted transformer of the model (``prepare_model_data(...,
+            return_transformer=True)`` or ``FeatureTransformer.load``). Without it one is
+            fitted on *raw_df* from *to_categorize* / *categories*, keeping the model's columns.
+            A ``bad_rate="asof"`` transformer gets its rate store seeded with *raw_df*'s labels.
+        """
+        processed, state = data_transform_incremental(raw_df)
+        merchants, users, geo_df = load_dimensions(data_dir)
+        if transformer is None:
+            features = set(model.get_booster().feature_names)
+            history = drop_first_transactions(processed)
+            keep = features | set(to_categorize) | {"merchant_id", "timestamp", target}
+            transformer = FeatureTransformer(
+                to_drop=[col for col in history.columns if col not in keep],
+                to_categorize=to_categorize,
+                target=target,
+                encoding="native" if features & set(to_categorize) else "onehot",
+                categories=categories,
+            ).fit(history)
+        return cls(
+            model,
+            transformer=transformer,
+            merchants=merchants,
+            users=users,
+            geo_df=geo_df,
+            state=state,
+            rates=transformer.rate_store(processed) if transformer.bad_rate == "asof" else None,
+        )
+
+    # ------------------------------------------------------------------
+    def features(self, tx: dict, *, update_state: bool = False) -> np.ndarray:
+        """Feature vector of one raw transaction (``transactions.json`` record)."""
+        row = dict(self._geo.get(tx.get("transaction_id"), {}))
+        row.update(tx)
+        row.update(self._merchants.get(tx.get("merchant_id"), {}))
+        row.update(self._users.get(tx.get("user_id"), {}))
+
+        ts = pd.Timestamp(tx["timestamp"])
+        if "location" in tx:
+            lat, lon = tx["location"].get("lat"), tx["location"].get("long")
+        else:
+            lat, lon = tx.get("location_lat"), tx.get("location_long")
+        lat, lon, amount = to_float(lat), to_float(lon), to_float(tx.get("amount"))
+
+        with self._lock:
+            prev = self._state.get(tx.get("user_id"))
+            if update_state:
+                self._state[tx.get("user_id")] = (ts.value, lat, lon, amount)
+            if self._rates is not None:
+                row["bad_rate"] = self._rates.rate(tx.get("merchant_id"), ts)
+        prev_ns, prev_lat, prev_lon, prev_amount = prev or (None, np.nan, np.nan, np.nan)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            row["hour"] = ts.hour
+            row["part_of_day"] = PART_OF_DAY[ts.hour]
+            # 1-element arrays run the same ufunc loops as the batch columns (bit-identical)
+            seconds = np.nan if prev_ns is None else (ts.value - prev_ns) / 1e9
+            hours = hours_from_seconds(np.array([seconds]))
+            coords = round_coordinate(np.array([[prev_lat], [prev_lon], [lat], [lon]]))
+            distance = haversine(*coords)
+            row["time_diff_hours"] = hours[0]
+            row["distance_km"] = distance[0]
+            row["speed_kmph"] = speed_kmph(distance, hours)[0]
+            for col, denominator in AMOUNT_RATIOS.items():
+                row[col] = amount / to_float(row.get(denominator))
+            for col, (left, right, kind) in COUNTRY_FLAGS.items():
+                row[col] = kind(same_value(row.get(left), row.get(right)))
+            for tolerance_pct in WITHIN_TOLERANCES:
+                flag = within_percent(amount, prev_amount, tolerance_pct) if prev is not None else np.nan
+                row[f"within_{tolerance_pct}pct"] = flag
+
+        vec = self.transformer.transform_row(row)
+        return vec if self._take is None else vec[self._take]
+
+    def score(self, tx: dict, *, update_state: bool = True) -> float:
+        """Fraud probability of one raw transaction; advances the user's state by default."""
+        vec = self.features(tx, update_state=update_state)
+        return float(self.booster.inplace_predict(vec.reshape(1, -1), iteration_range=self._iteration_range)[0])
+
+    def record_label(self, tx: dict, label: float):
+        """Feed a transaction's confirmed label to the ``"asof"`` merchant rate (no-op otherwise)."""
+        if self._rates is not None:
+            with self._lock:
+                self._rates.update(tx.get("merchant_id"), tx["timestamp"], label)
+
@@ -0,0 +1,50 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .scorer import OnlineScorer
+
+__all__ = [
+    "make_server",
+    "serve",
+]
+
+
+def make_server(scorer: OnlineScorer, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    """Local HTTP front end: ``POST /score`` with one raw transaction JSON.
+
+    Responds with ``{"transaction_id": ..., "fraud_probability": ...}``.
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/score":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                tx = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                proba = scorer.score(tx)
+            except (ValueError, KeyError, TypeError) as exc:
+                self._reply(400, {"error": str(exc)})
+                return
+            self._reply(200, {"transaction_id": tx.get("transaction_id"), "fraud_probability": proba})
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # keep the hot path free of stderr writes
+            pass
+
+    return ThreadingHTTPServer((host, port), _Handler)
+
+
+def serve(scorer: OnlineScorer, host: str = "127.0.0.1", port: int = 8080):
+    """Run the scoring server until interrupted."""
+    server = make_server(scorer, host, port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,75 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+PREPARE_KWARGS = dict(
+    to_drop=['transaction_id', 'user_id', 'currency', 'location'],
+    to_think_but_drop=['signup_date', 'Month_Year_EOM', 'Date', 'Year', 'time_diff', 'time_prev',
+                       'latitude', 'longitude', 'lat_prev', 'lon_prev'],
+    to_categorize=['channel', 'device', 'payment_method', 'category', 'country_merchant', 'sex',
+                   'education', 'primary_source_of_income', 'country_users', 'part_of_day', 'transaction_country'],
+    cutoff='2023-07-01',
+    target='is_fraud',
+)
+
+
+@pytest.fixture
+def raw_data_dir(tmp_path):
+    """Small raw data set with the competition schema (transactions.json + 3 CSV files)."""
+    rng = np.random.default_rng(7)
+    n_users, n_merchants, n = 12, 6, 600
+    countries = ['Poland', 'Germany', 'France']
+
+    pd.DataFrame({
+        'user_id': [f'U{i:03d}' for i in range(n_users)],
+        'age': rng.integers(18, 80, n_users),
+        'sex': rng.choice(['Male', 'Female'], n_users),
+        'education': rng.choice(['High School', 'Bachelor', 'Master'], n_users),
+        'primary_source_of_income': rng.choice(['Employment', 'Business'], n_users),
+        'sum_of_monthly_installments': rng.uniform(0, 1000, n_users).round(2),
+        'sum_of_monthly_expenses': rng.uniform(100, 3000, n_users).round(2),
+        'country': rng.choice(countries, n_users),
+        'signup_date': '2021-01-01',
+        'risk_score': rng.uniform(0, 1, n_users).round(3),
+    }).to_csv(tmp_path / 'users.csv', index=False)
+    pd.DataFrame({
+        'merchant_id': [f'M{i:03d}' for i in range(n_merchants)],
+        'category': rng.choice(['grocery', 'travel', 'electronics'], n_merchants),
+        'country': rng.choice(countries, n_merchants),
+        'trust_score': rng.uniform(0, 1, n_merchants).round(3),
+        'number_of_alerts_last_6_months': rng.integers(0, 5, n_merchants),
+        'avg_transaction_amount': rng.uniform(10, 200, n_merchants).round(2),
+        'account_age_months': rng.integers(1, 100, n_merchants),
+        'has_fraud_history': rng.integers(0, 2, n_merchants),
+    }).to_csv(tmp_path / 'merchants.csv', index=False)
+
+    timestamps = pd.Timestamp('2023-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 24 * 60, n)), unit='min')
+    amounts = np.where(rng.random(n) < 0.3, 20.0, rng.exponential(50, n).round(2))
+    with open(tmp_path / 'transactions.json', 'w') as fh:
+        for i in range(n):
+            fh.write(json.dumps({
+                'transaction_id': f'TX{i:05d}',
+                'timestamp': timestamps[i].strftime('%Y-%m-%d %H:%M:%S'),
+                'user_id': f'U{rng.integers(0, n_users):03d}',
+                'merchant_id': f'M{rng.integers(0, n_merchants):03d}',
+                'amount': float(amounts[i]),
+                'channel': ['online', 'in-store', 'mobile'][i % 3],
+                'currency': 'EUR',
+                'device': ['Android', 'iOS', 'Web'][(i // 3) % 3],
+                'location': {'lat': float(rng.uniform(35, 60)), 'long': float(rng.uniform(-5, 30))},
+                'payment_method': ['credit_card', 'debit_card'][(i // 7) % 2],
+                'is_international': int(rng.integers(0, 2)),
+                'session_length_seconds': int(rng.integers(10, 600)),
+                'is_first_time_merchant': int(rng.integers(0, 2)),
+                'is_fraud': int(rng.random() < 0.2),
+            }) + '\n')
+
+    pd.DataFrame({
+        'transaction_id': [f'TX{i:05d}' for i in range(n)],
+        'transaction_country': rng.choice(countries + [None], n),
+        'is_country_nan': rng.integers(0, 2, n),
+        'country_merchant_distance_centroid': rng.uniform(0, 2000, n),
+        'country_user_distance_centroid': rng.uniform(0, 2000, n),
+    }).to_csv(tmp_path / 'geo_df.csv', index=False)
+    return str(tmp_path)
@@ -0,0 +1,32 @@
+import pandas as pd
+from src.benchmarks import BENCHMARKS, generate_raw_data, run_benchmarks, load_results, compare_results
+from src.ingestion.loader import load_data
+
+
+def test_synthetic_data_has_the_raw_schema(raw_data_dir, tmp_path):
+    n = generate_raw_data(tmp_path, n_users=40, tx_per_user=25, fraud_rate=0.2, seed=1)
+    synthetic, reference = load_data(str(tmp_path)), load_data(raw_data_dir)
+
+    assert len(synthetic) == n == 1000
+    assert set(reference.columns) <= set(synthetic.columns)
+    for column in reference.columns:
+        assert synthetic[column].dtype == reference[column].dtype, column
+    assert synthetic.groupby('user_id', observed=True).size().eq(25).all()
+    assert 0.1 < synthetic['is_fraud'].mean() < 0.3
+
+
+def test_benchmarks_are_recorded_and_compared(tmp_path):
+    results_path = tmp_path / 'results.jsonl'
+    run = run_benchmarks(['3000'], data_root=tmp_path / 'data', results_path=results_path,
+                         tx_per_user=30, isolate=False, xgb_params={'n_estimators': 5})
+    assert run['benchmark'].tolist() == list(BENCHMARKS)
+    assert (run['wall_seconds'] > 0).all() and run['peak_rss_delta_mb'].notna().all()
+    assert run.loc[0, 'rows'] == 3000
+
+    # a second commit's run: compare defaults to the latest commit against the previous one
+    history = load_results(results_path)
+    later = history.assign(commit='f' * 40, run_id='99999999T000000', wall_seconds=history['wall_seconds'] * 2)
+    table = compare_results(pd.concat([history, later]))
+    assert table.attrs['head'] == 'f' * 40
+    assert list(table.index.get_level_values('benchmark')) == list(BENCHMARKS)
+    assert (table['ratio'] == 2).all()
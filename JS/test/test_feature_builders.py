@@ -56,3 +56,46 @@ def test_merchant_bad_rate_and_user_good_rate(simple_df):
     assert res.at[1, 'user_good_rate'] == pytest.approx(1)
     # For third row: expanding mean on [0,1] -> 0.5, so good_rate = 0.5
     assert res.at[2, 'user_good_rate'] == pytest.approx(0.5)
+
+
+def _brute_force_windows(df, window):
+    """count / sum / mean of each row's previous amounts by looping over the rows."""
+    times = df['timestamp'].to_numpy()
+    out = np.full((len(df), 3), np.nan)
+    for i in range(len(df)):
+        user = df['user_id'].iat[i]
+        if pd.isna(user):
+            continue
+        earlier = [j for j in range(len(df)) if df['user_id'].iat[j] == user
+                   and (times[j] < times[i] or (times[j] == times[i] and j < i))]
+        earlier.sort(key=lambda j: (times[j], j))
+        if isinstance(window, int):
+            earlier = earlier[-window:] if window else []
+        else:
+            earlier = [j for j in earlier if times[j] >= times[i] - pd.Timedelta(window)]
+        amounts = df['amount'].iloc[earlier].dropna()
+        if len(amounts):
+            out[i] = len(amounts), amounts.sum(), amounts.mean()
+    return out
+
+
+def test_time_windows_match_brute_force():
+    rng = np.random.default_rng(3)
+    n = 240
+    df = pd.DataFrame({
+        'user_id': rng.choice(np.array(['u1', 'u2', 'u3', 'u4', None], dtype=object), n),
+        'merchant_id': rng.choice(['a', 'b', 'c'], n),
+        'amount': np.where(rng.random(n) < 0.15, np.nan, rng.exponential(30, n).round(2)),
+        'is_fraud': rng.integers(0, 2, n),
+        # hour granularity over ten days: many tied timestamps, some exactly one window apart
+        'timestamp': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 240, n), unit='h'),
+    })
+    windows = [3, '1h', '24h', '7d']
+    result = FeatureBuilder(windows=windows).fit_transform(df)
+
+    assert result.index.equals(df.index)
+    for window in windows:
+        got = result[[f'count_last_{window}', f'sum_last_{window}', f'mean_last_{window}']].to_numpy()
+        np.testing.assert_allclose(got, _brute_force_windows(df, window), rtol=1e-9, err_msg=str(window))
+    # rows without a user key have no window
+    assert result.loc[df['user_id'].isna(), 'count_last_7d'].isna().all()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from src.ingestion.loader import load_data
+from src.preprocessing.transform import data_transform
+from src.features.prepare import prepare_model_data, drop_first_transactions
+from src.features.transformer import FeatureTransformer, merchant_bad_rate
+from conftest import PREPARE_KWARGS
+
+
+def test_transformer_learns_from_training_window_only(raw_data_dir, tmp_path):
+    processed = data_transform(load_data(raw_data_dir))
+    X_train, y_train, X_test, y_test, transformer = prepare_model_data(
+        processed, **PREPARE_KWARGS, return_transformer=True
+    )
+
+    history = drop_first_transactions(processed)
+    train = history[history['timestamp'] < pd.Timestamp(PREPARE_KWARGS['cutoff'])]
+    pd.testing.assert_series_equal(
+        transformer.bad_rate_, merchant_bad_rate(train)['bad_rate'].set_axis(transformer.bad_rate_.index),
+    )
+    assert list(X_test.columns) == list(X_train.columns) == transformer.columns_
+
+    # persisted next to the model; single rows match the batch matrix
+    transformer.save(tmp_path / 'transformer.joblib')
+    loaded = FeatureTransformer.load(tmp_path / 'transformer.joblib')
+    rows = history.loc[X_test.index[:25]]
+    expected = X_test.loc[rows.index, loaded.feature_names_].to_numpy(dtype=np.float32, na_value=np.nan)
+    vectors = np.stack([loaded.transform_row(row) for row in rows.to_dict('records')])
+    np.testing.assert_array_equal(vectors, expected)
+
+
+def test_asof_bad_rate_is_leakage_free_and_incremental(raw_data_dir):
+    processed = data_transform(load_data(raw_data_dir))
+    kwargs = dict(PREPARE_KWARGS, bad_rate='asof', smoothing=5.0, half_life='30D')
+    X_train, _, X_test, _, transformer = prepare_model_data(processed, **kwargs, return_transformer=True)
+
+    # one computation serves every cutoff: the same rows get the same rate
+    history = transformer.add_bad_rate(processed)
+    X_early = prepare_model_data(history, **dict(kwargs, cutoff='2023-04-01'))[0]
+    common = X_early.index.intersection(X_train.index)
+    np.testing.assert_array_equal(X_early.loc[common, 'bad_rate'], X_train.loc[common, 'bad_rate'])
+
+    # replaying the events one at a time gives the batch values
+    store = transformer.rate_store(processed.iloc[:0])
+    ordered = processed.sort_values('timestamp', kind='stable')
+    replay = {}
+    for idx, merchant, ts, label in ordered[['merchant_id', 'timestamp', 'is_fraud']].itertuples():
+        replay[idx] = store.rate(merchant, ts)
+        store.update(merchant, ts, label)
+    expected = pd.concat([X_train, X_test])['bad_rate']
+    np.testing.assert_allclose(expected, pd.Series(replay)[expected.index].astype(np.float32), rtol=1e-6, atol=1e-12)
+
+    # a key whose earlier rows are all unlabelled has no rate, with or without decay
+    from src.features.feature_builders import expanding_rate, RateStore
+    toy = pd.DataFrame({'m': ['a', 'a', 'b', 'b'], 'is_fraud': [1, 1, np.nan, 0],
+                        'timestamp': pd.date_range('2023-01-01', periods=4, freq='h')})
+    for half_life in (None, '1D'):
+        np.testing.assert_array_equal(expanding_rate(toy, 'm', half_life=half_life), [np.nan, 1.0, np.nan, np.nan])
+        store = RateStore.from_history(toy.iloc[:3], 'm', half_life=half_life)
+        assert np.isnan(store.rate('b', toy['timestamp'].iloc[3]))
+
+
+def test_matrix_dtypes_are_fixed_at_fit(raw_data_dir):
+    processed = data_transform(load_data(raw_data_dir))
+    # an integer count that happens to be 0/1 in the training window only
+    after = processed['timestamp'] >= PREPARE_KWARGS['cutoff']
+    processed['n_alerts'] = np.where(after, 2, processed['is_international']).astype(np.int64)
+    X_train, _, X_test, _, transformer = prepare_model_data(processed, **PREPARE_KWARGS, return_transformer=True)
+
+    pd.testing.assert_series_equal(X_train.dtypes, X_test.dtypes)
+    assert X_train['n_alerts'].dtype == np.float32
+    assert X_train['is_international'].dtype == X_train['channel_online'].dtype == np.uint8
+    assert transformer.dtypes_['n_alerts'] == np.float32
@@ -0,0 +1,115 @@
+import json
+import pandas as pd
+import numpy as np
+import pytest
+from src.ingestion.loader import load_data, load_data_chunks
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    rows = [
+        {
+            'transaction_id': f'TX{i:03d}',
+            'timestamp': f'2023-01-{i % 28 + 1:02d} 10:{i % 60:02d}:00',
+            'user_id': f'U{i % 3}',
+            'merchant_id': f'M{i % 2}',
+            'amount': 10.5 + i,
+            'channel': 'online',
+            'location': {'lat': 50.0 + i / 10, 'long': 20.0 - i / 10},
+            'is_fraud': i % 5 == 0,
+        }
+        for i in range(40)
+    ]
+    with open(tmp_path / 'transactions.json', 'w') as fh:
+        fh.writelines(json.dumps(row) + '\n' for row in rows)
+    pd.DataFrame({'merchant_id': ['M0', 'M1'], 'category': ['travel', 'grocery'], 'country': ['Poland', 'Spain']}) \
+        .to_csv(tmp_path / 'merchants.csv', index=False)
+    pd.DataFrame({'user_id': ['U0', 'U1', 'U2'], 'age': [30, 40, 50], 'country': ['Poland', 'Poland', 'France']}) \
+        .to_csv(tmp_path / 'users.csv', index=False)
+    pd.DataFrame({'transaction_id': [r['transaction_id'] for r in rows], 'transaction_country': 'Poland'}) \
+        .to_csv(tmp_path / 'geo_df.csv', index=False)
+    return str(tmp_path)
+
+
+def test_load_data_flattens_location(data_dir):
+    df = load_data(data_dir)
+
+    assert 'location' not in df.columns
+    assert df['location_lat'].dtype == np.float64
+    assert df.at[3, 'location_lat'] == pytest.approx(50.3)
+    assert df.at[3, 'location_long'] == pytest.approx(19.7)
+    assert list(df.columns[:7]) == ['transaction_id', 'timestamp', 'user_id', 'merchant_id', 'amount',
+                                    'channel', 'location_lat']
+    assert df.at[0, 'country_merchant'] == 'Poland'
+    assert df.at[2, 'country_users'] == 'France'
+
+
+def test_load_data_keeps_keys_missing_from_the_first_record(data_dir, tmp_path):
+    path = tmp_path / 'transactions.json'
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    for i, row in enumerate(rows):
+        if i % 3 == 0:
+            del row['channel']  # optional key, absent from the first record
+        else:
+            row['device'] = 'iOS'  # key no record before the second has
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+
+    df = load_data(data_dir)
+    assert list(df.columns[:6]) == ['transaction_id', 'timestamp', 'user_id', 'merchant_id', 'amount', 'location_lat']
+    assert {'channel', 'device'} <= set(df.columns)
+    assert df['channel'].isna().tolist() == [i % 3 == 0 for i in range(len(rows))]
+    assert df.at[1, 'device'] == 'iOS' and pd.isna(df.at[0, 'device'])
+    pd.testing.assert_frame_equal(pd.concat(load_data_chunks(data_dir)), load_data(data_dir, compact=False))
+
+
+@pytest.mark.parametrize('open_json', [True, False])
+def test_load_data_chunks_matches_load_data(data_dir, monkeypatch, open_json):
+    if not open_json:
+        # pyarrow < 20: newline-aligned blocks through read_json
+        monkeypatch.delattr('pyarrow.json.open_json', raising=False)
+    chunks = list(load_data_chunks(data_dir, block_size=1024))
+
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks), load_data(data_dir, compact=False))
+
+
+def test_load_data_join_stats(data_dir, tmp_path):
+    pd.read_csv(tmp_path / 'users.csv').iloc[1:].to_csv(tmp_path / 'users.csv', index=False)
+    df, stats = load_data(data_dir, return_stats=True)
+
+    # U0 dropped from users: its transactions keep NaN user attributes
+    assert stats.at['users', 'unmatched_keys'] == 1
+    assert stats.at['users', 'unmatched_rows'] == 14
+    assert stats.at['merchants', 'unmatched_rows'] == 0
+    assert df.loc[df['user_id'] == 'U0', 'age'].isna().all()
+
+
+def test_load_data_compact_dtypes(data_dir):
+    df = load_data(data_dir)
+    wide = load_data(data_dir, compact=False)
+
+    assert isinstance(df['channel'].dtype, pd.CategoricalDtype)
+    # countries share one vocabulary, so they compare against each other
+    assert df['country_merchant'].dtype == df['country_users'].dtype == df['transaction_country'].dtype
+    assert df['is_fraud'].dtype == np.int8
+    assert df.memory_usage(deep=True).sum() < wide.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(df.astype(object), wide.astype(object), check_dtype=False)
+
+
+def test_streaming_ingestion_matches_load_data(data_dir, tmp_path):
+    import pyarrow.parquet as pq
+    from src.ingestion.schema import compact_frame
+    from src.pipelines.ingestion_pipeline import run_streaming_ingestion
+
+    # no geo rows for the first transactions: the first chunk's transaction_country is all missing
+    geo = pd.read_csv(tmp_path / 'geo_df.csv')
+    geo.iloc[20:].to_csv(tmp_path / 'geo_df.csv', index=False)
+    out = tmp_path / 'raw.parquet'
+    rows = run_streaming_ingestion(data_dir, out, block_size=1024)
+
+    assert rows == 40 and pq.ParquetFile(out).metadata.num_row_groups > 1
+    assert pq.read_schema(out).field('transaction_country').type == 'string'
+    streamed = compact_frame(pd.read_parquet(out))
+    expected = load_data(data_dir)
+    assert list(streamed.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(streamed.astype(object), expected.astype(object), check_dtype=False)
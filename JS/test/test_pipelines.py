@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+import pytest
+from src.pipelines.cache import run_cached_pipeline
+from conftest import PREPARE_KWARGS
+
+
+def test_cached_pipeline_reruns_only_changed_stages(raw_data_dir, tmp_path_factory):
+    work = tmp_path_factory.mktemp('work')
+    model_kwargs = {'xgb_params': {'n_estimators': 10}}
+    first, cache = run_cached_pipeline(raw_data_dir, work, prepare_kwargs=PREPARE_KWARGS, model_kwargs=model_kwargs)
+    assert [status for *_, status in cache.history] == ['run'] * 4
+
+    # new model parameters: nothing upstream is re-ingested or re-preprocessed
+    _, cache = run_cached_pipeline(raw_data_dir, work, prepare_kwargs=PREPARE_KWARGS,
+                                   model_kwargs={'xgb_params': {'n_estimators': 5}})
+    assert [status for *_, status in cache.history] == ['hit', 'hit', 'hit', 'run']
+
+    # unchanged: every stage is a hit, deleted outputs come back from the object store
+    os.remove(work / 'X_train.parquet')
+    again, cache = run_cached_pipeline(raw_data_dir, work, prepare_kwargs=PREPARE_KWARGS, model_kwargs=model_kwargs)
+    assert [status for *_, status in cache.history] == ['hit'] * 4
+    assert (work / 'X_train.parquet').exists()
+    assert again['auc_test'] == first['auc_test'] and again.keys() == first.keys()
+    # the model stage keeps its files only: no pickled copy of the frames
+    manifests = [json.loads(p.read_text()) for p in (work / '.cache' / 'stages').glob('run_model_pipeline-*.json')]
+    assert len(manifests) == 2 and all(m['result'] is None for m in manifests)
+    X_test = again['X_test']
+    np.testing.assert_array_equal(again['model'].predict_proba(X_test), first['model'].predict_proba(X_test))
+
+
+def test_end_to_end_matches_chained_pipelines(raw_data_dir, tmp_path_factory):
+    from src.pipelines.end_to_end import run_end_to_end
+    from src.pipelines.model_pipeline import run_model_pipeline
+    from src.features.transformer import FeatureTransformer
+
+    model_kwargs = {'xgb_params': {'n_estimators': 10}}
+    chained, _ = run_cached_pipeline(raw_data_dir, tmp_path_factory.mktemp('chained'),
+                                     prepare_kwargs=PREPARE_KWARGS, model_kwargs=model_kwargs)
+    checkpoints = tmp_path_factory.mktemp('checkpoints')
+    results = run_end_to_end(raw_data_dir, prepare_kwargs=PREPARE_KWARGS, model_kwargs=model_kwargs,
+                             checkpoint_dir=checkpoints, checkpoint_stages=('features',))
+
+    assert results['auc_test'] == chained['auc_test']
+    X_test = chained['X_test']
+    np.testing.assert_array_equal(results['model'].predict_proba(X_test), chained['model'].predict_proba(X_test))
+    # the checkpoint feeds the disk pipeline
+    assert sorted(p.name for p in checkpoints.iterdir()) == sorted(
+        ['X_train.parquet', 'y_train.parquet', 'X_test.parquet', 'y_test.parquet', 'transformer.joblib'])
+    resumed = run_model_pipeline(*(str(checkpoints / f'{name}.parquet') for name in ('X_train', 'y_train', 'X_test', 'y_test')),
+                                 str(checkpoints / 'model.joblib'), **model_kwargs)
+    assert resumed['auc_test'] == results['auc_test']
+    assert FeatureTransformer.load(checkpoints / 'transformer.joblib').columns_ == results['transformer'].columns_
+
+
+def test_profiler_reports_nested_steps(raw_data_dir, tmp_path):
+    import json
+    import pandas as pd
+    from src.profiling import Profiler
+    from src.pipelines.ingestion_pipeline import run_ingestion
+    from src.pipelines.preprocessing_pipeline import run_preprocessing
+
+    run_ingestion(raw_data_dir, tmp_path / 'raw.parquet')  # not profiled: no active profiler
+    with Profiler(cprofile_dir=tmp_path / 'prof') as prof:
+        processed = run_preprocessing(tmp_path / 'raw.parquet', tmp_path / 'processed.parquet')
+
+    report = prof.report()
+    assert report['name'].iloc[0] == 'run_preprocessing'
+    step = report.set_index('name').loc['run_preprocessing/data_transform_incremental']
+    assert step['rows_in'] > step['rows_out'] == len(processed)
+    assert {'sort', 'lags', 'within_pct_flags', 'columns', 'compact', 'state'} <= set(report['step'])
+    assert (report['wall_seconds'] >= 0).all() and report['peak_rss_delta_mb'].notna().all()
+
+    prof.save(tmp_path / 'report.json')
+    prof.save(tmp_path / 'report.csv')
+    assert len(json.loads((tmp_path / 'report.json').read_text())['steps']) == len(report)
+    assert list(pd.read_csv(tmp_path / 'report.csv')['name']) == list(report['name'])
+    assert [p.suffix for p in (tmp_path / 'prof').iterdir()] == ['.prof']
+
+
+def test_incremental_preprocessing_commits_through_the_state(raw_data_dir, tmp_path, monkeypatch):
+    import pandas as pd
+    from src.ingestion.loader import load_data
+    from src.preprocessing.transform import data_transform
+    from src.pipelines import preprocessing_pipeline as pp
+
+    raw = load_data(raw_data_dir).sort_values('timestamp', kind='stable')
+    for name, rows in {'history': raw.iloc[:300], 'day1': raw.iloc[300:400],
+                       'day2': raw.iloc[400:500], 'day3': raw.iloc[500:]}.items():
+        rows.to_parquet(tmp_path / f'{name}.parquet')
+    out, state = tmp_path / 'processed', str(tmp_path / 'state.parquet')
+    out.mkdir()
+    pp.run_preprocessing(tmp_path / 'history.parquet', out / 'part-00000.parquet', state_path=state)
+
+    # dies before the state is saved: nothing is committed, the rerun appends day1 once
+    def crash(*args, **kwargs):
+        raise OSError('disk full')
+    with monkeypatch.context() as patch:
+        patch.setattr(pp, '_save_state', crash)
+        with pytest.raises(OSError):
+            pp.run_incremental_preprocessing(tmp_path / 'day1.parquet', out, state)
+    pp.run_incremental_preprocessing(tmp_path / 'day1.parquet', out, state)
+
+    # dies after the state is saved: day2 is committed, the next run renames its part
+    replace = os.replace
+    def crash_on_part(src, dst):
+        if str(dst).endswith('part-00002.parquet'):
+            raise OSError('killed')
+        replace(src, dst)
+    with monkeypatch.context() as patch:
+        patch.setattr(pp.os, 'replace', crash_on_part)
+        with pytest.raises(OSError):
+            pp.run_incremental_preprocessing(tmp_path / 'day2.parquet', out, state)
+    os.remove(out / 'part-00001.parquet')  # a deleted part does not cause a name collision
+    pp.run_incremental_preprocessing(tmp_path / 'day3.parquet', out, state)
+
+    assert sorted(p.name for p in out.iterdir()) == ['part-00000.parquet', 'part-00002.parquet', 'part-00003.parquet']
+    assert pp._committed_part(state) == 3
+    full = data_transform(raw)
+    kept = pd.concat(pd.read_parquet(p) for p in sorted(out.glob('part-*')))
+    expected = full[~full['transaction_id'].isin(raw['transaction_id'].iloc[300:400])]
+    assert sorted(kept['transaction_id']) == sorted(expected['transaction_id'])
+    pd.testing.assert_series_equal(kept.set_index('transaction_id')['time_diff'].sort_index(),
+                                   expected.set_index('transaction_id')['time_diff'].sort_index(),
+                                   check_dtype=False, check_index_type=False)
@@ -0,0 +1,129 @@
+import pandas as pd
+import numpy as np
+import pytest
+from src.preprocessing.helpers import flag_within_percent, flag_within_percents
+from src.preprocessing.transform import data_transform, data_transform_incremental
+
+
+@pytest.fixture
+def amounts_df():
+    data = {
+        'user_id': [1, 1, 1, 2, 2, 2],
+        'amount': [100.0, 104.0, 112.0, 50.0, 50.0, 53.0],
+        'timestamp': [
+            '2025-01-03 10:00',
+            '2025-01-01 10:00',
+            '2025-01-02 10:00',
+            '2025-01-01 09:00',
+            '2025-01-02 09:00',
+            '2025-01-03 09:00'
+        ]
+    }
+    df = pd.DataFrame(data)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+
+def test_flag_within_percents_bands(amounts_df):
+    flags = flag_within_percents(amounts_df, tolerances=(10, 5))
+
+    # user 1 chronological amounts: 104 -> 112 -> 100 ; user 2: 50 -> 50 -> 53
+    assert list(flags.columns) == ['within_10pct', 'within_5pct']
+    assert np.isnan(flags.at[1, 'within_10pct'])
+    assert np.isnan(flags.at[3, 'within_5pct'])
+    assert flags.at[2, 'within_10pct'] == 1.0
+    assert flags.at[2, 'within_5pct'] == 0.0
+    assert flags.at[0, 'within_10pct'] == 0.0
+    assert flags.at[5, 'within_10pct'] == 1.0
+    assert flags.at[5, 'within_5pct'] == 0.0
+
+
+def _notebook_flag_within_percent(df, tolerance_pct):
+    """The notebook's original groupby().apply implementation, kept as the reference."""
+    df = df.copy()
+    flag_col = f"within_{tolerance_pct}pct"
+
+    def _per_user(group):
+        previous = group['amount'].shift(1)
+        lower = previous * (1 - tolerance_pct / 100)
+        upper = previous * (1 + tolerance_pct / 100)
+        flag = ((group['amount'] >= lower) & (group['amount'] <= upper)).astype(float)
+        flag.iloc[0] = np.nan
+        return flag
+
+    df = df.sort_values(['user_id', 'timestamp'])
+    df[flag_col] = df.groupby('user_id', group_keys=False)[['amount']].apply(_per_user)
+    return df
+
+
+@pytest.mark.parametrize('tolerance_pct', [5, 10])
+def test_flag_within_percent_matches_notebook(amounts_df, tolerance_pct):
+    rng = np.random.default_rng(0)
+    n = 300
+    random_df = pd.DataFrame({
+        'user_id': rng.integers(0, 12, n),
+        # a coarse grid of amounts: many exactly on a band edge or repeated
+        'amount': rng.integers(18, 24, n) * 5.0,
+        'timestamp': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.permutation(n), unit='min'),
+    })
+    for df in (amounts_df, random_df):
+        expected = _notebook_flag_within_percent(df, tolerance_pct)
+        result = flag_within_percent(df, tolerance_pct=tolerance_pct)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.fixture
+def raw_df():
+    n = 30
+    df = pd.DataFrame({
+        'transaction_id': [f'TX{i:03d}' for i in range(n)],
+        'timestamp': pd.Timestamp('2023-01-01') + pd.to_timedelta(np.arange(n) * 7, unit='h'),
+        'user_id': [f'U{i % 4}' for i in range(n)],
+        'amount': [10.0 + (i % 5) for i in range(n)],
+        'location_lat': np.linspace(40, 55, n),
+        'location_long': np.linspace(-3, 25, n),
+        'avg_transaction_amount': 12.0,
+        'sum_of_monthly_installments': 100.0,
+        'sum_of_monthly_expenses': 900.0,
+        'country_users': 'Poland',
+        'country_merchant': ['Poland', 'Spain'] * (n // 2),
+        'transaction_country': 'Poland',
+    })
+    return df
+
+
+def test_incremental_matches_full_transform(raw_df):
+    full = data_transform(raw_df)
+
+    history, delta = raw_df.iloc[:17], raw_df.iloc[17:]
+    processed_history, state = data_transform_incremental(history)
+    processed_delta, state = data_transform_incremental(delta, state)
+
+    incremental = pd.concat([processed_history, processed_delta]).loc[full.index]
+    pd.testing.assert_frame_equal(incremental, full)
+    assert list(state.index) == ['U0', 'U1', 'U2', 'U3']
+    assert state.at['U1', 'last_timestamp'] == raw_df['timestamp'].iloc[29]
+
+
+def test_incremental_rejects_late_transactions(raw_df):
+    _, state = data_transform_incremental(raw_df.iloc[10:])
+
+    with pytest.raises(ValueError):
+        data_transform_incremental(raw_df.iloc[:10], state)
+
+
+def test_transform_keeps_rows_without_timestamp(raw_df):
+    raw_df['timestamp'] = raw_df['timestamp'].astype(object)
+    raw_df.loc[21, 'timestamp'] = None
+    full = data_transform(raw_df)
+
+    missing = full.loc[21]
+    assert pd.isna(missing['Year']) and pd.isna(missing['Date']) and pd.isna(missing['part_of_day'])
+    assert full['Year'].dtype == 'Int16'
+    others = full.drop(index=21)
+    assert (others['Year'] == others['timestamp'].dt.year).all()
+    assert others['part_of_day'].notna().all()
+    # the other users' rows are untouched
+    expected = data_transform(raw_df[raw_df['user_id'] != raw_df.at[21, 'user_id']])
+    pd.testing.assert_frame_equal(full.loc[expected.index, ['hour', 'part_of_day', 'time_diff_hours']],
+                                  expected[['hour', 'part_of_day', 'time_diff_hours']], check_dtype=False)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.ingestion.loader import load_data
+from src.preprocessing.transform import data_transform
+from src.features.prepare import prepare_model_data
+from src.features.categories import categories_of
+from src.modeling import train_model
+from src.serving import OnlineScorer, MicroBatcher
+from conftest import PREPARE_KWARGS
+
+
+@pytest.fixture
+def trained(raw_data_dir):
+    raw = load_data(raw_data_dir)
+    kwargs = dict(PREPARE_KWARGS, to_drop=['user_id', 'currency', 'location'])
+    X_train, y_train, X_test, y_test, transformer = prepare_model_data(
+        data_transform(raw), **kwargs, return_transformer=True
+    )
+    X_train = X_train.drop(columns='transaction_id')
+    X_test = X_test.set_index('transaction_id')
+    model, _, _ = train_model(X_train, y_train, xgb_params={'n_estimators': 20})
+    return raw, model, X_test, transformer
+
+
+def test_online_features_match_batch_matrix(raw_data_dir, trained):
+    raw, model, X_test, transformer = trained
+    cutoff = pd.Timestamp(PREPARE_KWARGS['cutoff'])
+    history = raw[pd.to_datetime(raw['timestamp']) < cutoff]
+
+    scorer = OnlineScorer.from_training(model, history, raw_data_dir, transformer=transformer)
+
+    with open(f'{raw_data_dir}/transactions.json') as fh:
+        txs = [json.loads(line) for line in fh]
+    checked = 0
+    for tx in txs:
+        if pd.Timestamp(tx['timestamp']) < cutoff:
+            continue
+        vec = scorer.features(tx, update_state=True)
+        if tx['transaction_id'] in X_test.index:
+            expected = X_test.loc[tx['transaction_id']].to_numpy(dtype=float, na_value=np.nan)
+            np.testing.assert_array_equal(vec, expected)
+            checked += 1
+    assert checked == len(X_test)
+
+
+def test_native_categorical_scores_match_batch(raw_data_dir):
+    raw = load_data(raw_data_dir)
+    kwargs = dict(PREPARE_KWARGS, to_drop=['user_id', 'currency', 'location'], encoding='native')
+    X_train, y_train, X_test, y_test = prepare_model_data(data_transform(raw), **kwargs)
+    X_train = X_train.drop(columns='transaction_id')
+    X_test = X_test.set_index('transaction_id')
+    categories = categories_of(X_train)
+    # one column per categorical, same frozen vocabulary on both splits
+    assert set(categories) == set(PREPARE_KWARGS['to_categorize'])
+    assert all(X_test[col].dtype == X_train[col].dtype for col in categories)
+    model, _, _ = train_model(X_train, y_train, xgb_params={'n_estimators': 20})
+
+    cutoff = pd.Timestamp(PREPARE_KWARGS['cutoff'])
+    scorer = OnlineScorer.from_training(
+        model, raw[pd.to_datetime(raw['timestamp']) < cutoff], raw_data_dir,
+        to_categorize=PREPARE_KWARGS['to_categorize'], categories=categories,
+    )
+    expected = pd.Series(model.predict_proba(X_test)[:, 1], index=X_test.index)
+
+    with open(f'{raw_data_dir}/transactions.json') as fh:
+        txs = [json.loads(line) for line in fh]
+    scores = {
+        tx['transaction_id']: scorer.score(tx)
+        for tx in txs if pd.Timestamp(tx['timestamp']) >= cutoff
+    }
+    np.testing.assert_allclose(pd.Series(scores)[X_test.index], expected, rtol=1e-6)
+
+
+def test_online_score_matches_predict_proba(raw_data_dir, trained):
+    raw, model, X_test, _ = trained
+    scorer = OnlineScorer.from_training(model, raw, raw_data_dir, to_categorize=PREPARE_KWARGS['to_categorize'])
+    tx = {
+        'transaction_id': 'TX99999', 'timestamp': '2024-02-01 10:00:00', 'user_id': 'U001', 'merchant_id': 'M002',
+        'amount': 20.0, 'channel': 'online', 'currency': 'EUR', 'device': 'iOS',
+        'location': {'lat': 52.2, 'long': 21.0}, 'payment_method': 'credit_card', 'is_international': 0,
+        'session_length_seconds': 120, 'is_first_time_merchant': 1,
+    }
+
+    vec = scorer.features(tx)
+    expected = model.predict_proba(pd.DataFrame([vec], columns=scorer.feature_names))[:, 1][0]
+    assert scorer.score(tx) == pytest.approx(expected, rel=1e-6)
+    assert scorer.features(tx)[scorer.feature_names.index('time_diff_hours')] == 0.0
+
+    # an early-stopped model is scored up to its best iteration, as predict_proba does
+    model.get_booster().set_attr(best_iteration='4')
+    scorer = OnlineScorer.from_training(model, raw, raw_data_dir, to_categorize=PREPARE_KWARGS['to_categorize'])
+    expected = model.predict_proba(pd.DataFrame([vec], columns=scorer.feature_names))[:, 1][0]
+    assert expected != pytest.approx(scorer.booster.inplace_predict(vec.reshape(1, -1))[0], rel=1e-6)
+    assert scorer.score(tx, update_state=False) == pytest.approx(expected, rel=1e-6)
+
+
+def test_micro_batcher_matches_direct_predict():
+    X = np.random.default_rng(0).normal(size=(50, 3))
+    calls = []
+
+    def predict(batch):
+        calls.append(len(batch))
+        return batch.sum(axis=1)
+
+    async def run():
+        async with MicroBatcher(predict, max_batch_size=16, max_wait_ms=50) as batcher:
+            results = await asyncio.gather(*(batcher.submit(row) for row in X))
+            return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    np.testing.assert_allclose(results, X.sum(axis=1))
+    assert max(calls) == 16
+    assert sum(calls) == 50
+    assert stats['batch_size']['count'] == len(calls)
+    assert stats['queue_wait_ms']['count'] == 50
+
+
+def test_micro_batcher_scores_early_stopped_model_like_predict_proba():
+    from xgboost import XGBClassifier
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = (X[:, 0] + rng.normal(scale=2.0, size=400) > 0).astype(int)
+    model = XGBClassifier(n_estimators=200, learning_rate=0.5, early_stopping_rounds=3)
+    model.fit(X[:300], y[:300], eval_set=[(X[300:], y[300:])], verbose=False)
+    assert model.best_iteration < 199
+
+    async def run():
+        async with MicroBatcher.from_model(model, max_batch_size=16) as batcher:
+            return await asyncio.gather(*(batcher.submit(row) for row in X[300:]))
+
+    np.testing.assert_allclose(asyncio.run(run()), model.predict_proba(X[300:])[:, 1], rtol=1e-6)
+
+
+def test_micro_batcher_survives_bad_rows_and_restarts():
+    async def run():
+        batcher = MicroBatcher(lambda batch: batch.sum(axis=1), max_batch_size=4, max_wait_ms=1)
+        async with batcher:
+            # a row of the wrong shape fails its own batch, not the worker
+            bad = await asyncio.gather(batcher.submit(np.ones(3)), batcher.submit(np.ones(2)), return_exceptions=True)
+            assert all(isinstance(r, ValueError) for r in bad)
+            assert await batcher.submit(np.ones(3)) == 3.0
+
+        # requests left at stop() are cancelled, and the batcher can be started again
+        def slow_predict(batch):
+            time.sleep(0.05)
+            return batch.sum(axis=1)
+
+        slow = MicroBatcher(slow_predict, max_batch_size=1, max_wait_ms=0)
+        await slow.start()
+        pending = [asyncio.ensure_future(slow.submit(np.ones(2))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await slow.stop()
+        await asyncio.gather(*pending, return_exceptions=True)
+        assert all(p.cancelled() for p in pending)
+        await slow.start()
+        assert await slow.submit(np.ones(2)) == 2.0
+        await slow.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
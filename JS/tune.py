@@ -1,13 +1,29 @@
-# tune.py  ── minimal Optuna study around your run_model_pipeline
+# tune.py  ── minimal Optuna study around a cached TuningData harness
+"""Maximize test AUC over an XGBoost search space.
+
+Trials fit on 80% of the train split: the other VALID_SIZE = 20% (stratified, held
+out before oversampling) is the validation set of early stopping and pruning, so
+scores are not comparable with studies that fit on the whole train split.
+"""
+import argparse
 import optuna
+from functools import partial
 from pathlib import Path
-from src.pipelines.model_pipeline import run_model_pipeline
+from src.modeling import TuningData, ModelWriter
+from src.modeling.tuning import make_pruner, run_parallel_study, study_throughput
 
 DATA_DIR   = "../data"
 MODELS_DIR = "../models/optuna"
 Path(MODELS_DIR).mkdir(parents=True, exist_ok=True)
 
-def objective(trial: optuna.Trial) -> float:
+VALID_SIZE     = 0.2   # share of the train split used for early stopping / pruning
+EARLY_STOPPING = 50    # rounds without validation-AUC improvement
+
+# keep only the best few trial models ("top_k" / "best" / "none"), written as
+# UBJSON by a background thread so trials never wait on disk
+WRITER = ModelWriter(MODELS_DIR, policy="top_k", k=10)
+
+def objective(trial: optuna.Trial, data: TuningData) -> float:
     """Return test-set AUC for a sampled XGBoost configuration."""
     params = {
         "n_estimators"     : trial.suggest_int ("n_estimators", 100, 1000, step=20),
@@ -21,24 +37,35 @@ def objective(trial: optuna.Trial) -> float:
         "random_state"     : 42,
     }
 
-    # every trial writes its model (optional – you can skip saving if disk I/O hurts)
-    model_path = MODELS_DIR + f"/xgb_trial_{trial.number}.joblib"
-
-    results = run_model_pipeline(
-        X_train_path=f"{DATA_DIR}/X_train.parquet",
-        y_train_path=f"{DATA_DIR}/y_train.parquet",
-        X_test_path =f"{DATA_DIR}/X_test.parquet",
-        y_test_path =f"{DATA_DIR}/y_test.parquet",
-        model_output_path=model_path,
-        oversample=True,
-        xgb_params=params,
-    )
+    # X/y, the oversampled matrix and the test DMatrix are built once in `data`
+    # validation AUC is reported to the pruner; best_iteration is kept on the trial
+    results = data.evaluate(params, trial=trial, early_stopping_rounds=EARLY_STOPPING)
+    WRITER.submit(trial.number, results["auc_test"], results["model"])
     return results["auc_test"]          # Optuna will maximise this
 
 if __name__ == "__main__":
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=500, timeout=None)   # run all night
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="tuning processes (1 = serial, in-process)")
+    parser.add_argument("--threads", type=int, default=None, help="XGBoost threads per worker")
+    parser.add_argument("--pruner", choices=["median", "hyperband", "none"], default="median")
+    parser.add_argument("--storage", default=MODELS_DIR + "/study.journal", help="journal file or sqlite:/// URL (parallel mode)")
+    args = parser.parse_args()
+
+    data = TuningData.from_parquet(DATA_DIR, n_jobs=args.threads, valid_size=VALID_SIZE)
+    pruner = make_pruner(args.pruner, max_rounds=1000)
+    if args.workers > 1:
+        # resumable: rerunning the same command continues the study in --storage
+        study = run_parallel_study(
+            objective, data, study_name="xgb_auc", storage=args.storage,
+            n_trials=500, n_workers=args.workers, n_jobs=args.threads,
+            pruner=pruner, valid_size=VALID_SIZE,
+        )
+        print("Throughput:", study_throughput(study))
+    else:
+        study = optuna.create_study(direction="maximize", pruner=pruner)
+        study.optimize(partial(objective, data=data), n_trials=500, timeout=None)   # run all night
 
+    WRITER.close()
     print("Best AUC :", study.best_value)
     print("Best params:")
     for k, v in study.best_params.items():